@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+编译树集成小批量推理基准
+
+按 classification 的默认参数训练一个 XGBoost 二分类模型，导出为纯NumPy的编译树集成，
+对比不同批大小下 XGBClassifier.predict_proba 与 CompiledEnsemble.predict_proba 的
+单次耗时（墙钟）与CPU时间，并校验两者概率的最大偏差。
+另外对比模型缓存加载制品的耗时：解码 XGBoost 模型 vs 只读取编译段。
+
+用法示例:
+  python benchmark_compiled_ensemble.py
+  python benchmark_compiled_ensemble.py --trees 200 --depth 4 --batch-sizes 1 5 20 100
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def time_calls(func, X, repeat):
+    """返回单次调用的平均墙钟时间与CPU时间（毫秒）"""
+    func(X)
+    wall, cpu = time.perf_counter(), time.process_time()
+    for _ in range(repeat):
+        func(X)
+    return (time.perf_counter() - wall) / repeat * 1000, (time.process_time() - cpu) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编译树集成小批量推理基准")
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--features', type=int, default=60)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 5, 20, 32, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 配置与模型路径相对于工作目录：在临时目录中运行，不影响项目数据
+        os.chdir(tmp)
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+        from src.core.predictor.model_cache import ModelCache
+        logging.getLogger().setLevel(logging.WARNING)
+
+        print("🚀 编译树集成小批量推理基准")
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(5000, args.features)).astype(np.float32)
+        y = (X[:, 0] + X[:, 1] * X[:, 2] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+        model = xgb.XGBClassifier(n_estimators=args.trees, max_depth=args.depth, tree_method='hist', random_state=42)
+        model.fit(X, y)
+        path = artifact_path('models', 'bench')
+        ModelArtifact.write(path, model, [f'feature_{i}' for i in range(args.features)])
+        compiled = ModelArtifact.open(path).compiled
+        print(f"📊 {args.trees} 棵树, 最大深度 {compiled.max_depth}, {args.features} 个特征, "
+              f"编译段 {ModelArtifact.open(path).header['compiled']['size'] / 1024:.0f}KB")
+
+        for n_rows in args.batch_sizes:
+            X_batch = rng.normal(size=(n_rows, args.features)).astype(np.float32)
+            xgb_wall, xgb_cpu = time_calls(model.predict_proba, X_batch, args.repeat)
+            compiled_wall, compiled_cpu = time_calls(compiled.predict_proba, X_batch, args.repeat)
+            diff = np.abs(model.predict_proba(X_batch) - compiled.predict_proba(X_batch)).max()
+            print(f"📐 {n_rows:>5} 行: XGBoost {xgb_wall:.3f}ms (CPU {xgb_cpu:.3f}ms), "
+                  f"编译 {compiled_wall:.3f}ms (CPU {compiled_cpu:.3f}ms), "
+                  f"加速 {xgb_wall / compiled_wall:.1f}x, 最大偏差 {diff:.1e}")
+
+        # 模型缓存加载：编译段只需读取 npz，不解码 XGBoost 模型
+        for enabled in (False, True):
+            cache = ModelCache('models')
+            cache.compiled_enabled = enabled
+            start = time.perf_counter()
+            cache.get('bench')
+            load_ms = (time.perf_counter() - start) * 1000
+            print(f"⏱️  模型缓存加载（{'编译树集成' if enabled else '解码 XGBoost 模型'}）: {load_ms:.1f}ms")
+        os.chdir(project_root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+predict模块备用评分基准
+
+对比 SimplePredictor.predict_with_predict_module 的两种评分方式:
+- 逐行：load_models() 取得模型注册表，再对每行调用 predict_anomaly（单行DataFrame、对齐、标准化、推理）
+- 批量：predict_anomaly_batch 从模型注册表按需加载目标用户的模型，整批一次对齐、一次标准化、一次 predict_proba
+逐行方式超过 --legacy-max-rows 行时按前若干行的耗时线性估算。
+
+用法示例:
+  python benchmark_fallback_scoring.py
+  python benchmark_fallback_scoring.py --rows 1000 100000 --users 50 --features 60
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def write_user_models(n_users, n_features, n_trees, seed=0):
+    """按 classification 的训练方式（StandardScaler + XGBoost）为每个用户写一个模型制品"""
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+    from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+
+    rng = np.random.default_rng(seed)
+    feature_names = [f'feature_{i}' for i in range(n_features)]
+    for user in range(n_users):
+        X = rng.normal(size=(2000, n_features))
+        y = (X[:, 0] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+        scaler = StandardScaler().fit(X)
+        model = xgb.XGBClassifier(n_estimators=n_trees, max_depth=4, tree_method='hist', random_state=42)
+        model.fit(scaler.transform(X), y)
+        ModelArtifact.write(artifact_path('models', user), model, feature_names, scaler=scaler, threshold=0.5)
+    return feature_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="predict模块备用评分基准")
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--users', type=int, default=20, help='models目录中的用户模型数')
+    parser.add_argument('--features', type=int, default=40)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--legacy-max-rows', type=int, default=1000, help='逐行方式实际执行的最大行数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # predict模块从工作目录下的 models/ 加载模型、向 logs/ 写日志：在临时目录中运行
+        os.chdir(tmp)
+        os.makedirs('models')
+        from src import predict
+        logging.getLogger().setLevel(logging.WARNING)
+
+        print("🚀 predict模块备用评分基准")
+        feature_names = write_user_models(args.users, args.features, args.trees)
+        print(f"📊 {args.users} 个用户模型, {args.features} 个特征, {args.trees} 棵树")
+
+        rng = np.random.default_rng(1)
+        user_id = 'user_0'
+        for n_rows in args.rows:
+            X = pd.DataFrame(rng.normal(size=(n_rows, args.features)), columns=feature_names)
+
+            # 逐行：每次预测周期取模型注册表，然后逐行评分
+            legacy_rows = min(n_rows, args.legacy_max_rows)
+            start = time.perf_counter()
+            model_info = predict.load_models()
+            load_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            legacy_scores = [predict.predict_anomaly(user_id, row.to_dict(), model_info)['anomaly_score']
+                             for _, row in X.iloc[:legacy_rows].iterrows()]
+            legacy_seconds = load_seconds + (time.perf_counter() - start) * n_rows / legacy_rows
+
+            # 批量：首次调用加载该用户模型，之后命中缓存
+            predict.get_model_registry().evict()
+            start = time.perf_counter()
+            scored = predict.predict_anomaly_batch(user_id, X)
+            batch_cold = time.perf_counter() - start
+            start = time.perf_counter()
+            predict.predict_anomaly_batch(user_id, X)
+            batch_warm = time.perf_counter() - start
+
+            same = np.allclose(scored['anomaly_score'][:legacy_rows], legacy_scores, atol=1e-6)
+            estimated = '（估算）' if legacy_rows < n_rows else ''
+            print(f"\n📐 {n_rows} 行")
+            print(f"⏱️  逐行 predict_anomaly: {legacy_seconds:.2f}s{estimated}, 其中 load_models {load_seconds * 1000:.0f}ms")
+            print(f"⏱️  批量 predict_anomaly_batch: 首次 {batch_cold * 1000:.1f}ms, 缓存命中 {batch_warm * 1000:.1f}ms "
+                  f"(加速 {legacy_seconds / batch_warm:.0f}x)")
+            print(f"✅ 异常分数一致: {same}")
+        os.chdir(project_root)
+
+
+if __name__ == "__main__":
+    main()
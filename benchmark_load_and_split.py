@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+按用户划分训练/验证集的性能基准
+
+对比:
+- 旧实现：逐用户 data[data['user'] == user] / data[data['user'] != user].copy()，O(用户数 × 行数)
+- 新实现：classification.split_user_data，行索引只分组一次，按索引抽样，O(行数)
+
+旧实现在全部用户上耗时过长，只对前 --legacy-users 个用户计时并线性外推。
+
+用法示例:
+  python benchmark_load_and_split.py
+  python benchmark_load_and_split.py --users 1000 --rows-per-user 200 --features 40
+"""
+
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def make_synthetic_data(n_users, rows_per_user, n_features, sessions_per_user=10, seed=0):
+    """生成与 all_training_aggregation.pickle 结构一致的合成数据"""
+    rng = np.random.default_rng(seed)
+    n_rows = n_users * rows_per_user
+    data = pd.DataFrame(
+        rng.normal(size=(n_rows, n_features)),
+        columns=[f'feature_{i}' for i in range(n_features)]
+    )
+    data['user'] = np.repeat(np.arange(n_users), rows_per_user)
+    data['session'] = rng.integers(0, sessions_per_user, size=n_rows) + data['user'] * sessions_per_user
+    # 打乱行顺序，模拟真实数据中用户交错出现
+    return data.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def legacy_split_user(data, user):
+    """旧版 load_and_split_data 的单用户处理逻辑"""
+    user_sessions = data[data['user'] == user]['session'].unique()
+    np.random.shuffle(user_sessions)
+    split_idx = int(len(user_sessions) * 0.8)
+    train_sessions, val_sessions = user_sessions[:split_idx], user_sessions[split_idx:]
+
+    user_data = data[data['user'] == user].copy()
+    other_users_data = data[data['user'] != user].copy()
+    train_data = user_data[user_data['session'].isin(train_sessions)].copy()
+    val_data = user_data[user_data['session'].isin(val_sessions)].copy()
+
+    neg_train_data = other_users_data.sample(n=len(train_data), random_state=42)
+    neg_val_data = other_users_data.sample(n=len(val_data), random_state=42)
+    train_data = pd.concat([train_data, neg_train_data], ignore_index=True)
+    val_data = pd.concat([val_data, neg_val_data], ignore_index=True)
+
+    feature_cols = [col for col in train_data.columns if col not in ['user', 'session']]
+    X_train = train_data[feature_cols].apply(pd.to_numeric, errors='coerce').fillna(0).astype(float)
+    X_val = val_data[feature_cols].apply(pd.to_numeric, errors='coerce').fillna(0).astype(float)
+    return X_train, X_val
+
+
+def run_measured(func):
+    """运行函数并返回 (结果, 耗时秒, 峰值内存MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="load_and_split_data 性能基准")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--rows-per-user', type=int, default=200)
+    parser.add_argument('--features', type=int, default=40)
+    parser.add_argument('--legacy-users', type=int, default=20, help='旧实现实际计时的用户数')
+    args = parser.parse_args()
+
+    from src.classification import split_user_data
+    # classification 的日志输出过多，基准测试中只保留警告
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print("🚀 按用户划分训练/验证集性能基准")
+    data = make_synthetic_data(args.users, args.rows_per_user, args.features)
+    dataset_mb = data.memory_usage(deep=True).sum() / 1024 / 1024
+    print(f"📊 合成数据: {args.users} 个用户, {len(data)} 行, {args.features} 个特征, {dataset_mb:.1f}MB")
+
+    legacy_users = data['user'].unique()[:args.legacy_users]
+    _, legacy_time, legacy_peak = run_measured(
+        lambda: [legacy_split_user(data, user) for user in legacy_users]
+    )
+    legacy_projected = legacy_time / len(legacy_users) * args.users
+    print(f"⏱️  旧实现: {len(legacy_users)} 个用户耗时 {legacy_time:.2f}s, "
+          f"外推 {args.users} 个用户约 {legacy_projected:.1f}s, 峰值额外内存 {legacy_peak:.1f}MB")
+
+    result, new_time, new_peak = run_measured(lambda: split_user_data(data))
+    print(f"⏱️  新实现: {len(result)} 个用户耗时 {new_time:.2f}s, 峰值额外内存 {new_peak:.1f}MB")
+    print(f"✅ 加速比约 {legacy_projected / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
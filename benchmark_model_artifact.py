@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+模型文件加载性能基准
+
+对比:
+- 旧格式：user_<id>_model.pkl + _scaler.pkl + _features.pkl + _encoders.pkl，逐个 pickle.load
+- 新格式：单文件制品 user_<id>_model.ubm（XGBoost原生UBJSON + 头部），
+  分别统计只读头部（延迟加载）和完整解码模型的耗时
+
+用法示例:
+  python benchmark_model_artifact.py
+  python benchmark_model_artifact.py --trees 400 --features 80 --repeat 50
+"""
+
+import argparse
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def train_sample_model(n_trees, n_features, n_rows=5000, seed=0):
+    """训练与 classification.train_single_model 结构相近的模型"""
+    import xgboost as xgb
+    from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=n_rows) > 0).astype(int)
+    feature_names = [f'feature_{i}' for i in range(n_features)]
+
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBClassifier(n_estimators=n_trees, max_depth=4, learning_rate=0.05,
+                              tree_method='hist', random_state=42)
+    model.fit(pd.DataFrame(scaler.transform(X), columns=feature_names), y)
+    encoders = {'state': LabelEncoder().fit(['Move', 'Drag', 'Pressed', 'Released', 'Scroll'])}
+    return model, scaler, feature_names, encoders
+
+
+def time_repeated(func, repeat):
+    """重复执行并返回单次平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模型文件加载性能基准")
+    parser.add_argument('--trees', type=int, default=200)
+    parser.add_argument('--features', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from src.core.model_trainer.model_artifact import ModelArtifact
+
+    print("🚀 模型文件加载性能基准")
+    model, scaler, feature_names, encoders = train_sample_model(args.trees, args.features)
+    print(f"📊 模型: {args.trees} 棵树, {args.features} 个特征")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        pickle_files = {
+            'model': tmp / 'user_1_model.pkl',
+            'scaler': tmp / 'user_1_scaler.pkl',
+            'features': tmp / 'user_1_features.pkl',
+            'encoders': tmp / 'user_1_encoders.pkl',
+        }
+        for key, obj in zip(pickle_files, (model, scaler, feature_names, encoders)):
+            with open(pickle_files[key], 'wb') as f:
+                pickle.dump(obj, f)
+
+        artifact_file = tmp / 'user_1_model.ubm'
+        metadata = {'encoders': {col: le.classes_.tolist() for col, le in encoders.items()}}
+        ModelArtifact.write(artifact_file, model, feature_names, scaler=scaler, threshold=0.5, metadata=metadata)
+
+        def load_pickles():
+            loaded = {}
+            for key, path in pickle_files.items():
+                with open(path, 'rb') as f:
+                    loaded[key] = pickle.load(f)
+            return loaded
+
+        def load_artifact_full():
+            artifact = ModelArtifact.open(artifact_file)
+            return artifact.model, artifact.scaler
+
+        pickle_size = sum(path.stat().st_size for path in pickle_files.values()) / 1024
+        artifact_size = artifact_file.stat().st_size / 1024
+        print(f"📦 文件大小: pickle {len(pickle_files)} 个文件共 {pickle_size:.1f}KB, "
+              f"单文件制品 {artifact_size:.1f}KB")
+
+        pickle_ms = time_repeated(load_pickles, args.repeat)
+        header_ms = time_repeated(lambda: ModelArtifact.open(artifact_file), args.repeat)
+        full_ms = time_repeated(load_artifact_full, args.repeat)
+        print(f"⏱️  pickle 加载: {pickle_ms:.2f}ms")
+        print(f"⏱️  制品头部加载（延迟解码）: {header_ms:.3f}ms")
+        print(f"⏱️  制品完整加载（含校验与解码）: {full_ms:.2f}ms")
+
+        artifact_model, artifact_scaler = load_artifact_full()
+        X = np.random.default_rng(1).normal(size=(1000, args.features))
+        same = np.allclose(
+            model.predict_proba(scaler.transform(X)),
+            artifact_model.predict_proba(artifact_scaler.transform(X)),
+            atol=1e-6
+        )
+        print(f"✅ 预测结果一致: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+predict模块多用户模型加载基准
+
+在临时目录中为大量用户写入旧版三文件 pickle 模型（model/scaler/features），对比:
+- 全量加载：原 load_models 的做法，启动时反序列化全部用户的模型
+- 惰性注册表：ModelRegistry 只列出用户，按需加载被访问用户的模型，按数量上限做LRU淘汰
+并按活跃用户的偏斜访问模式统计注册表的命中率、淘汰次数与驻留内存（按进程RSS估算）。
+
+用法示例:
+  python benchmark_model_registry.py
+  python benchmark_model_registry.py --users 500 --max-models 32 --lookups 5000
+"""
+
+import argparse
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import psutil
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def write_legacy_models(models_dir, n_users, n_features, n_trees, seed=0):
+    """按 classification 的训练方式（StandardScaler + XGBoost）训练一个模型，作为每个用户的旧版 pickle 模型写入"""
+    import xgboost as xgb
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    feature_names = [f'feature_{i}' for i in range(n_features)]
+    X = rng.normal(size=(2000, n_features))
+    y = (X[:, 0] + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = xgb.XGBClassifier(n_estimators=n_trees, max_depth=4, tree_method='hist', random_state=42)
+    model.fit(scaler.transform(X), y)
+    payloads = [pickle.dumps(obj) for obj in (model, scaler, feature_names)]
+    for user in range(n_users):
+        for suffix, payload in zip(('model', 'scaler', 'features'), payloads):
+            (models_dir / f'user_{user}_{suffix}.pkl').write_bytes(payload)
+
+
+def load_all(models_dir):
+    """原 load_models 的全量加载"""
+    model_info = {}
+    for file in os.listdir(models_dir):
+        if file.endswith('_model.pkl'):
+            user_id = file.replace('_model.pkl', '')
+            info = {}
+            for key, suffix in (('model', 'model'), ('scaler', 'scaler'), ('feature_names', 'features')):
+                with open(models_dir / f'{user_id}_{suffix}.pkl', 'rb') as f:
+                    info[key] = pickle.load(f)
+            model_info[user_id] = info
+    return model_info
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="predict模块多用户模型加载基准")
+    parser.add_argument('--users', type=int, default=300, help='models目录中的用户模型数')
+    parser.add_argument('--features', type=int, default=40)
+    parser.add_argument('--trees', type=int, default=100)
+    parser.add_argument('--max-models', type=int, default=32, help='注册表驻留模型数上限')
+    parser.add_argument('--max-memory-mb', type=float, default=1024, help='注册表驻留内存上限（按模型文件大小估算）')
+    parser.add_argument('--lookups', type=int, default=3000, help='模拟的预测请求数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 配置与模型路径相对于工作目录：在临时目录中运行，不影响项目数据
+        os.chdir(tmp)
+        from src.core.predictor.model_registry import ModelRegistry
+        logging.getLogger().setLevel(logging.WARNING)
+
+        print("🚀 predict模块多用户模型加载基准")
+        models_dir = Path('models')
+        models_dir.mkdir()
+        write_legacy_models(models_dir, args.users, args.features, args.trees)
+        print(f"📊 {args.users} 个用户的旧版 pickle 模型, {args.features} 个特征, {args.trees} 棵树")
+
+        # 少数活跃用户承担大部分请求（Zipf 分布）
+        rng = np.random.default_rng(1)
+        active = np.minimum(rng.zipf(1.5, size=args.lookups) - 1, args.users - 1)
+
+        base_rss = rss_mb()
+        registry = ModelRegistry(models_dir, max_models=args.max_models,
+                                 max_memory_bytes=int(args.max_memory_mb * 1024 * 1024))
+        start = time.perf_counter()
+        n_users = len(registry)
+        list_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for user in active:
+            registry.get(str(user))
+        lookup_seconds = time.perf_counter() - start
+        lazy_rss = rss_mb() - base_rss
+        stats = registry.get_stats()
+
+        start = time.perf_counter()
+        model_info = load_all(models_dir)
+        eager_seconds = time.perf_counter() - start
+        eager_rss = rss_mb() - base_rss - lazy_rss
+
+        print(f"⏱️  全量加载: {eager_seconds:.2f}s, {len(model_info)} 个模型, 内存约 +{eager_rss:.0f}MB")
+        print(f"⏱️  惰性注册表: 列出 {n_users} 个用户 {list_ms:.1f}ms, "
+              f"{args.lookups} 次请求共 {lookup_seconds:.2f}s, 驻留 {stats['models']} 个模型, 内存约 +{lazy_rss:.0f}MB")
+        print(f"🎯 命中 {stats['hits']}, 未命中 {stats['misses']}, 淘汰 {stats['evictions']}, "
+              f"命中率 {stats['hit_rate']:.1%}")
+        os.chdir(project_root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+流式检测端到端延迟基准
+
+在临时目录中用合成鼠标事件训练一个用户模型，然后按给定速率把事件送入 StreamingDetectionPipeline
+（与采集器事件监听相同的入口），统计窗口关闭（关闭窗口的事件入队）到回调返回的延迟分布，
+以及停止后异步写入数据库的特征、预测结果与水位线。
+
+用法示例:
+  python benchmark_streaming_pipeline.py
+  python benchmark_streaming_pipeline.py --windows 50 --window-size 100 --rate 500
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+
+def make_events(user_id, session_id, n_events, speed, seed=0, start_time=1_700_000_000.0):
+    """合成一个会话的鼠标事件：随机游走的移动事件，夹杂少量点击与滚动"""
+    rng = np.random.default_rng(seed)
+    x, y = 960.0, 540.0
+    events = []
+    for i in range(n_events):
+        x = float(np.clip(x + rng.normal(scale=speed), 0, 1919))
+        y = float(np.clip(y + rng.normal(scale=speed), 0, 1079))
+        roll = rng.random()
+        event_type, button = 'move', None
+        if roll < 0.03:
+            event_type, button = 'pressed', 'Left'
+        elif roll < 0.06:
+            event_type, button = 'released', 'Left'
+        elif roll < 0.08:
+            event_type, button = 'scroll', None
+        events.append({
+            'user_id': user_id, 'session_id': session_id, 'timestamp': start_time + i * 0.01,
+            'x': int(x), 'y': int(y), 'event_type': event_type, 'button': button, 'wheel_delta': 0,
+        })
+    return events
+
+
+def window_features(events, window_size):
+    from src.core.feature_engineer.incremental_featurizer import IncrementalFeaturizer
+
+    featurizer = IncrementalFeaturizer(window_size=window_size)
+    windows = [f for f in map(featurizer.add_event, events) if f is not None]
+    return pd.concat(windows, ignore_index=True)
+
+
+def train_user_model(models_dir, user_id, window_size, seed=0):
+    """用本人（正常）与他人（较快移动）的窗口特征训练用户模型并写成制品"""
+    import xgboost as xgb
+    from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+
+    n_events = window_size * 200
+    own = window_features(make_events(user_id, 'train', n_events, speed=8, seed=seed), window_size)
+    other = window_features(make_events('other', 'train', n_events, speed=20, seed=seed + 1), window_size)
+    feature_cols = [col for col in own.columns if col in other.columns]
+    X = pd.concat([own[feature_cols], other[feature_cols]]).fillna(0).to_numpy(dtype=np.float32)
+    y = np.concatenate([np.ones(len(own)), np.zeros(len(other))])
+    model = xgb.XGBClassifier(n_estimators=100, max_depth=4, tree_method='hist', random_state=42)
+    model.fit(X, y)
+    ModelArtifact.write(artifact_path(models_dir, user_id), model, feature_cols, threshold=0.5)
+    return len(feature_cols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式检测端到端延迟基准")
+    parser.add_argument('--windows', type=int, default=30, help='送入的窗口数')
+    parser.add_argument('--window-size', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=1000, help='每秒送入的事件数（0表示不限速）')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 配置中的数据、模型路径相对于工作目录：在临时目录中运行，不影响项目数据
+        os.chdir(tmp)
+        from src.core.predictor.streaming_pipeline import StreamingDetectionPipeline
+        logging.getLogger().setLevel(logging.WARNING)
+
+        print("🚀 流式检测端到端延迟基准")
+        n_features = train_user_model(Path('models'), 'bench', args.window_size)
+        print(f"📊 用户模型: {n_features} 个特征, 窗口 {args.window_size} 条事件")
+
+        callback_windows = []
+        pipeline = StreamingDetectionPipeline(callback=lambda user_id, results: callback_windows.append(results),
+                                              window_size=args.window_size)
+        pipeline.start()
+
+        # 本人与他人交替的会话：后一半事件来自移动更快的“他人”
+        n_events = args.windows * args.window_size
+        half = n_events // 2
+        events = make_events('bench', 'live', half, speed=8, seed=10) + \
+            [dict(e, user_id='bench', session_id='live') for e in make_events('x', 'x', n_events - half, speed=20, seed=11)]
+
+        interval = 1.0 / args.rate if args.rate > 0 else 0.0
+        start = time.perf_counter()
+        for i, event in enumerate(events):
+            if interval:
+                # 按采集速率送入事件（与采集线程的节奏一致）
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            pipeline.submit(event)
+        feed_seconds = time.perf_counter() - start
+
+        # 等待最后一个窗口回调后停止（停止时写完尚未落库的结果）
+        deadline = time.time() + 10
+        while pipeline.windows < args.windows and time.time() < deadline:
+            time.sleep(0.01)
+        stop_start = time.perf_counter()
+        pipeline.stop()
+        stop_ms = (time.perf_counter() - stop_start) * 1000
+
+        stats = pipeline.get_stats()
+        anomalies = sum(1 for results in callback_windows for r in results if not r['is_normal'])
+        print(f"📥 送入 {stats['received_events']} 个事件, 耗时 {feed_seconds:.2f}s, 丢弃 {stats['dropped_events']}")
+        print(f"🪟 窗口 {stats['windows']} 个, 回调 {len(callback_windows)} 次, 异常窗口 {anomalies}")
+        print(f"⏱️  窗口关闭 -> 回调 延迟: p50 {stats['latency_p50_ms']:.1f}ms, "
+              f"p99 {stats['latency_p99_ms']:.1f}ms, 最大 {stats['latency_max_ms']:.1f}ms "
+              f"(上限 {pipeline.max_latency * 1000:.0f}ms, 超限 {stats['late_windows']})")
+
+        conn = sqlite3.connect(str(pipeline.feature_processor.db_path))
+        try:
+            features = conn.execute("SELECT COUNT(*) FROM features WHERE user_id = 'bench'").fetchone()[0]
+            predictions = conn.execute("SELECT COUNT(*) FROM predictions WHERE user_id = 'bench'").fetchone()[0]
+            watermark = conn.execute(
+                "SELECT last_feature_id FROM prediction_watermarks WHERE user_id = 'bench'"
+            ).fetchone()
+        finally:
+            conn.close()
+        print(f"💾 异步落库: 特征 {features} 条, 预测 {predictions} 条, 水位线 {watermark[0] if watermark else None}, "
+              f"停止时写入剩余结果耗时 {stop_ms:.0f}ms")
+        os.chdir(project_root)
+
+
+if __name__ == "__main__":
+    main()
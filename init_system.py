@@ -6,7 +6,6 @@
 
 import sys
 import os
-import sqlite3
 from pathlib import Path
 import subprocess
 import shutil
@@ -40,49 +39,10 @@ def init_database():
         # 确保父目录存在
         db_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # 连接数据库
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # 创建mouse_events表
-        print("创建mouse_events表...")
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS mouse_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                session_id TEXT NOT NULL,
-                timestamp REAL NOT NULL,
-                x INTEGER NOT NULL,
-                y INTEGER NOT NULL,
-                event_type TEXT NOT NULL,
-                button TEXT,
-                wheel_delta INTEGER,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建features表
-        print("创建features表...")
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS features (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                session_id TEXT NOT NULL,
-                timestamp REAL NOT NULL,
-                feature_vector TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 创建索引
-        print("创建数据库索引...")
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_session ON mouse_events(user_id, session_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON mouse_events(timestamp)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_user_session ON features(user_id, session_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_timestamp ON features(timestamp)')
-        
-        conn.commit()
-        conn.close()
+        # 创建/升级表结构与索引（统一由迁移模块维护）
+        from src.core.database.schema_migrations import SchemaMigrator
+        version = SchemaMigrator(db_path).migrate()
+        print(f"数据库结构版本: {version}")
         
         print("✓ 数据库初始化完成")
         return True
@@ -232,30 +232,33 @@ def optimize_database():
             print("⚠️  数据库不存在，将在首次运行时创建")
             return True
         
+        # 表结构与索引统一由迁移模块维护
+        from src.core.database.schema_migrations import SchemaMigrator
+        migrator = SchemaMigrator(db_path)
+        version = migrator.migrate()
+        print(f"✓ 数据库结构版本: {version}")
+        
         import sqlite3
         conn = sqlite3.connect(db_path)
         cursor = conn.cursor()
         
-        # 创建索引优化查询性能
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_mouse_events_user_timestamp ON mouse_events(user_id, timestamp)",
-            "CREATE INDEX IF NOT EXISTS idx_mouse_events_session ON mouse_events(session_id)",
-            "CREATE INDEX IF NOT EXISTS idx_features_user ON features(user_id)",
-            "CREATE INDEX IF NOT EXISTS idx_predictions_user_timestamp ON predictions(user_id, timestamp)",
-            "CREATE INDEX IF NOT EXISTS idx_alerts_user_timestamp ON alerts(user_id, timestamp)"
-        ]
-        
-        for index_sql in indexes:
-            cursor.execute(index_sql)
-        
         # 分析表以优化查询计划
         cursor.execute("ANALYZE")
         
         conn.commit()
         conn.close()
         
+        # 检查热点查询是否命中索引
+        plan_ok = True
+        for name, (ok, detail) in migrator.check_query_plans().items():
+            if ok:
+                print(f"✓ 查询计划 {name}: {detail}")
+            else:
+                plan_ok = False
+                print(f"✗ 查询计划 {name} 未命中索引: {detail}")
+        
         print("✓ 数据库优化完成")
-        return True
+        return plan_ok
         
     except Exception as e:
         print(f"✗ 数据库优化失败: {e}")
@@ -13,9 +13,11 @@ from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder, OneHotEncoder
 from sklearn.feature_selection import VarianceThreshold, SelectFromModel, SelectKBest
 from sklearn.pipeline import Pipeline
-from multiprocessing import Pool, cpu_count, shared_memory
+from multiprocessing import cpu_count, shared_memory
 import psutil
 import xgboost as xgb
+# QuantileDMatrix（ref= 复用分箱参考）需要 xgboost>=1.7
+QUANTILE_DMATRIX_AVAILABLE = hasattr(xgb, 'QuantileDMatrix')
 try:
     import matplotlib.pyplot as plt
 except Exception:
@@ -40,6 +42,19 @@ import gc
 from typing import Dict, Any
 import multiprocessing as mp
 from functools import partial
+try:
+    from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+except ImportError:
+    # 直接以脚本方式运行（python src/classification.py）时 src 目录位于 sys.path
+    from core.model_trainer.model_artifact import ModelArtifact, artifact_path
+try:
+    from src.core.model_trainer.training_governor import training_thread_limit
+    from src.core.model_trainer.feature_selector import mutual_info_ranking
+    from src.core.model_trainer.sanitize import sanitize_array, compute_clip_bounds
+except ImportError:
+    from core.model_trainer.training_governor import training_thread_limit
+    from core.model_trainer.feature_selector import mutual_info_ranking
+    from core.model_trainer.sanitize import sanitize_array, compute_clip_bounds
 
 # 定义常量
 DATA_PATH = './data/processed/all_training_aggregation.pickle'
@@ -287,12 +302,8 @@ def select_features(X_train, y_train, X_val, threshold=0.01):
         # 获取保留的特征索引
         var_features = selector.get_support()
         
-        # 5. 使用互信息选择特征
-        mi_selector = SelectKBest(mutual_info_classif, k='all')
-        mi_selector.fit(X_train_var, y_train)
-        
-        # 获取互信息分数
-        mi_scores = mi_selector.scores_
+        # 5. 使用互信息选择特征（大样本时抽样估计）
+        mi_scores = mutual_info_ranking(X_train_var, y_train)
         
         # 选择互信息分数大于阈值的特征
         mi_threshold = np.percentile(mi_scores, 50)  # 选择前50%的特征
@@ -529,12 +540,8 @@ def prepare_features(X_train, X_val, y_train, data_analysis=False):
         
         # 2. 特征选择
         log_message("Step 2: Feature selection...")
-        # 使用互信息选择特征
-        mi_selector = SelectKBest(mutual_info_classif, k='all')
-        mi_selector.fit(X_train_engineered, y_train)
-        
-        # 获取互信息分数
-        mi_scores = pd.Series(mi_selector.scores_, index=X_train_engineered.columns)
+        # 使用互信息选择特征（大样本时抽样估计）
+        mi_scores = pd.Series(mutual_info_ranking(X_train_engineered, y_train), index=X_train_engineered.columns)
         # 选择互信息分数大于中位数的特征
         selected_features = mi_scores[mi_scores > mi_scores.median()].index.tolist()
         
@@ -736,104 +743,63 @@ def load_and_split_data():
         with open(DATA_PATH, 'rb') as f:
             data = pickle.load(f)
         log_message(f"Loaded {len(data)} records")
+        return split_user_data(data)
+    except Exception as e:
+        log_message(f"Error loading data: {str(e)}", level='error')
+        raise
 
-        # 获取所有用户
-        users = data['user'].unique()
-        log_message(f"Found {len(users)} unique users")
-
-        processed_user_data = {}
+def split_user_data(data):
+    """按用户生成训练/验证集
 
-        for user in users:
-            try:
-                log_message(f"\nProcessing data for user {user}")
-                # 获取该用户的所有会话
-                user_sessions = data[data['user'] == user]['session'].unique()
-                if len(user_sessions) < 2:
-                    log_message(f"User {user} has less than 2 sessions, skipping.", level='error')
-                    continue
+    只分组一次行索引并构建一次数值矩阵，每个用户的正负样本都通过索引抽取，
+    不再逐用户扫描全表或复制“其他所有用户”的数据，总代价 O(N)。
+    """
+    order, users, starts, ends = group_user_rows(data)
+    log_message(f"Found {len(users)} unique users")
+    splits = build_user_splits(data, order, users, starts, ends)
 
-                # 随机分割会话为训练集和验证集
-                np.random.shuffle(user_sessions)
-                split_idx = int(len(user_sessions) * 0.8)
-                train_sessions = user_sessions[:split_idx]
-                val_sessions = user_sessions[split_idx:]
-                if len(train_sessions) == 0 or len(val_sessions) == 0:
-                    log_message(f"User {user} train/val session split empty, skipping.", level='error')
-                    continue
+    # 丢弃非特征列，所有特征转为float并填充缺失值
+    feature_cols = [col for col in data.columns if col not in ['user', 'session']]
+    X_all = build_feature_matrix(data, feature_cols, order)
 
-                # 获取该用户的所有数据
-                user_data = data[data['user'] == user].copy()
-                other_users_data = data[data['user'] != user].copy()
-
-                # 分割用户数据
-                train_data = user_data[user_data['session'].isin(train_sessions)].copy()
-                val_data = user_data[user_data['session'].isin(val_sessions)].copy()
-
-                # 从其他用户数据中采样负样本
-                n_train = len(train_data)
-                n_val = len(val_data)
-                
-                # 确保负样本数量与正样本数量相同
-                neg_train_data = other_users_data.sample(n=n_train, random_state=42)
-                neg_val_data = other_users_data.sample(n=n_val, random_state=42)
-
-                # 合并正负样本
-                train_data = pd.concat([train_data, neg_train_data], ignore_index=True)
-                val_data = pd.concat([val_data, neg_val_data], ignore_index=True)
-
-                # 标签
-                y_train = (train_data['user'] == user).astype(int)
-                y_val = (val_data['user'] == user).astype(int)
-
-                # 丢弃非特征列
-                drop_cols = ['user', 'session']
-                feature_cols = [col for col in train_data.columns if col not in drop_cols]
-                X_train = train_data[feature_cols].copy()
-                X_val = val_data[feature_cols].copy()
-
-                # 特征列对齐
-                X_val = X_val.reindex(columns=X_train.columns, fill_value=0)
-
-                # 所有特征转为float，缺失值填充
-                X_train = X_train.apply(pd.to_numeric, errors='coerce').fillna(0).astype(float)
-                X_val = X_val.apply(pd.to_numeric, errors='coerce').fillna(0).astype(float)
-
-                # 随机打乱
-                X_train, y_train = X_train.sample(frac=1, random_state=42), y_train.sample(frac=1, random_state=42)
-                X_val, y_val = X_val.sample(frac=1, random_state=42), y_val.sample(frac=1, random_state=42)
-
-                # 检查样本数
-                if len(X_train) == 0 or len(X_val) == 0:
-                    log_message(f"User {user} has empty train/val after processing, skipping.", level='error')
-                    continue
+    processed_user_data = {}
+    for user, split in splits.items():
+        try:
+            X_train = pd.DataFrame(X_all[split['train_idx']], columns=feature_cols)
+            X_val = pd.DataFrame(X_all[split['val_idx']], columns=feature_cols)
+            y_train = pd.Series(split['y_train'])
+            y_val = pd.Series(split['y_val'])
 
-                # 检查标签分布
-                train_pos_ratio = y_train.mean()
-                val_pos_ratio = y_val.mean()
-                log_message(f"User {user} label distribution - Train: {train_pos_ratio:.2%} positive, Val: {val_pos_ratio:.2%} positive")
-
-                processed_user_data[user] = {
-                    'X_train': X_train,
-                    'X_val': X_val,
-                    'y_train': y_train,
-                    'y_val': y_val
-                }
-                log_message(f"User {user} train/val shape: {X_train.shape}, {X_val.shape}")
-            except Exception as e:
-                log_message(f"Error processing data for user {user}: {str(e)}", level='error')
+            # 检查样本数
+            if len(X_train) == 0 or len(X_val) == 0:
+                log_message(f"User {user} has empty train/val after processing, skipping.", level='error')
                 continue
 
-        if not processed_user_data:
-            raise ValueError("No valid user data after processing")
-        return processed_user_data
-    except Exception as e:
-        log_message(f"Error loading data: {str(e)}", level='error')
-        raise
+            # 检查标签分布
+            log_message(f"User {user} label distribution - Train: {y_train.mean():.2%} positive, "
+                        f"Val: {y_val.mean():.2%} positive")
+
+            processed_user_data[user] = {
+                'X_train': X_train,
+                'X_val': X_val,
+                'y_train': y_train,
+                'y_val': y_val
+            }
+        except Exception as e:
+            log_message(f"Error processing data for user {user}: {str(e)}", level='error')
+            continue
 
-def train_single_model(X_train, y_train, X_val, y_val, feature_names, scaler, user_id):
+    if not processed_user_data:
+        raise ValueError("No valid user data after processing")
+    log_message(f"Prepared train/val splits for {len(processed_user_data)} users")
+    return processed_user_data
+
+def train_single_model(X_train, y_train, X_val, y_val, feature_names, scaler, user_id, n_jobs=None):
     """Train a single model for a user with XGBoost."""
     try:
         start_time = time.time()
+        if n_jobs is None:
+            n_jobs = training_thread_limit()
         params = {
             'objective': 'binary:logistic',
             'eval_metric': ['auc'],
@@ -846,7 +812,7 @@ def train_single_model(X_train, y_train, X_val, y_val, feature_names, scaler, us
             'gamma': 1,
             'reg_alpha': 0.1,
             'reg_lambda': 1,
-            'n_jobs': max(1, os.cpu_count()-1),
+            'n_jobs': n_jobs,
             'tree_method': 'hist',
             'verbosity': 1,
             'early_stopping_rounds': 20  # 将early_stopping_rounds移到params中
@@ -878,11 +844,7 @@ def train_single_model(X_train, y_train, X_val, y_val, feature_names, scaler, us
         for _, row in feature_importance.head(10).iterrows():
             log_message(f"{row['feature']}: {row['importance']:.4f}")
         
-        # 准备特征和编码器
-        X_train_processed, X_val_processed, y_train, scaler, selected_features, encoders = prepare_features(
-            X_train, X_val, y_train, data_analysis=False
-        )
-        
+        # 输入已由调用方完成筛选与标准化（全部为数值列，无需编码器），直接返回训练所用的 scaler
         return {
             'user_id': user_id,
             'model': model,
@@ -892,12 +854,181 @@ def train_single_model(X_train, y_train, X_val, y_val, feature_names, scaler, us
             'scaler': scaler,
             'feature_names': feature_names,
             'best_iteration': model.best_iteration,
-            'encoders': encoders
+            'encoders': {}
         }
     except Exception as e:
         log_message(f"Error training model for user {user_id}: {str(e)}", level='error')
         return None
 
+def fit_user_model(X_train, y_train, X_val, y_val, feature_names, user_id, n_jobs=None):
+    """单个用户的方差筛选 + 标准化 + 训练，输入为数值矩阵与标签数组"""
+    # 先处理异常值
+    X_train = np.nan_to_num(np.asarray(X_train, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+    X_val = np.nan_to_num(np.asarray(X_val, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+
+    # 方差阈值特征选择
+    selector = VarianceThreshold(threshold=0.01)
+    X_train_sel = selector.fit_transform(X_train)
+    X_val_sel = selector.transform(X_val)
+    selected_names = [name for name, keep in zip(feature_names, selector.get_support()) if keep]
+
+    # 标准化
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train_sel)
+    X_val_scaled = scaler.transform(X_val_sel)
+
+    # 转为DataFrame，再次确保没有异常值
+    X_train_final = pd.DataFrame(X_train_scaled, columns=selected_names).replace([np.inf, -np.inf], 0)
+    X_val_final = pd.DataFrame(X_val_scaled, columns=selected_names).replace([np.inf, -np.inf], 0)
+
+    return train_single_model(
+        X_train_final, pd.Series(np.asarray(y_train)).reset_index(drop=True),
+        X_val_final, pd.Series(np.asarray(y_val)).reset_index(drop=True),
+        selected_names, scaler, user_id, n_jobs=n_jobs
+    )
+
+def group_user_rows(data):
+    """按用户分组一次：返回使同一用户行连续的行顺序、用户列表及每个用户的[start, end)区间"""
+    codes, users = pd.factorize(data['user'])
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes, minlength=len(users))
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    return order, users, starts, ends
+
+def build_user_splits(data, order, users, starts, ends, random_state=42):
+    """为每个用户生成训练/验证行索引（指向按 order 重排后的矩阵）
+
+    正样本按会话8:2划分；负样本从其他用户的行区间外按位置抽样，
+    每个用户的代价只与其自身样本数相关，而不是与总行数相关。
+    """
+    rng = np.random.default_rng(random_state)
+    sessions = data['session'].to_numpy()[order]
+    n_rows = len(order)
+    splits = {}
+
+    for user, start, end in zip(users, starts, ends):
+        user_sessions = sessions[start:end]
+        unique_sessions = pd.unique(user_sessions)
+        if len(unique_sessions) < 2:
+            log_message(f"User {user} has less than 2 sessions, skipping.", level='error')
+            continue
+
+        # 随机分割会话为训练集和验证集
+        rng.shuffle(unique_sessions)
+        split_idx = int(len(unique_sessions) * 0.8)
+        if split_idx == 0 or split_idx == len(unique_sessions):
+            log_message(f"User {user} train/val session split empty, skipping.", level='error')
+            continue
+        in_train = np.isin(user_sessions, unique_sessions[:split_idx])
+        pos_train = start + np.flatnonzero(in_train)
+        pos_val = start + np.flatnonzero(~in_train)
+
+        # 负样本数量与正样本相同，训练/验证互不重叠
+        n_user = end - start
+        n_neg = len(pos_train) + len(pos_val)
+        if n_neg > n_rows - n_user:
+            log_message(f"User {user} has not enough negative samples, skipping.", level='error')
+            continue
+        neg = rng.choice(n_rows - n_user, size=n_neg, replace=False)
+        neg = np.where(neg >= start, neg + n_user, neg)
+        neg_train, neg_val = neg[:len(pos_train)], neg[len(pos_train):]
+
+        train_idx = np.concatenate([pos_train, neg_train])
+        val_idx = np.concatenate([pos_val, neg_val])
+        y_train = np.concatenate([np.ones(len(pos_train), dtype=int), np.zeros(len(neg_train), dtype=int)])
+        y_val = np.concatenate([np.ones(len(pos_val), dtype=int), np.zeros(len(neg_val), dtype=int)])
+
+        # 随机打乱
+        train_perm = rng.permutation(len(train_idx))
+        val_perm = rng.permutation(len(val_idx))
+        splits[user] = {
+            'train_idx': train_idx[train_perm],
+            'val_idx': val_idx[val_perm],
+            'y_train': y_train[train_perm],
+            'y_val': y_val[val_perm],
+        }
+
+    return splits
+
+def build_feature_matrix(data, feature_cols, order, out=None):
+    """逐列转换为float并按 order 重排写入矩阵（非数值/缺失/无穷值置0）"""
+    if out is None:
+        out = np.empty((len(order), len(feature_cols)), dtype=np.float64)
+    for j, col in enumerate(feature_cols):
+        out[:, j] = pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=float)[order]
+    np.nan_to_num(out, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return out
+
+# 工作进程中挂载的共享特征矩阵
+_shared_shm = None
+_shared_X = None
+
+def _init_shared_worker(shm_name, shape, dtype):
+    """工作进程初始化：按名称挂载共享内存中的特征矩阵（不复制）"""
+    global _shared_shm, _shared_X
+    _shared_shm = shared_memory.SharedMemory(name=shm_name)
+    _shared_X = np.ndarray(shape, dtype=dtype, buffer=_shared_shm.buf)
+
+def _train_user_from_shared(task):
+    """工作进程任务：按索引从共享矩阵切出单个用户的训练/验证数据并训练"""
+    user_id, split, feature_names, n_jobs = task
+    try:
+        return fit_user_model(
+            _shared_X[split['train_idx']], split['y_train'],
+            _shared_X[split['val_idx']], split['y_val'],
+            feature_names, user_id, n_jobs=n_jobs
+        )
+    except Exception as e:
+        log_message(f"Error training model for user {user_id}: {str(e)}", level='error')
+        return None
+
+def train_all_users_parallel(data, n_workers=None):
+    """多进程训练所有用户：完整特征矩阵只放入共享内存一次，各进程按索引切片训练
+
+    返回 (results, total_users)。
+    """
+    order, users, starts, ends = group_user_rows(data)
+    splits = build_user_splits(data, order, users, starts, ends)
+    total_users = len(splits)
+    if total_users == 0:
+        raise ValueError("No valid user data after processing")
+
+    feature_names = [col for col in data.columns if col not in ['user', 'session']]
+    shape = (len(order), len(feature_names))
+    X_shared, shm = create_shared_array(shape, np.float64)
+    try:
+        # 逐列写入共享矩阵，避免整表再复制一份
+        build_feature_matrix(data, feature_names, order, out=X_shared)
+
+        # 进程数 × 每进程XGBoost线程数不超过 training_thread_limit()（为采集/预测保留核心，与训练调度器预算一致）
+        thread_limit = training_thread_limit()
+        if n_workers is None:
+            n_workers = get_optimal_process_count()
+        n_workers = max(1, min(int(n_workers), total_users, thread_limit))
+        n_jobs = max(1, thread_limit // n_workers)
+        log_message(f"Parallel training: {total_users} users, {n_workers} workers x {n_jobs} threads, "
+                    f"shared matrix {shape[0]}x{shape[1]} ({X_shared.nbytes / 1024 / 1024:.1f}MB)")
+
+        tasks = [(user, split, feature_names, n_jobs) for user, split in splits.items()]
+        results = []
+        # spawn：父进程已导入xgboost并可能初始化了OpenMP线程池，fork后的子进程可能死锁；
+        # 子进程只接收共享内存段名与索引切片，不需要继承父进程状态
+        with mp.get_context('spawn').Pool(processes=n_workers, initializer=_init_shared_worker,
+                                          initargs=(shm.name, shape, X_shared.dtype.str)) as pool:
+            for i, result in enumerate(pool.imap_unordered(_train_user_from_shared, tasks), 1):
+                if result is not None:
+                    results.append(result)
+                    log_message(f"✓ Successfully trained model for user {result['user_id']} "
+                                f"({i}/{total_users}), AUC: {result['metrics']['auc']:.4f}")
+                else:
+                    log_message(f"✗ Training failed ({i}/{total_users})", level='error')
+        return results, total_users
+    finally:
+        del X_shared
+        shm.close()
+        shm.unlink()
+
 def save_models(results, performance_metrics):
     """保存模型和结果，results为每个用户的dict列表"""
     try:
@@ -910,21 +1041,18 @@ def save_models(results, performance_metrics):
             feature_names = r['feature_names']
             encoders = r.get('encoders')  # 获取编码器，如果不存在则为None
             
-            model_path = f'models/user_{user_id}_model.pkl'
-            scaler_path = f'models/user_{user_id}_scaler.pkl'
-            feature_path = f'models/user_{user_id}_features.pkl'
-            encoders_path = f'models/user_{user_id}_encoders.pkl'
-            
-            with open(model_path, 'wb') as f:
-                pickle.dump(model, f)
-            with open(scaler_path, 'wb') as f:
-                pickle.dump(scaler, f)
-            with open(feature_path, 'wb') as f:
-                pickle.dump(feature_names, f)
-            if encoders is not None:  # 如果存在编码器，则保存
-                with open(encoders_path, 'wb') as f:
-                    pickle.dump(encoders, f)
-            log_message(f"Saved model for user {user_id}")
+            # 单文件制品：模型二进制 + 特征名、标准化参数、编码器类别写入同一文件
+            metadata = {
+                'user_id': str(user_id),
+                'metrics': {k: float(v) for k, v in r.get('metrics', {}).items()},
+                'best_iteration': int(r['best_iteration']) if r.get('best_iteration') is not None else None,
+                'encoders': {col: np.asarray(le.classes_).tolist() for col, le in (encoders or {}).items()},
+            }
+            model_path = artifact_path('models', user_id)
+            # 此路径不校准阈值：不写入阈值，预测时使用配置的 prediction.anomaly_threshold
+            ModelArtifact.write(model_path, model, feature_names, scaler=scaler, threshold=None,
+                                metadata=metadata)
+            log_message(f"Saved model for user {user_id} to {model_path}")
         metrics_path = 'results/performance_metrics.pkl'
         with open(metrics_path, 'wb') as f:
             pickle.dump(performance_metrics, f)
@@ -1076,21 +1204,15 @@ def validate_data(data: pd.DataFrame, user_id: int) -> bool:
         return False
 
 def check_X_safe(X, user_id, stage):
-    # 检查inf
-    if np.isinf(X.values).any():
-        bad_cols = X.columns[np.isinf(X).any()].tolist()
-        log_message(f"User {user_id} {stage}: inf detected in columns: {bad_cols}", level='error')
-    # 检查nan
-    if np.isnan(X.values).any():
-        bad_cols = X.columns[np.isnan(X).any()].tolist()
-        log_message(f"User {user_id} {stage}: nan detected in columns: {bad_cols}", level='error')
-    # 检查极端大值
-    if (np.abs(X.values) > 1e12).any():
-        bad_cols = X.columns[(np.abs(X) > 1e12).any()].tolist()
+    # 单次清洗并统计各列的非有限值与超出范围的值
+    values, stats = sanitize_array(X.to_numpy(dtype=np.float64, na_value=np.nan), dtype=np.float64, report=True)
+    if stats['nonfinite'].any():
+        bad_cols = X.columns[stats['nonfinite'] > 0].tolist()
+        log_message(f"User {user_id} {stage}: inf/nan detected in columns: {bad_cols}", level='error')
+    if stats['clipped'].any():
+        bad_cols = X.columns[stats['clipped'] > 0].tolist()
         log_message(f"User {user_id} {stage}: extreme value detected in columns: {bad_cols}", level='error')
-    # 彻底清理
-    X = X.replace([np.inf, -np.inf], np.nan).fillna(0).clip(-1e6, 1e6)
-    return X
+    return pd.DataFrame(values, index=X.index, columns=X.columns)
 
 def load_data(filepath=None):
     """加载数据 - 兼容性函数"""
@@ -1194,41 +1316,15 @@ def preprocess_data(data):
             
             X = X[numeric_cols]
             
-            # 数据清理和验证
+            # 数据清理和验证：单次遍历完成 inf/nan 置0、裁剪到[-1e6, 1e6]与类型转换
             log_message("Cleaning and validating data...")
-            
-            # 处理无穷大值
-            if np.isinf(X.values).any():
-                log_message("Found infinite values, replacing with 0")
-                X = X.replace([np.inf, -np.inf], 0)
-            
-            # 处理NaN值
-            if X.isnull().any().any():
-                log_message("Found NaN values, filling with 0")
-                X = X.fillna(0)
-            
-            # 检查并处理异常值
-            for col in X.columns:
-                col_data = X[col]
-                if col_data.dtype in ['float64', 'float32']:
-                    # 计算分位数
-                    q99 = col_data.quantile(0.99)
-                    q01 = col_data.quantile(0.01)
-                    
-                    # 如果存在极端值，进行裁剪
-                    if q99 > 1e6 or q01 < -1e6:
-                        log_message(f"Column {col} has extreme values, clipping to reasonable range")
-                        X[col] = np.clip(X[col], -1e6, 1e6)
-                    
-                    # 检查是否有无穷大值
-                    if np.isinf(col_data.values).any():
-                        log_message(f"Column {col} has infinite values, replacing with 0")
-                        X[col] = col_data.replace([np.inf, -np.inf], 0)
-            
-            # 最终验证
-            X = X.astype(float)
-            X = X.replace([np.inf, -np.inf], 0)
-            X = X.fillna(0)
+            values, stats = sanitize_array(X.to_numpy(dtype=np.float64, na_value=np.nan),
+                                           dtype=np.float64, report=True)
+            if stats['nonfinite'].any():
+                log_message(f"Replaced {int(stats['nonfinite'].sum())} infinite/NaN values with 0")
+            if stats['clipped'].any():
+                log_message(f"Clipped extreme values in columns: {X.columns[stats['clipped'] > 0].tolist()}")
+            X = pd.DataFrame(values, index=X.index, columns=X.columns)
             
             log_message(f"Data preprocessed: {len(X)} records, {len(X.columns)} features")
             log_message(f"Feature columns: {list(X.columns)}")
@@ -1260,31 +1356,14 @@ def train_model(X_train, y_train, X_val=None, y_val=None, **kwargs):
         # 数据清理和验证
         log_message("Cleaning training data...")
         
-        # 检查并处理无穷大值
-        if np.isinf(X_train.values).any():
-            log_message("Found infinite values in training data, replacing with 0")
-            X_train = X_train.replace([np.inf, -np.inf], 0)
-        
-        # 检查并处理NaN值
-        if X_train.isnull().any().any():
-            log_message("Found NaN values in training data, filling with 0")
-            X_train = X_train.fillna(0)
-        
-        # 检查数据范围
-        for col in X_train.columns:
-            col_data = X_train[col]
-            if col_data.dtype in ['float64', 'float32']:
-                # 对于浮点数列，检查异常值
-                q99 = col_data.quantile(0.99)
-                q01 = col_data.quantile(0.01)
-                if q99 > 1e6 or q01 < -1e6:
-                    log_message(f"Column {col} has extreme values, clipping to reasonable range")
-                    X_train[col] = np.clip(X_train[col], -1e6, 1e6)
-        
-        # 确保所有值都是有限的
-        X_train = X_train.astype(float)
-        X_train = X_train.replace([np.inf, -np.inf], 0)
-        X_train = X_train.fillna(0)
+        # 单次遍历：inf/nan 置0、裁剪到[-1e6, 1e6]并转为浮点
+        values, stats = sanitize_array(X_train.to_numpy(dtype=np.float64, na_value=np.nan),
+                                       dtype=np.float64, report=True)
+        if stats['nonfinite'].any():
+            log_message(f"Replaced {int(stats['nonfinite'].sum())} infinite/NaN values in training data with 0")
+        if stats['clipped'].any():
+            log_message(f"Clipped extreme values in columns: {X_train.columns[stats['clipped'] > 0].tolist()}")
+        X_train = pd.DataFrame(values, index=X_train.index, columns=X_train.columns)
         
         log_message(f"Training data shape: {X_train.shape}")
         log_message(f"Training data range: {X_train.min().min():.2f} to {X_train.max().max():.2f}")
@@ -1311,6 +1390,196 @@ def train_model(X_train, y_train, X_val=None, y_val=None, **kwargs):
         log_message(f"Traceback: {traceback.format_exc()}", level='error')
         return None
 
+def train_model_arrays(X, y, feature_names=None, drop_duplicates=True, ref=None, sample_weight=None,
+                       clip_bounds=None, return_weights=False, **kwargs):
+    """内存训练接口：直接接收NumPy数组，单次清洗后训练，无需CSV落盘再读回
+
+    传入 ref（预先分箱的负样本 QuantileDMatrix）时直接复用其分位点切分，
+    跳过对本次训练数据的分位数草图计算；xgboost 版本不支持 QuantileDMatrix 时忽略 ref，按常规方式训练。sample_weight 为逐行样本权重（如难负样本挖掘的重要性权重）。
+    clip_bounds 为 compute_clip_bounds 的结果，训练数据按与预测时相同的逐列边界裁剪。
+    返回 (model, X_clean, y_clean)，后两者为实际参与训练的数据；return_weights 为真时
+    追加去重后与之对齐的样本权重（未给定 sample_weight 时为None）。
+    """
+    try:
+        log_message("Training model from in-memory arrays...")
+        bounds = clip_bounds or {}
+        X = sanitize_array(X, lower=bounds.get('lower'), upper=bounds.get('upper'))
+        y = np.asarray(y).ravel()
+        failed = (None, None, None, None) if return_weights else (None, None, None)
+        if len(X) != len(y):
+            log_message(f"Feature/label length mismatch: {len(X)} vs {len(y)}", level='error')
+            return failed
+        if sample_weight is not None:
+            sample_weight = np.asarray(sample_weight, dtype=float).ravel()
+
+        # 与preprocess_data一致：去除完全重复的样本（含标签）
+        if drop_duplicates:
+            keep = ~pd.DataFrame(X, copy=False).assign(_label=y).duplicated().to_numpy()
+            if not keep.all():
+                log_message(f"Removed {int((~keep).sum())} duplicate rows")
+                X, y = X[keep], y[keep]
+                if sample_weight is not None:
+                    sample_weight = sample_weight[keep]
+
+        log_message(f"Training data shape: {X.shape}")
+
+        params = {
+            'n_estimators': 100,
+            'max_depth': 6,
+            'learning_rate': 0.1,
+            'random_state': 42,
+            'missing': 0,
+            'n_jobs': training_thread_limit(),
+        }
+        params.update(kwargs)
+        model = xgb.XGBClassifier(**params)
+
+        if ref is not None and not QUANTILE_DMATRIX_AVAILABLE:
+            log_message("QuantileDMatrix requires xgboost>=1.7, training without the binning reference", level='warning')
+            ref = None
+        if ref is not None:
+            dtrain = xgb.QuantileDMatrix(
+                X, y, weight=sample_weight, ref=ref, missing=params['missing'],
+                feature_names=list(feature_names) if feature_names is not None else None
+            )
+            booster_params = model.get_xgb_params()
+            booster_params.update({'objective': 'binary:logistic', 'tree_method': 'hist'})
+            booster_params = {k: v for k, v in booster_params.items() if v is not None}
+            booster = xgb.train(booster_params, dtrain, num_boost_round=params['n_estimators'])
+            # 装回sklearn包装器，保持与fit训练出的模型相同的predict/predict_proba接口
+            model.load_model(bytearray(booster.save_raw(raw_format='ubj')))
+        # 以零拷贝DataFrame包装，保留特征名供后续按列名预测
+        elif feature_names is not None:
+            model.fit(pd.DataFrame(X, columns=list(feature_names), copy=False), y, sample_weight=sample_weight)
+        else:
+            model.fit(X, y, sample_weight=sample_weight)
+
+        log_message("Model training completed")
+        if return_weights:
+            return model, X, y, sample_weight
+        return model, X, y
+
+    except Exception as e:
+        log_message(f"Error training model from arrays: {str(e)}", level='error')
+        import traceback
+        log_message(f"Traceback: {traceback.format_exc()}", level='error')
+        return (None, None, None, None) if return_weights else (None, None, None)
+
+# 交叉验证工作进程中的标签、权重与模型参数（特征矩阵见 _shared_X）
+_cv_y = None
+_cv_weight = None
+_cv_params = None
+
+def _init_cv_worker(shm_name, shape, dtype, y, sample_weight, params):
+    """交叉验证工作进程初始化：挂载共享特征矩阵，标签/权重/参数每个进程只传一次"""
+    global _cv_y, _cv_weight, _cv_params
+    _init_shared_worker(shm_name, shape, dtype)
+    _cv_y, _cv_weight, _cv_params = y, sample_weight, params
+
+def _fit_cv_fold(X, y, sample_weight, params, train_idx, val_idx, n_jobs):
+    """训练单个折并返回 (验证集正类概率, 验证AUC, 耗时)"""
+    start = time.perf_counter()
+    model = xgb.XGBClassifier(**{**params, 'n_jobs': n_jobs})
+    model.fit(X[train_idx], y[train_idx],
+              sample_weight=sample_weight[train_idx] if sample_weight is not None else None)
+    proba = model.predict_proba(X[val_idx])[:, 1]
+    return proba, float(roc_auc_score(y[val_idx], proba)), time.perf_counter() - start
+
+def _cv_fold_from_shared(task):
+    """工作进程任务：按索引从共享矩阵切出一折的训练/验证数据"""
+    fold, train_idx, val_idx, n_jobs = task
+    return (fold,) + _fit_cv_fold(_shared_X, _cv_y, _cv_weight, _cv_params, train_idx, val_idx, n_jobs)
+
+def cross_validate_arrays(X, y, n_splits=3, sample_weight=None, max_rows=None, n_workers=None,
+                          memory_limit=None, min_parallel_cells=2_000_000, random_state=42, **kwargs):
+    """分层K折交叉验证：各折在独立进程中并行训练，特征矩阵只放入共享内存一次
+
+    进程数 × 每进程XGBoost线程数不超过 training_thread_limit()；给定 memory_limit 时
+    按每个进程约两份矩阵（切片 + 分箱数据）的占用进一步限制进程数。矩阵小于 min_parallel_cells 个元素时
+启动进程的开销（每个进程重新导入xgboost/sklearn，约数秒）超过收益，与只有一个进程时一样直接在当前进程中逐折训练；
+    在守护进程（如 TrainingGovernor 的训练子进程）中运行时同样逐折训练。
+    行数超过 max_rows 时先分层抽样再划分折，限制评估开销。
+    返回 (y_eval, oof_proba, summary)：参与评估的标签、各行的折外正类概率，
+    以及 {'n_splits', 'fold_auc', 'auc_mean', 'auc_std', 'fold_seconds', 'wall_time', 'n_workers', 'n_jobs', 'rows'}。
+    """
+    start = time.perf_counter()
+    X = sanitize_array(X)
+    y = np.asarray(y).ravel().astype(int)
+    if sample_weight is not None:
+        sample_weight = np.asarray(sample_weight, dtype=float).ravel()
+    if max_rows and len(X) > max_rows:
+        keep, _ = train_test_split(np.arange(len(X)), train_size=int(max_rows), stratify=y,
+                                   random_state=random_state)
+        keep.sort()
+        X, y = X[keep], y[keep]
+        if sample_weight is not None:
+            sample_weight = sample_weight[keep]
+
+    n_splits = int(min(n_splits, np.bincount(y, minlength=2).min()))
+    if n_splits < 2:
+        raise ValueError("Not enough samples per class for cross-validation")
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X, y))
+
+    params = {
+        'n_estimators': 100,
+        'max_depth': 6,
+        'learning_rate': 0.1,
+        'random_state': 42,
+        'missing': 0,
+    }
+    params.update(kwargs)
+
+    thread_limit = training_thread_limit()
+    n_workers = max(1, min(int(n_workers or thread_limit), n_splits, thread_limit))
+    if memory_limit:
+        n_workers = max(1, min(n_workers, int(memory_limit // max(1, 2 * X.nbytes))))
+    if X.size < min_parallel_cells:
+        n_workers = 1
+    if mp.current_process().daemon:
+        # 训练调度器的子进程是守护进程，不能再创建子进程：各折在当前进程中逐折训练
+        n_workers = 1
+    n_jobs = max(1, thread_limit // n_workers)
+
+    oof_proba = np.zeros(len(y), dtype=float)
+    fold_auc = [0.0] * n_splits
+    fold_seconds = [0.0] * n_splits
+    if n_workers == 1:
+        for fold, (train_idx, val_idx) in enumerate(folds):
+            oof_proba[val_idx], fold_auc[fold], fold_seconds[fold] = _fit_cv_fold(
+                X, y, sample_weight, params, train_idx, val_idx, n_jobs
+            )
+    else:
+        X_shared, shm = create_shared_array(X.shape, X.dtype)
+        try:
+            X_shared[...] = X
+            tasks = [(fold, train_idx, val_idx, n_jobs) for fold, (train_idx, val_idx) in enumerate(folds)]
+            # spawn：父进程可能已初始化OpenMP线程池（训练/搜索），fork后的子进程可能死锁
+            with mp.get_context('spawn').Pool(
+                    processes=n_workers, initializer=_init_cv_worker,
+                    initargs=(shm.name, X.shape, X.dtype.str, y, sample_weight, params)) as pool:
+                for fold, proba, auc, seconds in pool.imap_unordered(_cv_fold_from_shared, tasks):
+                    oof_proba[folds[fold][1]] = proba
+                    fold_auc[fold], fold_seconds[fold] = auc, seconds
+        finally:
+            del X_shared
+            shm.close()
+            shm.unlink()
+
+    summary = {
+        'n_splits': n_splits,
+        'fold_auc': [round(auc, 6) for auc in fold_auc],
+        'auc_mean': float(np.mean(fold_auc)),
+        'auc_std': float(np.std(fold_auc)),
+        'fold_seconds': [round(seconds, 3) for seconds in fold_seconds],
+        'wall_time': round(time.perf_counter() - start, 3),
+        'n_workers': n_workers,
+        'n_jobs': n_jobs,
+        'rows': int(len(y)),
+    }
+    log_message(f"Cross-validation: {n_splits} folds, {n_workers} workers x {n_jobs} threads, "
+                f"AUC {summary['auc_mean']:.4f} ± {summary['auc_std']:.4f}, wall time {summary['wall_time']:.2f}s")
+    return y, oof_proba, summary
+
 def save_model(model, filepath):
     """保存模型 - 兼容性函数"""
     try:
@@ -1330,83 +1599,69 @@ def save_model(model, filepath):
         log_message(f"Error saving model: {str(e)}", level='error')
         return False
 
-def main():
+def main(parallel=False, n_workers=None):
     """Main function to train models for all users."""
     try:
         # 设置日志记录
         logger = setup_logging()
         log_message("Starting main training process...")
         start_time = time.time()
-        log_message("Loading and preprocessing data...")
-        processed_user_data = load_and_split_data()
-        total_users = len(processed_user_data)
-        log_message(f"Data loaded and preprocessed for {total_users} users")
 
-        results = []
-        successful_training = 0
-        failed_training = 0
-        log_message("\n" + "="*50)
-        log_message("Starting model training for all users")
-        log_message("="*50)
+        if parallel:
+            # 并行模式：共享内存 + 多进程，每个进程训练一个用户
+            log_message("Loading data for parallel training...")
+            with open(DATA_PATH, 'rb') as f:
+                data = pickle.load(f)
+            log_message(f"Loaded {len(data)} records")
+            results, total_users = train_all_users_parallel(data, n_workers)
+            del data
+            successful_training = len(results)
+            failed_training = total_users - successful_training
+        else:
+            log_message("Loading and preprocessing data...")
+            processed_user_data = load_and_split_data()
+            total_users = len(processed_user_data)
+            log_message(f"Data loaded and preprocessed for {total_users} users")
 
-        for i, (user_id, data) in enumerate(processed_user_data.items(), 1):
-            log_message(f"\nProcessing user {user_id} ({i}/{total_users})")
-            log_message("-"*30)
-            try:
-                # 特征工程+特征选择+缩放
-                X_train, X_val = data['X_train'], data['X_val']
-                y_train, y_val = data['y_train'], data['y_val']
-                
-                # 先处理异常值
-                X_train = X_train.replace([np.inf, -np.inf], 0)
-                X_val = X_val.replace([np.inf, -np.inf], 0)
-                
-                # 方差阈值特征选择
-                selector = VarianceThreshold(threshold=0.01)
-                X_train_sel = selector.fit_transform(X_train)
-                X_val_sel = selector.transform(X_val)
-                feature_names = X_train.columns[selector.get_support()].tolist()
-                
-                # 标准化
-                scaler = StandardScaler()
-                X_train_scaled = scaler.fit_transform(X_train_sel)
-                X_val_scaled = scaler.transform(X_val_sel)
-                
-                # 转为DataFrame
-                X_train_final = pd.DataFrame(X_train_scaled, columns=feature_names)
-                X_val_final = pd.DataFrame(X_val_scaled, columns=feature_names)
-                
-                # 再次确保没有异常值
-                X_train_final = X_train_final.replace([np.inf, -np.inf], 0)
-                X_val_final = X_val_final.replace([np.inf, -np.inf], 0)
-                
-                # 训练模型
-                result = train_single_model(
-                    X_train_final, y_train.reset_index(drop=True),
-                    X_val_final, y_val.reset_index(drop=True),
-                    feature_names, scaler, user_id
-                )
-                if result is not None:
-                    results.append(result)
-                    successful_training += 1
-                    log_message(f"✓ Successfully trained model for user {user_id}")
-                    metrics = result['metrics']
-                    log_message("Model performance:")
-                    for metric, value in metrics.items():
-                        log_message(f"  - {metric.upper()}: {value:.4f}")
-                else:
+            results = []
+            successful_training = 0
+            failed_training = 0
+            log_message("\n" + "="*50)
+            log_message("Starting model training for all users")
+            log_message("="*50)
+
+            for i, (user_id, data) in enumerate(processed_user_data.items(), 1):
+                log_message(f"\nProcessing user {user_id} ({i}/{total_users})")
+                log_message("-"*30)
+                try:
+                    # 特征选择+缩放+训练
+                    X_train, X_val = data['X_train'], data['X_val']
+                    result = fit_user_model(
+                        X_train.to_numpy(), data['y_train'].to_numpy(),
+                        X_val.to_numpy(), data['y_val'].to_numpy(),
+                        X_train.columns.tolist(), user_id
+                    )
+                    if result is not None:
+                        results.append(result)
+                        successful_training += 1
+                        log_message(f"✓ Successfully trained model for user {user_id}")
+                        metrics = result['metrics']
+                        log_message("Model performance:")
+                        for metric, value in metrics.items():
+                            log_message(f"  - {metric.upper()}: {value:.4f}")
+                    else:
+                        failed_training += 1
+                        log_message(f"✗ Training failed for user {user_id}", level='error')
+                except Exception as e:
                     failed_training += 1
-                    log_message(f"✗ Training failed for user {user_id}", level='error')
-            except Exception as e:
-                failed_training += 1
-                log_message(f"✗ Error training model for user {user_id}: {str(e)}", level='error')
-                continue
-            progress = (i / total_users) * 100
-            log_message(f"\nOverall progress: {progress:.1f}%")
-            log_message(f"Successful: {successful_training}, Failed: {failed_training}")
-            if i % 5 == 0:
-                gc.collect()
-                log_message("Garbage collection completed")
+                    log_message(f"✗ Error training model for user {user_id}: {str(e)}", level='error')
+                    continue
+                progress = (i / total_users) * 100
+                log_message(f"\nOverall progress: {progress:.1f}%")
+                log_message(f"Successful: {successful_training}, Failed: {failed_training}")
+                if i % 5 == 0:
+                    gc.collect()
+                    log_message("Garbage collection completed")
         log_message("\n" + "="*50)
         log_message("Training Summary")
         log_message("="*50)
@@ -1440,4 +1695,9 @@ def main():
         log_message("Garbage collection completed")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Train per-user mouse behavior models")
+    parser.add_argument('--parallel', action='store_true', help='train users in parallel worker processes')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    args = parser.parse_args()
+    main(parallel=args.parallel, n_workers=args.workers) 
\ No newline at end of file
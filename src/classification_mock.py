@@ -83,6 +83,40 @@ def train_model(X_train, y_train, X_val=None, y_val=None, **kwargs):
         logger.error(f"模型训练失败: {e}")
         return None
 
+def sanitize_array(X, clip_value=1e6, dtype=np.float32, lower=None, upper=None, **kwargs):
+    """模拟的清洗函数：非有限值置0并裁剪"""
+    X = np.nan_to_num(np.asarray(X, dtype=dtype), nan=0.0, posinf=0.0, neginf=0.0)
+    low = -clip_value if lower is None else np.asarray(lower, dtype=dtype)
+    high = clip_value if upper is None else np.asarray(upper, dtype=dtype)
+    return np.clip(X, low, high)
+
+def compute_clip_bounds(X, quantile=0.001):
+    """模拟的裁剪边界函数（不计算边界）"""
+    return None
+
+def train_model_arrays(X, y, feature_names=None, drop_duplicates=True, sample_weight=None,
+                       return_weights=False, **kwargs):
+    """模拟的内存训练函数"""
+    logger.warning("使用模拟的train_model_arrays函数")
+    failed = (None, None, None, None) if return_weights else (None, None, None)
+
+    try:
+        X = np.nan_to_num(np.asarray(X, dtype=np.float32), nan=0.0, posinf=0.0, neginf=0.0)
+        y = np.asarray(y).ravel()
+        model = train_model(X, y)
+        if model is None:
+            return failed
+        return (model, X, y, sample_weight) if return_weights else (model, X, y)
+
+    except Exception as e:
+        logger.error(f"模型训练失败: {e}")
+        return failed
+
+def cross_validate_arrays(X, y, n_splits=3, **kwargs):
+    """模拟的交叉验证函数（不可用）"""
+    logger.warning("使用模拟的cross_validate_arrays函数，跳过交叉验证")
+    return None, None, None
+
 def evaluate_model(y_true, y_pred, y_pred_proba):
     """模拟的模型评估函数"""
     logger.warning("使用模拟的evaluate_model函数")
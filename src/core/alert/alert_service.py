@@ -15,6 +15,7 @@ sys.path.insert(0, str(project_root))
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.database.schema_migrations import ensure_schema, normalize_user_id
 
 # Windows API导入
 try:
@@ -43,6 +44,7 @@ class AlertService:
         self.logger = Logger()
         self.config = ConfigLoader()
         self.db_path = Path(self.config.get_paths()['data']) / 'mouse_data.db'
+        ensure_schema(self.db_path)
         
         # 告警配置
         self.alert_config = self.config.get_alert_config()
@@ -454,26 +456,12 @@ class AlertService:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # 创建告警表（如果不存在）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS alerts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    alert_type TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    severity TEXT NOT NULL,
-                    data TEXT,
-                    timestamp REAL NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
             # 插入告警记录
             cursor.execute('''
                 INSERT INTO alerts (user_id, alert_type, message, severity, data, timestamp)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (
-                user_id,
+                normalize_user_id(user_id),
                 alert_type,
                 message,
                 severity,
@@ -7,6 +7,8 @@ from pathlib import Path
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.database.schema_migrations import SchemaMigrator, normalize_user_id
+from src.core.data_collector.sample_rate_meter import SampleRateMeter
 
 try:
     from pynput import mouse
@@ -29,7 +31,7 @@ class LinuxMouseCollector:
         self.logger = Logger()
         self.config = ConfigLoader()
 
-        self.user_id = user_id
+        self.user_id = normalize_user_id(user_id)
         self.session_id = None
         self.is_collecting = False
         self.collection_thread = None
@@ -43,6 +45,8 @@ class LinuxMouseCollector:
         data_collection_config = self.config.get_data_collection_config()
         self.interval = data_collection_config.get('collection_interval', 0.1)
         self.max_buffer_size = data_collection_config.get('max_buffer_size', 10000)
+        # 采样速率统计，供训练资源调度检测采集是否被拖慢
+        self.rate_meter = SampleRateMeter(self.interval)
         target = data_collection_config.get('target_samples_per_session', None)
         try:
             self.target_samples = int(target) if target is not None else None
@@ -53,29 +57,12 @@ class LinuxMouseCollector:
         self._mouse_controller = Controller() if PYNPUT_AVAILABLE else None
         self._mouse_listener = None
         self._last_position = None
+        # 事件监听者（如流式检测管道），每个事件进入缓冲区时同步通知
+        self._event_listeners = []
 
     def _init_database(self):
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mouse_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    session_id TEXT NOT NULL,
-                    timestamp REAL NOT NULL,
-                    x INTEGER NOT NULL,
-                    y INTEGER NOT NULL,
-                    event_type TEXT NOT NULL,
-                    button TEXT,
-                    wheel_delta INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_session ON mouse_events(user_id, session_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON mouse_events(timestamp)')
-            conn.commit()
-            conn.close()
+            SchemaMigrator(self.db_path).migrate()
         except Exception as e:
             self.logger.error(f"数据库初始化失败: {str(e)}")
             raise
@@ -130,6 +117,7 @@ class LinuxMouseCollector:
                     'wheel_delta': 0
                 }
                 buffer.append(event)
+                self._publish_event(event)
             except Exception:
                 pass
 
@@ -146,6 +134,7 @@ class LinuxMouseCollector:
                     'wheel_delta': int(dy)
                 }
                 buffer.append(event)
+                self._publish_event(event)
             except Exception:
                 pass
 
@@ -173,7 +162,9 @@ class LinuxMouseCollector:
                         'wheel_delta': 0
                     }
                     buffer.append(event)
+                    self._publish_event(event)
                     total_collected += 1
+                    self.rate_meter.record()
 
                     # 保存条件
                     if len(buffer) >= self.max_buffer_size or (time.time() - last_save_time) >= save_interval:
@@ -203,6 +194,22 @@ class LinuxMouseCollector:
                 except Exception:
                     pass
 
+    def add_event_listener(self, listener):
+        """注册事件监听者 listener(event)；监听者应当立即返回（如只做入队）"""
+        if listener not in self._event_listeners:
+            self._event_listeners.append(listener)
+
+    def remove_event_listener(self, listener):
+        if listener in self._event_listeners:
+            self._event_listeners.remove(listener)
+
+    def _publish_event(self, event):
+        for listener in self._event_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                self.logger.error(f"事件监听者处理失败: {str(e)}")
+
     def _save_events_to_db(self, events):
         if not events:
             return
@@ -222,6 +229,10 @@ class LinuxMouseCollector:
         except Exception as e:
             self.logger.error(f"保存事件数据失败: {str(e)}")
 
+    def get_sample_rate_deficit(self):
+        """最近采样速率相对配置速率的缺口比例"""
+        return self.rate_meter.get_deficit()
+
     def get_collection_status(self):
         try:
             status = {
@@ -0,0 +1,46 @@
+import threading
+import time
+
+
+class SampleRateMeter:
+    """按固定时间窗口统计采样速率，供训练资源调度判断采集是否被拖慢"""
+
+    def __init__(self, expected_interval, window_seconds=5.0):
+        self.expected_rate = 1.0 / expected_interval if expected_interval and expected_interval > 0 else None
+        self.window_seconds = window_seconds
+        self._lock = threading.Lock()
+        self._window_start = None
+        self._window_count = 0
+        self._last_rate = None
+        self._last_update = None
+
+    def record(self, count=1):
+        """采集循环每取得一个样本调用一次"""
+        now = time.time()
+        with self._lock:
+            if self._window_start is None:
+                self._window_start = now
+            self._window_count += count
+            elapsed = now - self._window_start
+            if elapsed >= self.window_seconds:
+                self._last_rate = self._window_count / elapsed
+                self._last_update = now
+                self._window_start = now
+                self._window_count = 0
+
+    def get_rate(self):
+        """最近一个完整窗口的采样速率（样本/秒），尚无完整窗口时返回None"""
+        with self._lock:
+            return self._last_rate
+
+    def get_deficit(self):
+        """采样速率相对配置速率的缺口比例（0表示达标，0.3表示少采30%）
+
+        超过两个窗口未更新（采集已停止）时视为没有缺口。
+        """
+        with self._lock:
+            if self.expected_rate is None or self._last_rate is None:
+                return 0.0
+            if time.time() - self._last_update > self.window_seconds * 2:
+                return 0.0
+            return max(0.0, 1.0 - self._last_rate / self.expected_rate)
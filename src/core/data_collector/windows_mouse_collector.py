@@ -17,6 +17,8 @@ except ImportError:
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.database.schema_migrations import SchemaMigrator, normalize_user_id
+from src.core.data_collector.sample_rate_meter import SampleRateMeter
 
 class WindowsMouseCollector:
     def __init__(self, user_id):
@@ -26,10 +28,14 @@ class WindowsMouseCollector:
         self.logger.debug("=== WindowsMouseCollector 初始化开始 ===")
         self.logger.debug(f"参数 - user_id: {user_id}")
         
-        self.user_id = user_id
+        self.user_id = normalize_user_id(user_id)
         self.session_id = None
         self.is_collecting = False
         self.collection_thread = None
+        # 采样速率统计，供训练资源调度检测采集是否被拖慢
+        self.rate_meter = SampleRateMeter(self.config.get_data_collection_config().get('collection_interval', 0.1))
+        # 事件监听者（如流式检测管道），每个事件进入缓冲区时同步通知
+        self._event_listeners = []
         
         # 数据库连接 - 使用配置文件中的数据库路径
         self.db_path = Path(self.config.get_paths()['database'])
@@ -48,48 +54,9 @@ class WindowsMouseCollector:
         
         try:
             self.logger.debug(f"数据库路径: {self.db_path}")
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            # 创建鼠标事件表
-            self.logger.debug("创建鼠标事件表...")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mouse_events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    session_id TEXT NOT NULL,
-                    timestamp REAL NOT NULL,
-                    x INTEGER NOT NULL,
-                    y INTEGER NOT NULL,
-                    event_type TEXT NOT NULL,
-                    button TEXT,
-                    wheel_delta INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 创建特征表（如果不存在）
-            self.logger.debug("创建特征表...")
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS features (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    session_id TEXT NOT NULL,
-                    timestamp REAL NOT NULL,
-                    feature_vector TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 创建索引
-            self.logger.debug("创建数据库索引...")
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_session ON mouse_events(user_id, session_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON mouse_events(timestamp)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_user_session ON features(user_id, session_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_timestamp ON features(timestamp)')
-            
-            conn.commit()
-            conn.close()
+            # 表结构与索引统一由迁移模块维护
+            version = SchemaMigrator(self.db_path).migrate()
+            self.logger.debug(f"数据库结构版本: {version}")
             
             self.logger.debug("数据库初始化完成")
             self.logger.debug("=== 数据库初始化结束 ===")
@@ -209,7 +176,9 @@ class WindowsMouseCollector:
                     
                     # 添加到缓冲区
                     buffer.append(event_data)
+                    self._publish_event(event_data)
                     total_collected += 1
+                    self.rate_meter.record()
                     
                     # 检查是否需要保存数据
                     if len(buffer) >= max_buffer_size or (time.time() - last_save_time) >= save_interval:
@@ -251,6 +220,22 @@ class WindowsMouseCollector:
             self.logger.error(f"数据采集循环严重异常: {str(e)}")
             self.logger.debug(f"异常详情: {traceback.format_exc()}")
 
+    def add_event_listener(self, listener):
+        """注册事件监听者 listener(event)；监听者应当立即返回（如只做入队）"""
+        if listener not in self._event_listeners:
+            self._event_listeners.append(listener)
+
+    def remove_event_listener(self, listener):
+        if listener in self._event_listeners:
+            self._event_listeners.remove(listener)
+
+    def _publish_event(self, event):
+        for listener in self._event_listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                self.logger.error(f"事件监听者处理失败: {str(e)}")
+
     def _save_events_to_db(self, events):
         """保存事件数据到数据库"""
         self.logger.debug(f"=== 保存事件数据到数据库 ===")
@@ -290,6 +275,10 @@ class WindowsMouseCollector:
             self.logger.error(f"保存事件数据失败: {str(e)}")
             self.logger.debug(f"异常详情: {traceback.format_exc()}")
 
+    def get_sample_rate_deficit(self):
+        """最近采样速率相对配置速率的缺口比例"""
+        return self.rate_meter.get_deficit()
+
     def get_session_data(self, session_id=None):
         """获取会话数据"""
         self.logger.debug("=== 获取会话数据 ===")
@@ -0,0 +1,294 @@
+import re
+import sqlite3
+import time
+from pathlib import Path
+import sys
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+
+
+# 版本化迁移：(版本号, 说明, SQL语句列表)，只追加，不修改已发布的条目
+MIGRATIONS = [
+    (1, '基础表结构', [
+        '''
+        CREATE TABLE IF NOT EXISTS mouse_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            button TEXT,
+            wheel_delta INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS features (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            session_id TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            feature_vector TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            prediction INTEGER NOT NULL,
+            anomaly_score REAL NOT NULL,
+            is_normal BOOLEAN NOT NULL,
+            probability REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS alerts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            alert_type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            data TEXT,
+            timestamp REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_user_session ON mouse_events(user_id, session_id)',
+        'CREATE INDEX IF NOT EXISTS idx_timestamp ON mouse_events(timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_features_user_session ON features(user_id, session_id)',
+        'CREATE INDEX IF NOT EXISTS idx_features_timestamp ON features(timestamp)',
+    ]),
+    (2, '负样本池表', [
+        '''
+        CREATE TABLE IF NOT EXISTS negative_pool (
+            source_user_id TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            feature_id INTEGER,
+            feature_vector TEXT NOT NULL,
+            PRIMARY KEY (source_user_id, slot)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS negative_pool_stats (
+            source_user_id TEXT PRIMARY KEY,
+            seen_count INTEGER NOT NULL DEFAULT 0
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS negative_pool_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''',
+    ]),
+    (3, '用户ID规范化与(user_id, timestamp)复合索引', [
+        # 历史数据中的用户ID可能带首尾空白，规范化后查询可直接比较 user_id 而无需 TRIM()
+        'UPDATE mouse_events SET user_id = TRIM(user_id) WHERE user_id != TRIM(user_id)',
+        'UPDATE features SET user_id = TRIM(user_id) WHERE user_id != TRIM(user_id)',
+        'UPDATE predictions SET user_id = TRIM(user_id) WHERE user_id != TRIM(user_id)',
+        'UPDATE alerts SET user_id = TRIM(user_id) WHERE user_id != TRIM(user_id)',
+        'CREATE INDEX IF NOT EXISTS idx_mouse_events_user_timestamp ON mouse_events(user_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_mouse_events_user_session_timestamp ON mouse_events(user_id, session_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_features_user_timestamp ON features(user_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_predictions_user_timestamp ON predictions(user_id, timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_alerts_user_timestamp ON alerts(user_id, timestamp)',
+        # 已被上面复合索引的前缀覆盖的冗余索引（含旧版 optimize_system 创建的）
+        'DROP INDEX IF EXISTS idx_user_session',
+        'DROP INDEX IF EXISTS idx_features_user',
+        'DROP INDEX IF EXISTS idx_mouse_events_session',
+    ]),
+    (4, '特征分位数草图表', [
+        '''
+        CREATE TABLE IF NOT EXISTS feature_sketches (
+            user_id TEXT NOT NULL,
+            feature TEXT NOT NULL,
+            sketch TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL,
+            PRIMARY KEY (user_id, feature)
+        )
+        ''',
+    ]),
+    (5, '预测水位线表与(user_id, id)索引', [
+        '''
+        CREATE TABLE IF NOT EXISTS prediction_watermarks (
+            user_id TEXT PRIMARY KEY,
+            last_feature_id INTEGER NOT NULL,
+            last_timestamp REAL,
+            updated_at REAL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_features_user_id ON features(user_id, id)',
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# 查询计划描述中使用的索引名，如 "SEARCH features USING COVERING INDEX idx_x (user_id=?)"
+_PLAN_INDEX = re.compile(r'\bINDEX (\w+)')
+
+# 热点查询及其期望使用的索引（索引名或可接受的索引名元组），用于 EXPLAIN QUERY PLAN 回归检查
+HOT_QUERIES = {
+    'features_by_user': (
+        'SELECT feature_vector, timestamp FROM features WHERE user_id = ? ORDER BY timestamp DESC',
+        ('user',), 'idx_features_user_timestamp'
+    ),
+    'features_other_users': (
+        'SELECT feature_vector FROM features WHERE user_id != ? ORDER BY timestamp DESC LIMIT 1000',
+        ('user',), 'idx_features_timestamp'
+    ),
+    'features_training_sample': (
+        'SELECT feature_vector FROM features WHERE user_id >= ? AND user_id < ? LIMIT 1',
+        # 前缀区间可由 (user_id, id) 或 (user_id, timestamp) 索引满足，由查询规划器择一
+        ('training_user', 'training_uses'), ('idx_features_user_id', 'idx_features_user_timestamp')
+    ),
+    'features_new_for_user': (
+        'SELECT id, feature_vector, timestamp FROM features WHERE user_id = ? AND id > ? ORDER BY id LIMIT 50',
+        ('user', 0), 'idx_features_user_id'
+    ),
+    'mouse_events_by_session': (
+        'SELECT timestamp, x, y FROM mouse_events WHERE user_id = ? AND session_id = ? ORDER BY timestamp',
+        ('user', 'session'), 'idx_mouse_events_user_session_timestamp'
+    ),
+    'predictions_by_user': (
+        'SELECT * FROM predictions WHERE user_id = ? ORDER BY timestamp DESC LIMIT 100',
+        ('user',), 'idx_predictions_user_timestamp'
+    ),
+    'predictions_recent_count': (
+        'SELECT COUNT(*) FROM predictions WHERE user_id = ? AND timestamp > ?',
+        ('user', 0.0), 'idx_predictions_user_timestamp'
+    ),
+    'alerts_recent_count': (
+        'SELECT COUNT(*) FROM alerts WHERE user_id = ? AND timestamp > ?',
+        ('user', 0.0), 'idx_alerts_user_timestamp'
+    ),
+}
+
+
+def normalize_user_id(user_id):
+    """写入前规范化用户ID（去除首尾空白），与迁移3对历史数据的处理一致，查询可直接比较 user_id"""
+    return str(user_id).strip()
+
+
+def prefix_bounds(prefix):
+    """将前缀匹配转换为可走索引的区间 [lower, upper)，替代 LIKE 'prefix%'"""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SchemaMigrator:
+    """数据库结构迁移：统一维护所有表与索引，按 PRAGMA user_version 逐版本升级"""
+
+    def __init__(self, db_path=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        if db_path is None:
+            paths_config = self.config.get_paths()
+            if 'database' in paths_config and paths_config['database']:
+                db_path = Path(paths_config['database'])
+            else:
+                db_path = Path(paths_config['data']) / 'mouse_data.db'
+        self.db_path = Path(db_path)
+
+    def get_version(self):
+        """读取数据库当前的结构版本"""
+        if not self.db_path.exists():
+            return 0
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            return conn.execute('PRAGMA user_version').fetchone()[0]
+        finally:
+            conn.close()
+
+    def migrate(self):
+        """执行所有未应用的迁移，返回迁移后的版本号"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), isolation_level=None, timeout=30)
+        try:
+            current = conn.execute('PRAGMA user_version').fetchone()[0]
+            if current >= SCHEMA_VERSION:
+                return current
+
+            for version, description, statements in MIGRATIONS:
+                # 每个版本一个事务；进入写事务后重新读取版本，避免多进程重复迁移
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    current = conn.execute('PRAGMA user_version').fetchone()[0]
+                    if version <= current:
+                        conn.execute('COMMIT')
+                        continue
+                    start_time = time.time()
+                    for statement in statements:
+                        conn.execute(statement)
+                    conn.execute(f'PRAGMA user_version = {int(version)}')
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                self.logger.info(
+                    f"数据库迁移到版本 {version}（{description}），耗时 {time.time() - start_time:.2f}s"
+                )
+
+            return SCHEMA_VERSION
+        finally:
+            conn.close()
+
+    def check_query_plans(self):
+        """对热点查询执行 EXPLAIN QUERY PLAN，返回 {查询名: (是否命中期望索引, 计划描述)}"""
+        results = {}
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            for name, (query, params, expected_index) in HOT_QUERIES.items():
+                plan = conn.execute(f'EXPLAIN QUERY PLAN {query}', params).fetchall()
+                details = [row[-1] for row in plan]
+                # 期望索引名精确匹配，避免 idx_features_user 之类的前缀误命中其他索引
+                expected = {expected_index} if isinstance(expected_index, str) else set(expected_index)
+                used = {match.group(1) for detail in details for match in _PLAN_INDEX.finditer(detail)}
+                uses_index = bool(used & expected)
+                full_scan = any(
+                    detail.startswith('SCAN ') and 'INDEX' not in detail for detail in details
+                )
+                ok = uses_index and not full_scan
+                results[name] = (ok, '; '.join(details))
+                if not ok:
+                    self.logger.warning(f"查询计划回退: {name} -> {'; '.join(details)}")
+        finally:
+            conn.close()
+        return results
+
+
+def ensure_schema(db_path=None):
+    """启动时调用：确保数据库结构为最新版本"""
+    return SchemaMigrator(db_path).migrate()
+
+
+def suspend_indexes(cursor, table):
+    """批量写入前删除表上的二级索引，返回用于恢复的 (索引名, 建索引语句) 列表"""
+    cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,)
+    )
+    saved = cursor.fetchall()
+    for name, _ in saved:
+        cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+    return saved
+
+
+def restore_indexes(cursor, saved_indexes):
+    """重建 suspend_indexes 删除的索引（已存在的跳过，可重复调用）"""
+    for name, sql in saved_indexes:
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+        ).fetchone()
+        if not exists:
+            cursor.execute(sql)
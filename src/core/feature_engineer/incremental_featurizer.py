@@ -0,0 +1,105 @@
+import time
+from pathlib import Path
+import sys
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.feature_engineer.simple_feature_processor import (
+    EVENT_COLUMNS, CUMULATIVE_FEATURES, extract_event_features, aggregate_features
+)
+
+# 每个会话保留的历史事件数：逐事件特征最多回看19行（10行滚动统计叠加10行滚动与一次差分），
+# 带上这些历史后，新窗口内每行的特征与对完整会话批量计算的结果一致
+CONTEXT_ROWS = 32
+
+
+class _SessionState:
+    """单个采集会话的增量状态"""
+
+    def __init__(self):
+        self.context = []   # 上一窗口末尾的原始事件
+        self.anchor = None  # context 首行在完整会话中的累计特征与会话起点
+        self.pending = []   # 当前窗口已到达的原始事件
+        self.last_seen = time.time()
+
+
+class IncrementalFeaturizer:
+    """增量窗口特征提取：事件逐条加入，凑满 window_size 条时只处理这个窗口（附带少量历史事件）
+
+    窗口划分、逐事件特征与聚合结果与 SimpleFeatureProcessor.process_features 对同一会话的批量处理一致，
+    无需回读数据库中的历史事件；target_features 给出时按训练数据的特征列对齐（缺失列补0）。
+    """
+
+    def __init__(self, window_size=None, target_features=None, feature_config=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        if window_size is None:
+            window_size = self.config.get_prediction_config().get('window_size', 100)
+        self.window_size = int(window_size)
+        self.feature_config = feature_config if feature_config is not None else self.config.get_feature_config()
+        self.target_features = target_features
+        self._sessions = {}
+
+    def add_event(self, event):
+        """加入一条采集事件（采集器的事件字典）；窗口因此关闭时返回该窗口的单行特征DataFrame，否则返回None"""
+        x, y = event['x'], event['y']
+        # 与 remove_outlier 一致：异常坐标不计入窗口
+        if not (x < 65535 and y < 65535):
+            return None
+
+        key = (event.get('user_id'), event.get('session_id'))
+        state = self._sessions.get(key)
+        if state is None:
+            state = self._sessions[key] = _SessionState()
+        state.last_seen = time.time()
+        state.pending.append((event['timestamp'], x, y, event.get('button'),
+                              event.get('event_type'), event.get('event_type')))
+        if len(state.pending) < self.window_size:
+            return None
+        return self._close_window(state)
+
+    def _close_window(self, state):
+        window = state.pending
+        state.pending = []
+        events = state.context + window
+
+        frame = pd.DataFrame.from_records(events, columns=EVENT_COLUMNS)
+        frame = extract_event_features(frame, self.feature_config, state.anchor)
+        window_df = frame.iloc[len(state.context):]
+
+        # 保留窗口末尾的事件及其累计特征，供下一个窗口接续；
+        # 历史首行不能是滚动事件（其位置要由更早的事件填充）
+        start = max(len(frame) - CONTEXT_ROWS, 0)
+        while start > 0 and events[start][3] == 'Scroll':
+            start -= 1
+        origin = state.anchor['origin'] if state.anchor else (frame['x'].iloc[0], frame['y'].iloc[0])
+        state.context = events[start:]
+        state.anchor = {col: frame[col].iloc[start] for col in CUMULATIVE_FEATURES if col in frame.columns}
+        state.anchor['origin'] = origin
+
+        # 与批量处理一致：过小的窗口不生成特征
+        if len(window_df) < 10:
+            return None
+        features = aggregate_features(window_df)
+        if features.empty:
+            return None
+        features['window_start_time'] = window_df['client timestamp'].iloc[0]
+        features['window_end_time'] = window_df['client timestamp'].iloc[-1]
+        features['window_size'] = len(window_df)
+        if self.target_features:
+            features = features.reindex(columns=self.target_features, fill_value=0.0)
+        return features
+
+    def drop_idle_sessions(self, max_idle):
+        """丢弃超过 max_idle 秒没有新事件的会话状态（未凑满的窗口随之丢弃），返回丢弃的会话数"""
+        cutoff = time.time() - max_idle
+        idle = [key for key, state in self._sessions.items() if state.last_seen < cutoff]
+        for key in idle:
+            del self._sessions[key]
+        return len(idle)
@@ -13,6 +13,9 @@ sys.path.insert(0, str(project_root))
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.negative_sample_pool import NegativeSamplePool
+from src.core.model_trainer.feature_sketch import FeatureSketchStore
+from src.core.database.schema_migrations import prefix_bounds, normalize_user_id
 
 # 移除对已删除的feature_engineering模块的导入
 # try:
@@ -65,11 +68,21 @@ def add_velocity_features(df):
         df['avg_velocity'] = df['velocity'].rolling(window=10, min_periods=1).mean()
     return df
 
-def add_trajectory_features(df):
-    """添加轨迹特征"""
+def add_trajectory_features(df, anchor=None):
+    """添加轨迹特征
+
+    anchor 用于接续之前的数据（增量处理）：给出 df 首行在完整会话中的累计距离 total_distance
+    以及会话起点 origin=(x, y)，结果与对完整会话一次性计算一致。
+    """
     if 'distance_from_previous' in df.columns:
         df['total_distance'] = df['distance_from_previous'].cumsum()
-        df['straight_line_distance'] = np.sqrt((df['x'] - df['x'].iloc[0])**2 + (df['y'] - df['y'].iloc[0])**2)
+        origin = (df['x'].iloc[0], df['y'].iloc[0])
+        if anchor:
+            # 会话首行没有前一记录，其累计距离为NaN，之后的累计从0开始
+            df['total_distance'] += 0.0 if pd.isna(anchor['total_distance']) else anchor['total_distance']
+            df.loc[df.index[0], 'total_distance'] = anchor['total_distance']
+            origin = anchor['origin']
+        df['straight_line_distance'] = np.sqrt((df['x'] - origin[0])**2 + (df['y'] - origin[1])**2)
         df['efficiency'] = df['straight_line_distance'] / (df['total_distance'] + 1e-6)
     return df
 
@@ -84,18 +97,27 @@ def add_temporal_features(df):
 
 def add_statistical_features(df):
     """添加统计特征"""
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
+    numeric_cols = [col for col in df.select_dtypes(include=[np.number]).columns
+                    if col not in ['x', 'y', 'client timestamp']]
+    if not numeric_cols:
+        return df
+    # 所有列一次滚动计算并一次性拼接，避免逐列插入
+    rolling = df[numeric_cols].rolling(window=10, min_periods=1)
+    means, stds = rolling.mean(), rolling.std()
+    stats = {}
     for col in numeric_cols:
-        if col not in ['x', 'y', 'client timestamp']:
-            df[f'{col}_rolling_mean'] = df[col].rolling(window=10, min_periods=1).mean()
-            df[f'{col}_rolling_std'] = df[col].rolling(window=10, min_periods=1).std()
-    return df
+        stats[f'{col}_rolling_mean'] = means[col]
+        stats[f'{col}_rolling_std'] = stds[col]
+    return pd.concat([df, pd.DataFrame(stats, index=df.index)], axis=1)
 
-def add_interaction_features(df):
-    """添加交互特征"""
+def add_interaction_features(df, anchor=None):
+    """添加交互特征（anchor 给出 df 首行在完整会话中的累计点击/滚动次数，用于增量处理）"""
     if 'button' in df.columns and 'state' in df.columns:
         df['click_count'] = ((df['state'] == 'Pressed') & (df['button'].isin(['Left', 'Right']))).cumsum()
         df['scroll_count'] = (df['button'] == 'Scroll').cumsum()
+        if anchor:
+            for col in ('click_count', 'scroll_count'):
+                df[col] += anchor[col] - df[col].iloc[0]
     return df
 
 def add_geometric_features(df):
@@ -120,14 +142,16 @@ def aggregate_features(df):
     # 计算聚合特征
     agg_features = {}
     
-    # 基本统计
-    numeric_cols = df.select_dtypes(include=[np.number]).columns
-    for col in numeric_cols:
-        if col not in ['x', 'y', 'client timestamp']:
-            agg_features[f'{col}_mean'] = df[col].mean()
-            agg_features[f'{col}_std'] = df[col].std()
-            agg_features[f'{col}_min'] = df[col].min()
-            agg_features[f'{col}_max'] = df[col].max()
+    # 基本统计（所有数值列一次计算）
+    numeric_cols = [col for col in df.select_dtypes(include=[np.number]).columns
+                    if col not in ['x', 'y', 'client timestamp']]
+    if numeric_cols:
+        numeric = df[numeric_cols]
+        stats = {'mean': numeric.mean().to_dict(), 'std': numeric.std().to_dict(),
+                 'min': numeric.min().to_dict(), 'max': numeric.max().to_dict()}
+        for col in numeric_cols:
+            for stat in ('mean', 'std', 'min', 'max'):
+                agg_features[f'{col}_{stat}'] = stats[stat][col]
     
     # 事件统计
     if 'button' in df.columns:
@@ -142,6 +166,41 @@ def aggregate_features(df):
     
     return pd.DataFrame([agg_features])
 
+# 与 load_data_from_db 返回格式一致的原始事件列
+EVENT_COLUMNS = ['client timestamp', 'x', 'y', 'button', 'state', 'event_type']
+
+# 累计类特征：增量处理时需要接续之前的值
+CUMULATIVE_FEATURES = ('total_distance', 'click_count', 'scroll_count')
+
+def extract_event_features(df, feature_config, anchor=None):
+    """逐事件的预处理与特征提取（聚合前的全部步骤）
+
+    anchor 为 df 首行在完整会话中的累计特征值与会话起点（见 add_trajectory_features），
+    增量处理时传入，批量处理时为None。
+    """
+    # 1. 数据预处理
+    df = remove_outlier(df)
+    df = fill_in_scroll(df)
+    df = change_from_prev_rec(df)
+    df = classify_categ(df)
+    
+    # 2. 特征提取 (根据配置选择)
+    if feature_config.get('velocity_features', True):
+        df = add_velocity_features(df)
+    if feature_config.get('trajectory_features', True):
+        df = add_trajectory_features(df, anchor)
+    if feature_config.get('temporal_features', True):
+        df = add_temporal_features(df)
+    if feature_config.get('statistical_features', True):
+        df = add_statistical_features(df)
+    if feature_config.get('interaction_features', True):
+        df = add_interaction_features(df, anchor)
+    if feature_config.get('geometric_features', True):
+        df = add_geometric_features(df)
+    if feature_config.get('advanced_features', True):
+        df = add_advanced_features(df)
+    return df
+
 FEATURE_ENGINEERING_AVAILABLE = True
 
 class SimpleFeatureProcessor:
@@ -149,12 +208,32 @@ class SimpleFeatureProcessor:
         self.logger = Logger()
         self.config = ConfigLoader()
         self.db_path = Path(self.config.get_paths()['data']) / 'mouse_data.db'
+        self.negative_pool = NegativeSamplePool(self.db_path)
+        self.feature_sketches = FeatureSketchStore(self.db_path)
+        # 新窗口监听者 listener(user_id, count)，如连续预测的调度器
+        self._window_listeners = []
         
         if not FEATURE_ENGINEERING_AVAILABLE:
             self.logger.error("feature_engineering模块不可用，特征处理功能受限")
         
         self.logger.info("简单特征处理器初始化完成")
 
+    def add_window_listener(self, listener):
+        """注册新窗口监听者 listener(user_id, count)；特征提交到数据库后调用，监听者应当立即返回"""
+        if listener not in self._window_listeners:
+            self._window_listeners.append(listener)
+
+    def remove_window_listener(self, listener):
+        if listener in self._window_listeners:
+            self._window_listeners.remove(listener)
+
+    def _publish_windows(self, user_id, count):
+        for listener in self._window_listeners:
+            try:
+                listener(user_id, count)
+            except Exception as e:
+                self.logger.error(f"新窗口监听者处理失败: {str(e)}")
+
     def load_data_from_db(self, user_id, session_id=None):
         """从数据库加载鼠标数据，格式与feature_engineering期望的输入格式一致"""
         try:
@@ -187,30 +266,33 @@ class SimpleFeatureProcessor:
             self.logger.error(f"从数据库加载数据失败: {str(e)}")
             return pd.DataFrame()
 
-    def _align_features_with_training_data(self, features_df):
-        """将特征与训练数据对齐"""
+    def get_training_feature_columns(self):
+        """训练数据的特征列（对齐标准）；没有训练数据时返回None"""
+        # 从数据库获取训练数据的特征列作为标准
+        conn = sqlite3.connect(self.db_path)
         try:
-            # 从数据库获取训练数据的特征列作为标准
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            result = conn.execute('''
                 SELECT feature_vector FROM features 
-                WHERE user_id LIKE 'training_user%' 
+                WHERE user_id >= ? AND user_id < ?
                 LIMIT 1
-            ''')
-            
-            result = cursor.fetchone()
+            ''', prefix_bounds('training_user')).fetchone()
+        finally:
             conn.close()
+        
+        if not result:
+            return None
+        # 解析训练数据的特征列
+        return list(json.loads(result[0]).keys())
+
+    def _align_features_with_training_data(self, features_df):
+        """将特征与训练数据对齐"""
+        try:
+            target_features = self.get_training_feature_columns()
             
-            if not result:
+            if not target_features:
                 self.logger.warning("没有找到训练数据，无法对齐特征")
                 return features_df
             
-            # 解析训练数据的特征列
-            training_features = json.loads(result[0])
-            target_features = list(training_features.keys())
-            
             # 确保所有目标特征都存在
             for feature in target_features:
                 if feature not in features_df.columns:
@@ -242,43 +324,9 @@ class SimpleFeatureProcessor:
             # 复制数据避免修改原始数据
             df = df.copy()
             
-            # 1. 数据预处理 (复用feature_engineering的函数)
-            self.logger.debug("执行数据预处理")
-            df = remove_outlier(df)
-            df = fill_in_scroll(df)
-            df = change_from_prev_rec(df)
-            df = classify_categ(df)
-            
-            # 2. 特征提取 (根据配置选择)
-            feature_config = self.config.get_feature_config()
-            
-            if feature_config.get('velocity_features', True):
-                self.logger.debug("提取速度特征")
-                df = add_velocity_features(df)
-            
-            if feature_config.get('trajectory_features', True):
-                self.logger.debug("提取轨迹特征")
-                df = add_trajectory_features(df)
-            
-            if feature_config.get('temporal_features', True):
-                self.logger.debug("提取时间特征")
-                df = add_temporal_features(df)
-            
-            if feature_config.get('statistical_features', True):
-                self.logger.debug("提取统计特征")
-                df = add_statistical_features(df)
-            
-            if feature_config.get('interaction_features', True):
-                self.logger.debug("提取交互特征")
-                df = add_interaction_features(df)
-            
-            if feature_config.get('geometric_features', True):
-                self.logger.debug("提取几何特征")
-                df = add_geometric_features(df)
-            
-            if feature_config.get('advanced_features', True):
-                self.logger.debug("提取高级特征")
-                df = add_advanced_features(df)
+            # 1-2. 数据预处理与逐事件特征提取 (根据配置选择)
+            self.logger.debug("执行数据预处理与特征提取")
+            df = extract_event_features(df, self.config.get_feature_config())
             
             # 3. 按时间窗口聚合特征
             self.logger.debug("按时间窗口聚合特征")
@@ -340,14 +388,21 @@ class SimpleFeatureProcessor:
             self.logger.error(f"按窗口聚合特征失败: {str(e)}")
             return pd.DataFrame()
 
-    def save_features_to_db(self, features_df, user_id, session_id):
-        """保存特征到数据库"""
+    def save_features_to_db(self, features_df, user_id, session_id, conn=None):
+        """保存特征到数据库
+
+        写入后 features_df 带上 id 与 timestamp 列（与从features表读取的格式一致）。
+        传入 conn 时复用调用方的连接与事务，由调用方负责提交（此时不通知新窗口监听者）。
+        """
         try:
             if features_df.empty:
                 self.logger.warning("特征数据为空，跳过保存")
                 return False
             
-            conn = sqlite3.connect(self.db_path)
+            user_id = normalize_user_id(user_id)
+            own_conn = conn is None
+            if own_conn:
+                conn = sqlite3.connect(self.db_path)
             
             # 将特征转换为JSON字符串
             features_df['feature_vector'] = features_df.apply(
@@ -356,8 +411,12 @@ class SimpleFeatureProcessor:
             
             # 保存到数据库
             saved_count = 0
+            pool_rows = []
+            timestamps = []
             for _, row in features_df.iterrows():
                 cursor = conn.cursor()
+                feature_vector = row.get('feature_vector', '{}')
+                timestamp = time.time()
                 cursor.execute('''
                     INSERT INTO features 
                     (user_id, session_id, timestamp, feature_vector)
@@ -365,15 +424,26 @@ class SimpleFeatureProcessor:
                 ''', (
                     user_id,
                     session_id,
-                    time.time(),
-                    row.get('feature_vector', '{}')
+                    timestamp,
+                    feature_vector
                 ))
+                pool_rows.append((cursor.lastrowid, user_id, feature_vector))
+                timestamps.append(timestamp)
                 saved_count += 1
             
-            conn.commit()
-            conn.close()
+            # 同一事务内增量更新负样本池与特征分位数草图
+            self.negative_pool.add_samples(pool_rows, conn=conn)
+            self.feature_sketches.add_samples(pool_rows, conn=conn)
+            
+            if own_conn:
+                conn.commit()
+                conn.close()
+            features_df['id'] = [feature_id for feature_id, _, _ in pool_rows]
+            features_df['timestamp'] = timestamps
             
             self.logger.info(f"保存了 {saved_count} 条特征到数据库")
+            if own_conn:
+                self._publish_windows(user_id, saved_count)
             return True
             
         except Exception as e:
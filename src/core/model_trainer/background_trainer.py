@@ -0,0 +1,249 @@
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.model_artifact import ARTIFACT_SUFFIX, ModelArtifact
+from src.core.model_trainer.training_governor import TrainingGovernor, _apply_child_limits
+
+
+def _background_training_entry(user_id, staging_dir, process_features, limits, result_queue):
+    """子进程入口：（可选）处理特征后训练模型，产物写入暂存目录，进度与结果写入队列"""
+    _apply_child_limits(limits)
+
+    def report(stage, percent):
+        result_queue.put(('progress', stage, percent))
+
+    try:
+        if process_features:
+            report('features', 0)
+            from src.core.feature_engineer.simple_feature_processor import SimpleFeatureProcessor
+            if not SimpleFeatureProcessor().process_all_user_sessions(user_id):
+                Logger().error(f"用户 {user_id} 没有可用于训练的特征")
+                result_queue.put(False)
+                return
+
+        from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
+        trainer = SimpleModelTrainer()
+        trainer.output_path = Path(staging_dir)
+        trainer.progress_callback = report
+        result_queue.put(bool(trainer.train_user_model(user_id)))
+    except Exception as e:
+        Logger().error(f"后台训练子进程异常: {str(e)}")
+        result_queue.put(False)
+
+
+class TrainingJob:
+    """后台训练任务状态"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, user_id, process_features=False, callback=None):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.process_features = process_features
+        self.callback = callback
+        self.state = self.QUEUED
+        self.stage = None
+        self.percent = 0
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    @property
+    def finished(self):
+        return self.done_event.is_set()
+
+    def to_dict(self):
+        return {
+            'job_id': self.job_id,
+            'user_id': self.user_id,
+            'state': self.state,
+            'stage': self.stage,
+            'percent': self.percent,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class BackgroundTrainer:
+    """后台训练服务：任务队列 + 单工作线程，每个任务在受控子进程中训练
+
+    调用方（热键回调、工作流线程）提交任务后立即返回，主进程不执行任何训练计算；
+    子进程把产物写入暂存目录，成功后校验并原子替换到模型目录，失败或取消时模型目录保持不变。
+    """
+
+    def __init__(self, governor=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        self.governor = governor or TrainingGovernor()
+        self.models_path = Path(self.config.get_paths()['models'])
+        self.staging_root = self.models_path / 'staging'
+
+        self.max_finished_jobs = 20
+
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._current = None
+        self._worker = None
+
+    def start(self):
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(target=self._worker_loop, name='BackgroundTrainer', daemon=True)
+            self._worker.start()
+
+    def submit(self, user_id, process_features=False, callback=None):
+        """提交训练任务并立即返回 TrainingJob；同一用户已有排队任务时直接返回该任务
+
+        callback(job) 在任务结束（成功、失败或取消）后于工作线程中调用。
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.user_id == user_id and job.state == TrainingJob.QUEUED:
+                    job.process_features = job.process_features or process_features
+                    return job
+            job = TrainingJob(user_id, process_features, callback)
+            self._jobs[job.job_id] = job
+            # 只保留最近的已结束任务供状态查询
+            finished = [j for j in self._jobs.values() if j.finished]
+            for old_job in finished[:-self.max_finished_jobs]:
+                del self._jobs[old_job.job_id]
+        self._queue.put(job)
+        self.logger.info(f"已提交后台训练任务 {job.job_id}: 用户 {user_id}")
+        self.start()
+        return job
+
+    def get_job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def get_current_job(self):
+        return self._current
+
+    def wait(self, job, timeout=None):
+        """等待任务结束，返回是否训练成功（超时返回False）"""
+        job.done_event.wait(timeout)
+        return job.state == TrainingJob.SUCCEEDED
+
+    def cancel(self, job_id):
+        """取消排队中或运行中的任务"""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        self.logger.info(f"请求取消后台训练任务 {job_id}")
+        return True
+
+    def cancel_all(self):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+
+    def stop(self, timeout=10):
+        """取消所有任务并停止工作线程"""
+        self.cancel_all()
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if job.cancel_event.is_set():
+                self._finish(job, TrainingJob.CANCELLED)
+                continue
+            self._current = job
+            try:
+                self._run_job(job)
+            except Exception as e:
+                self.logger.error(f"后台训练任务 {job.job_id} 异常: {str(e)}")
+                self._finish(job, TrainingJob.FAILED)
+            finally:
+                self._current = None
+
+    def _run_job(self, job):
+        job.state = TrainingJob.RUNNING
+        job.started_at = time.time()
+        staging_dir = self.staging_root / job.job_id
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        self.logger.info(f"后台训练任务 {job.job_id} 开始: 用户 {job.user_id}")
+
+        def on_progress(stage, percent):
+            if stage != job.stage:
+                self.logger.info(f"后台训练任务 {job.job_id}: {stage} {percent}%")
+            job.stage, job.percent = stage, percent
+
+        try:
+            success = self.governor.run(
+                _background_training_entry,
+                (job.user_id, str(staging_dir), job.process_features),
+                on_progress=on_progress,
+                cancel_event=job.cancel_event
+            )
+            if job.cancel_event.is_set():
+                state = TrainingJob.CANCELLED
+            elif success and self._hand_over(staging_dir, job.user_id):
+                job.stage, job.percent = 'done', 100
+                state = TrainingJob.SUCCEEDED
+            else:
+                state = TrainingJob.FAILED
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        self._finish(job, state)
+
+    def _hand_over(self, staging_dir, user_id):
+        """校验暂存目录中的产物并原子替换到模型目录
+
+        增量训练判定无需更新时暂存目录为空，视为成功且不改动现有模型。
+        特征信息先于模型文件替换，预测端读取到新模型时其元数据已就绪。
+        """
+        model_files = [p for p in staging_dir.iterdir() if p.name.startswith(f"user_{user_id}_model")]
+        other_files = [p for p in staging_dir.iterdir() if p not in model_files and p.suffix != '.tmp']
+        try:
+            for path in model_files:
+                if path.suffix == ARTIFACT_SUFFIX:
+                    ModelArtifact.open(path).read_booster_bytes()
+        except Exception as e:
+            self.logger.error(f"后台训练产物校验失败，保留现有模型: {str(e)}")
+            return False
+
+        for path in other_files + model_files:
+            os.replace(path, self.models_path / path.name)
+        if any(path.suffix == ARTIFACT_SUFFIX for path in model_files):
+            (self.models_path / f"user_{user_id}_model.pkl").unlink(missing_ok=True)
+        if model_files:
+            self.logger.info(f"用户 {user_id} 新模型已移交: {', '.join(p.name for p in model_files)}")
+        return True
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+        duration = job.finished_at - (job.started_at or job.submitted_at)
+        self.logger.info(f"后台训练任务 {job.job_id} 结束: {state}, 耗时 {duration:.1f}s")
+        job.done_event.set()
+        if job.callback is not None:
+            try:
+                job.callback(job)
+            except Exception as e:
+                self.logger.error(f"后台训练回调失败: {str(e)}")
@@ -0,0 +1,164 @@
+import io
+import json
+
+import numpy as np
+
+# 可编译的目标函数：监控模型均为二分类 logistic，其余目标回退到 XGBoost 推理
+SUPPORTED_OBJECTIVES = ('binary:logistic',)
+
+# 逐块评估的行数，限制 (行数 x 树数) 中间数组的大小
+_BLOCK_ROWS = 4096
+
+
+class CompiledEnsemble:
+    """纯NumPy的树集成评估器：所有树的节点展平为数组，按深度逐层同步遍历全部树
+
+    节点以全局编号存放（各树节点依次拼接），叶子的左右子节点指向自身，
+    因此按集成的最大深度迭代固定次数即可让每个样本在每棵树上都停在叶子上。
+    比较与 XGBoost 一致：特征与阈值均为 float32，x < 阈值 走左子树，缺失值走默认方向。
+    提供与 XGBClassifier 相同的 predict_proba/predict 接口，推理不依赖 xgboost。
+    """
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, split_index, split_condition, left, right, default_left, leaf_value,
+                 roots, max_depth, base_margin, n_features, missing=np.nan):
+        self.split_index = np.asarray(split_index, dtype=np.int32)
+        self.split_condition = np.asarray(split_condition, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.n_features = int(n_features)
+        self.missing = float(missing)
+        # 子节点交错存放：children[2 * node + 1] 为左子节点、children[2 * node] 为右子节点，每层只需一次取数
+        self._children = np.empty(2 * len(self.left), dtype=np.int32)
+        self._children[0::2] = self.right
+        self._children[1::2] = self.left
+
+    @classmethod
+    def from_model(cls, model):
+        """从 XGBClassifier 或 Booster 导出；不支持的模型（目标函数、多输出、分类特征、dart）抛出 ValueError"""
+        booster = model.get_booster() if hasattr(model, 'get_booster') else model
+        if not hasattr(booster, 'save_raw'):
+            raise ValueError(f"不支持的模型类型: {type(model).__name__}")
+        missing = getattr(model, 'missing', np.nan)
+        try:
+            learner = json.loads(bytes(booster.save_raw(raw_format='json')))['learner']
+        except TypeError:
+            raise ValueError("xgboost<1.6 不支持导出JSON模型")
+
+        objective = learner['objective']['name']
+        if objective not in SUPPORTED_OBJECTIVES:
+            raise ValueError(f"不支持的目标函数: {objective}")
+        gradient_booster = learner['gradient_booster']
+        if gradient_booster.get('name') != 'gbtree':
+            raise ValueError(f"不支持的提升器: {gradient_booster.get('name')}")
+        model_param = learner['learner_model_param']
+        if int(model_param.get('num_target', 1)) != 1:
+            raise ValueError("不支持多输出模型")
+
+        # 与 predict_proba 一致：早停模型只使用最佳迭代之前的树
+        trees = gradient_booster['model']['trees']
+        best_iteration = learner.get('attributes', {}).get('best_iteration')
+        if best_iteration is not None:
+            trees = trees[:gradient_booster['model']['iteration_indptr'][int(best_iteration) + 1]]
+
+        split_index, split_condition, left, right, default_left, leaf_value, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree in trees:
+            if any(tree['split_type']) or int(tree['tree_param'].get('size_leaf_vector', 1)) > 1:
+                raise ValueError("不支持分类特征或向量叶子的树")
+            tree_left = np.asarray(tree['left_children'], dtype=np.int64)
+            tree_right = np.asarray(tree['right_children'], dtype=np.int64)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            is_leaf = tree_left == -1
+            nodes = np.arange(len(tree_left))
+
+            split_index.append(np.where(is_leaf, 0, tree['split_indices']))
+            split_condition.append(np.where(is_leaf, 0, conditions))
+            left.append(np.where(is_leaf, nodes, tree_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree_right) + offset)
+            default_left.append(np.asarray(tree['default_left'], dtype=bool))
+            leaf_value.append(np.where(is_leaf, conditions, 0))
+            roots.append(offset)
+
+            depth = np.zeros(len(nodes), dtype=np.int64)
+            for node in nodes:
+                if not is_leaf[node]:
+                    depth[tree_left[node]] = depth[tree_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+            offset += len(nodes)
+
+        # base_score 为概率（新版本序列化为 "[5E-1]"），logistic 的初始边际为其 logit
+        base_score = float(str(model_param['base_score']).strip('[]'))
+        base_margin = np.log(base_score / (1 - base_score))
+
+        concat = (lambda parts, dtype: np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype))
+        return cls(concat(split_index, np.int32), concat(split_condition, np.float32),
+                   concat(left, np.int32), concat(right, np.int32), concat(default_left, bool),
+                   concat(leaf_value, np.float32), np.asarray(roots, dtype=np.int32), max_depth,
+                   base_margin, int(model_param['num_feature']),
+                   np.nan if missing is None else missing)
+
+    def to_bytes(self):
+        """序列化为 npz（不含pickle对象）"""
+        buffer = io.BytesIO()
+        np.savez(buffer, split_index=self.split_index, split_condition=self.split_condition,
+                 left=self.left, right=self.right, default_left=self.default_left,
+                 leaf_value=self.leaf_value, roots=self.roots,
+                 meta=np.array([self.max_depth, self.base_margin, self.n_features, self.missing], dtype=np.float64))
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+            max_depth, base_margin, n_features, missing = arrays['meta'].tolist()
+            return cls(arrays['split_index'], arrays['split_condition'], arrays['left'], arrays['right'],
+                       arrays['default_left'], arrays['leaf_value'], arrays['roots'],
+                       int(max_depth), base_margin, int(n_features), missing)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict_margin(self, X):
+        """逐行边际值（base_margin + 各树叶子值之和）"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"特征数不匹配: 模型 {self.n_features}, 输入 {X.shape[1]}")
+        margin = np.full(len(X), self.base_margin, dtype=np.float64)
+        if not self.n_trees:
+            return margin
+
+        for start in range(0, len(X), _BLOCK_ROWS):
+            block = X[start:start + _BLOCK_ROWS]
+            flat = block.ravel()
+            row_offset = (np.arange(len(block), dtype=np.int64) * self.n_features)[:, None]
+            nodes = np.broadcast_to(self.roots, (len(block), self.n_trees)).copy()
+            # 经 sanitize_array 清洗的输入没有缺失值，此时跳过缺失值判断
+            has_missing = bool(np.isnan(block).any()) or (not np.isnan(self.missing) and bool((block == self.missing).any()))
+            for _ in range(self.max_depth):
+                values = flat[row_offset + self.split_index[nodes]]
+                go_left = values < self.split_condition[nodes]
+                if has_missing:
+                    is_missing = np.isnan(values)
+                    if not np.isnan(self.missing):
+                        is_missing |= values == self.missing
+                    go_left = np.where(is_missing, self.default_left[nodes], go_left)
+                nodes = self._children[2 * nodes + go_left]
+            margin[start:start + len(block)] += self.leaf_value[nodes].sum(axis=1, dtype=np.float64)
+        return margin
+
+    def predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
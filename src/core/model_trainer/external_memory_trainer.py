@@ -0,0 +1,286 @@
+import sqlite3
+import json
+import shutil
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.training_governor import training_thread_limit
+from src.core.model_trainer.model_artifact import booster_to_bytes
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+
+class SQLiteFeatureBatches:
+    """按主键游标（keyset）分批读取features表：正样本为该用户的窗口，负样本为其他全部用户的窗口
+
+    holdout 大于0时 id % holdout == 0 的行留作验证集，subset 为 'train' 或 'validation' 时只读取对应部分；
+    clip_bounds 为逐列裁剪边界（特征分位数草图给出），与内存训练相同的清洗规则。
+    """
+
+    def __init__(self, db_path, user_id, feature_cols, batch_rows, clip_bounds=None, holdout=0, subset=None):
+        self.db_path = Path(db_path)
+        self.user_id = str(user_id).strip()
+        self.feature_cols = list(feature_cols)
+        self.batch_rows = int(batch_rows)
+        bounds = clip_bounds or {}
+        self.lower = np.asarray(bounds['lower'], dtype=np.float32) if bounds.get('lower') is not None else -1e6
+        self.upper = np.asarray(bounds['upper'], dtype=np.float32) if bounds.get('upper') is not None else 1e6
+        self.holdout = int(holdout)
+        self.subset = subset
+
+    def subset_of(self, subset):
+        """同一数据源的训练/验证部分"""
+        return SQLiteFeatureBatches(self.db_path, self.user_id, self.feature_cols, self.batch_rows,
+                                    {'lower': self.lower, 'upper': self.upper}, self.holdout, subset)
+
+    def _subset_filter(self):
+        if self.holdout <= 0 or self.subset is None:
+            return ''
+        return f" AND id % {self.holdout} {'=' if self.subset == 'validation' else '!='} 0"
+
+    def count(self):
+        """返回 (正样本数, 负样本数)"""
+        subset_filter = self._subset_filter()
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            n_pos = conn.execute(
+                f'SELECT COUNT(*) FROM features WHERE user_id = ?{subset_filter}', (self.user_id,)
+            ).fetchone()[0]
+            n_neg = conn.execute(
+                f'SELECT COUNT(*) FROM features WHERE user_id != ?{subset_filter}', (self.user_id,)
+            ).fetchone()[0]
+            return n_pos, n_neg
+        finally:
+            conn.close()
+
+    def _to_matrix(self, vectors):
+        parsed = []
+        for vector_str in vectors:
+            try:
+                parsed.append(json.loads(vector_str) if isinstance(vector_str, str) else (vector_str or {}))
+            except Exception:
+                parsed.append({})
+        frame = pd.DataFrame(parsed).reindex(columns=self.feature_cols)
+        X = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan, copy=True)
+        # 与内存训练相同的清洗规则：非有限值置0并按逐列边界裁剪
+        np.nan_to_num(X, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        np.clip(X, self.lower, self.upper, out=X)
+        return X
+
+    def __iter__(self):
+        """依次产出 (X, y) 批次，每批最多 batch_rows 行，内存占用与总行数无关"""
+        subset_filter = self._subset_filter()
+        queries = [
+            (f'SELECT id, feature_vector FROM features WHERE user_id = ?{subset_filter} AND id > ? '
+             'ORDER BY id LIMIT ?', 1.0),
+            (f'SELECT id, feature_vector FROM features WHERE user_id != ?{subset_filter} AND id > ? '
+             'ORDER BY id LIMIT ?', 0.0),
+        ]
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            for query, label in queries:
+                last_id = 0
+                while True:
+                    rows = conn.execute(query, (self.user_id, last_id, self.batch_rows)).fetchall()
+                    if not rows:
+                        break
+                    last_id = rows[-1][0]
+                    yield self._to_matrix([row[1] for row in rows]), np.full(len(rows), label, dtype=np.float32)
+        finally:
+            conn.close()
+
+
+if XGBOOST_AVAILABLE:
+    class SQLiteDataIter(xgb.DataIter):
+        """XGBoost外存迭代器：每轮遍历重新从SQLite流式读取批次"""
+
+        def __init__(self, batches, cache_prefix):
+            self.batches = batches
+            self._iterator = None
+            self.n_rows = 0
+            self.positive_sum = None
+            self.positive_sq_sum = None
+            self.n_positive = 0
+            self._first_pass = True
+            super().__init__(cache_prefix=cache_prefix)
+
+        def next(self, input_data):
+            if self._iterator is None:
+                self._iterator = iter(self.batches)
+            try:
+                X, y = next(self._iterator)
+            except StopIteration:
+                return False
+            if self._first_pass:
+                # 首轮遍历时顺带累计正样本分布，供增量训练的漂移检查使用
+                self.n_rows += len(y)
+                X_pos = X[y == 1].astype(np.float64)
+                if len(X_pos):
+                    if self.positive_sum is None:
+                        self.positive_sum = np.zeros(X.shape[1])
+                        self.positive_sq_sum = np.zeros(X.shape[1])
+                    self.positive_sum += X_pos.sum(axis=0)
+                    self.positive_sq_sum += (X_pos ** 2).sum(axis=0)
+                    self.n_positive += len(X_pos)
+            input_data(data=X, label=y, feature_names=self.batches.feature_cols)
+            return True
+
+        def reset(self):
+            if self._iterator is not None:
+                self._first_pass = False
+            self._iterator = None
+
+
+class ExternalMemoryTrainer:
+    """外存训练：负样本不整体载入内存，按批从features表流入XGBoost外存 DMatrix
+
+    负样本为其他全部用户的特征窗口（不受负样本池容量限制），按 validation_fraction 留出验证流用于评估。
+    批大小由 system.memory_limit 推算，分箱后的数据页缓存在 models/cache 下，训练结束即删除。
+    xgboost>=3.0 使用 ExtMemQuantileDMatrix，旧版本回退到基于迭代器的外存 DMatrix。
+    """
+
+    def __init__(self, db_path, cache_dir):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        self.db_path = Path(db_path)
+        self.cache_dir = Path(cache_dir)
+
+        training_config = self.config.get_model_training_config()
+        external_config = training_config.get('external_memory', {}) or {}
+        self.batch_rows = int(external_config.get('batch_rows', 0))
+        self.memory_fraction = float(external_config.get('memory_fraction', 0.25))
+        validation_fraction = float(external_config.get('validation_fraction', 0.2))
+        self.holdout = int(round(1 / validation_fraction)) if validation_fraction > 0 else 0
+        pool_config = training_config.get('negative_pool', {}) or {}
+        self.max_bin = int(pool_config.get('max_bin', 256))
+        self.memory_limit = self.config.get_memory_limit_bytes()
+
+    def resolve_batch_rows(self, n_features):
+        """按内存预算推算每批行数（JSON解析的中间对象按单值约64字节估算）"""
+        if self.batch_rows > 0:
+            return self.batch_rows
+        bytes_per_row = max(1, n_features) * 64
+        return int(min(1000000, max(1024, self.memory_limit * self.memory_fraction // bytes_per_row)))
+
+    def resolve_feature_cols(self):
+        """以features表中的数值特征列为准（与内存训练时的对齐规则一致）"""
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            row = conn.execute('SELECT feature_vector FROM features ORDER BY id LIMIT 1').fetchone()
+        finally:
+            conn.close()
+        if not row:
+            return []
+        return [col for col, value in json.loads(row[0]).items()
+                if col not in ('id', 'timestamp', 'user_id', 'session_id')
+                and isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+    def _predict_stream(self, booster, batches):
+        """流式预测，只保留标签与概率向量"""
+        y_true, y_proba = [], []
+        for X, y in batches:
+            y_true.append(y.astype(np.int8))
+            y_proba.append(booster.inplace_predict(X).astype(np.float32))
+        return np.concatenate(y_true), np.concatenate(y_proba)
+
+    def train(self, user_id, feature_cols, params=None, n_jobs=None, clip_bounds=None):
+        """流式训练用户模型，返回 (model, 评估数据, 统计信息)，失败返回 (None, None, None)
+
+        params 为模型参数（model.params 与超参数搜索结果），n_jobs 为XGBoost线程数（默认 training_thread_limit()），
+        clip_bounds 为逐列裁剪边界。评估数据来自留出的验证流，验证流缺少某一类样本时回退到训练集（结果偏乐观）。
+        """
+        if not XGBOOST_AVAILABLE:
+            self.logger.error("xgboost不可用，无法进行外存训练")
+            return None, None, None
+
+        cache_prefix = self.cache_dir / f"extmem_{user_id}"
+        data_iter = dtrain = None
+        try:
+            start_time = time.time()
+            if n_jobs is None:
+                n_jobs = training_thread_limit(self.config)
+            batch_rows = self.resolve_batch_rows(len(feature_cols))
+            source = SQLiteFeatureBatches(self.db_path, user_id, feature_cols, batch_rows,
+                                          clip_bounds=clip_bounds, holdout=self.holdout)
+            batches = source.subset_of('train')
+            validation = source.subset_of('validation')
+            n_pos, n_neg = batches.count()
+            n_val_pos, n_val_neg = validation.count() if self.holdout else (0, 0)
+            if n_pos == 0 or n_neg == 0:
+                self.logger.error(f"外存训练数据不足: 正样本 {n_pos}, 负样本 {n_neg}")
+                return None, None, None
+            self.logger.info(
+                f"外存训练用户 {user_id}: 正样本 {n_pos}, 负样本 {n_neg}, 验证 {n_val_pos + n_val_neg}, "
+                f"每批 {batch_rows} 行, 内存预算 {self.memory_limit / 1024 / 1024:.0f}MB"
+            )
+
+            model_params = {
+                'n_estimators': 100,
+                'max_depth': 6,
+                'learning_rate': 0.1,
+                'random_state': 42,
+                'missing': 0,
+            }
+            model_params.update(params or {})
+            # 负样本为全体其他用户，按样本比例加权正样本，替代内存训练中的下采样
+            model_params.update({'max_bin': self.max_bin, 'scale_pos_weight': n_neg / n_pos, 'n_jobs': n_jobs})
+            model = xgb.XGBClassifier(**model_params)
+
+            cache_prefix.mkdir(parents=True, exist_ok=True)
+            data_iter = SQLiteDataIter(batches, cache_prefix=str(cache_prefix / 'page'))
+            if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+                dtrain = xgb.ExtMemQuantileDMatrix(data_iter, missing=model_params['missing'],
+                                                   max_bin=self.max_bin, nthread=n_jobs)
+            else:
+                # xgboost<3.0：带 cache_prefix 的迭代器 DMatrix 同样按页缓存在磁盘上
+                dtrain = xgb.DMatrix(data_iter, missing=model_params['missing'], nthread=n_jobs)
+
+            booster_params = model.get_xgb_params()
+            booster_params.update({'objective': 'binary:logistic', 'tree_method': 'hist'})
+            booster_params = {k: v for k, v in booster_params.items() if v is not None}
+            booster = xgb.train(booster_params, dtrain, num_boost_round=model_params['n_estimators'])
+
+            # 装回sklearn包装器，保持与内存训练模型相同的predict/predict_proba接口
+            model.load_model(bytearray(booster_to_bytes(booster)[0]))
+
+            if n_val_pos and n_val_neg:
+                y_true, y_proba = self._predict_stream(booster, validation)
+            else:
+                self.logger.warning("验证流缺少正样本或负样本，以下指标基于训练集")
+                y_true, y_proba = self._predict_stream(booster, batches)
+
+            n_positive = max(1, data_iter.n_positive)
+            means = data_iter.positive_sum / n_positive if data_iter.positive_sum is not None else None
+            stds = np.sqrt(np.maximum(data_iter.positive_sq_sum / n_positive - means ** 2, 0)) \
+                if means is not None else None
+
+            self.logger.info(
+                f"外存训练完成: 训练 {data_iter.n_rows} 个样本, 评估 {len(y_true)} 个样本, "
+                f"耗时 {time.time() - start_time:.2f}s"
+            )
+            evaluation = (y_true, (y_proba >= 0.5).astype(np.int8), np.column_stack([1 - y_proba, y_proba]))
+            stats = {'training_samples': int(data_iter.n_rows), 'evaluation_samples': int(len(y_true)),
+                     'feature_means': means, 'feature_stds': stds}
+            return model, evaluation, stats
+
+        except Exception as e:
+            self.logger.error(f"外存训练失败: {str(e)}")
+            return None, None, None
+        finally:
+            # 先释放DMatrix，XGBoost在析构时关闭数据页，再删除缓存目录
+            data_iter = dtrain = None
+            shutil.rmtree(cache_prefix, ignore_errors=True)
@@ -0,0 +1,162 @@
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+
+
+def mutual_info_ranking(X, y, sample_rows=20000, random_state=42):
+    """互信息分数（行数超过 sample_rows 时随机抽样估计），返回与列对应的一维数组"""
+    from sklearn.feature_selection import mutual_info_classif
+
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    if sample_rows and len(X) > sample_rows:
+        rows = np.random.default_rng(random_state).choice(len(X), size=int(sample_rows), replace=False)
+        X, y = X[rows], y[rows]
+    return mutual_info_classif(X, y, random_state=random_state)
+
+
+class FeatureSelector:
+    """特征选择服务：按负样本池版本计算一次方差与互信息排名并缓存，各用户训练直接复用
+
+    互信息以负样本池中的来源用户为标签，衡量特征区分不同用户的能力，与具体训练哪个用户无关；
+    排名持久化为 cache_dir/feature_ranking_v{版本}.json，筛选阈值在读取时按配置应用。
+    """
+
+    def __init__(self, negative_cache, cache_dir=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        self.negative_cache = negative_cache
+
+        if cache_dir is None:
+            cache_dir = Path(self.config.get_paths()['models']) / 'cache'
+        self.cache_dir = Path(cache_dir)
+
+        selection_config = self.config.get_model_training_config().get('feature_selection', {}) or {}
+        self.enabled = bool(selection_config.get('enabled', True))
+        self.sample_rows = int(selection_config.get('sample_rows', 20000))
+        self.variance_threshold = float(selection_config.get('variance_threshold', 0.01))
+        self.min_mi = float(selection_config.get('min_mi', 0.0))
+        self.max_features = selection_config.get('max_features')
+
+        self.version = None
+        self.ranking = None
+
+    def _cache_file(self, version):
+        return self.cache_dir / f"feature_ranking_v{version}.json"
+
+    def refresh(self):
+        """确保排名与当前负样本池版本一致，版本变化时重新计算"""
+        self.negative_cache.refresh()
+        version = self.negative_cache.version
+        if version == self.version and self.ranking is not None:
+            return True
+
+        ranking = self._load_from_disk(version)
+        if ranking is None:
+            ranking = self._compute(version)
+            self._save_to_disk(version, ranking)
+        self.version = version
+        self.ranking = ranking
+        return True
+
+    def _compute(self, version):
+        """在负样本池矩阵上计算各列方差（全部行）与互信息（抽样行）"""
+        start_time = time.time()
+        matrix = np.nan_to_num(self.negative_cache.matrix.astype(np.float64), nan=0.0, posinf=0.0, neginf=0.0)
+        np.clip(matrix, -1e6, 1e6, out=matrix)
+        sources = np.asarray(self.negative_cache.sources).astype(str)
+
+        variance = matrix.var(axis=0) if len(matrix) else np.zeros(len(self.negative_cache.columns))
+        if len(np.unique(sources)) >= 2:
+            mi = mutual_info_ranking(matrix, sources, sample_rows=self.sample_rows)
+        else:
+            # 只有一个来源用户时无法估计区分度，只按方差筛选
+            mi = None
+
+        self.logger.info(
+            f"特征排名计算完成: 版本 {version}, {len(self.negative_cache.columns)} 个特征, "
+            f"抽样 {min(len(matrix), self.sample_rows)}/{len(matrix)} 行, 耗时 {time.time() - start_time:.2f}s"
+        )
+        return {
+            'version': version,
+            'columns': list(self.negative_cache.columns),
+            'variance': variance.tolist(),
+            'mi': mi.tolist() if mi is not None else None,
+            'computed_at': datetime.now().isoformat(),
+        }
+
+    def _load_from_disk(self, version):
+        cache_file = self._cache_file(version)
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"读取特征排名缓存失败，将重新计算: {str(e)}")
+            return None
+
+    def _save_to_disk(self, version, ranking):
+        """持久化当前版本的排名，并清理旧版本缓存文件"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self._cache_file(version)
+            tmp_file = cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(ranking, f)
+            os.replace(tmp_file, cache_file)
+            for old_file in self.cache_dir.glob('feature_ranking_v*.json'):
+                if old_file != cache_file:
+                    old_file.unlink(missing_ok=True)
+        except Exception as e:
+            self.logger.warning(f"保存特征排名缓存失败: {str(e)}")
+
+    def select(self, feature_cols):
+        """按缓存排名筛选特征，保持输入顺序；未启用、排名不可用或不在排名中的列原样保留"""
+        feature_cols = list(feature_cols)
+        if not self.enabled:
+            return feature_cols
+        try:
+            self.refresh()
+            ranked = dict(zip(self.ranking['columns'],
+                              zip(self.ranking['variance'], self.ranking['mi'] or [None] * len(self.ranking['columns']))))
+
+            selected = []
+            for col in feature_cols:
+                if str(col) not in ranked:
+                    selected.append(col)
+                    continue
+                variance, mi = ranked[str(col)]
+                if variance <= self.variance_threshold:
+                    continue
+                if mi is not None and mi <= self.min_mi:
+                    continue
+                selected.append(col)
+
+            if self.max_features and self.ranking['mi'] is not None and len(selected) > int(self.max_features):
+                selected = sorted(selected, key=lambda c: ranked.get(str(c), (0, float('inf')))[1], reverse=True)
+                keep = set(selected[:int(self.max_features)])
+                selected = [col for col in feature_cols if col in keep]
+
+            if not selected:
+                self.logger.warning("特征筛选后没有剩余特征，使用全部特征")
+                return feature_cols
+            if len(selected) < len(feature_cols):
+                self.logger.info(f"特征筛选: 保留 {len(selected)}/{len(feature_cols)} 个特征（排名版本 {self.version}）")
+            return selected
+
+        except Exception as e:
+            self.logger.error(f"特征筛选失败，使用全部特征: {str(e)}")
+            return feature_cols
@@ -0,0 +1,301 @@
+import json
+import math
+import sqlite3
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.database.schema_migrations import ensure_schema
+
+
+class QuantileSketch:
+    """可合并的流式分位数草图（相对误差对数分桶，DDSketch）
+
+    绝对值落在 (gamma^(k-1), gamma^k] 的值计入第 k 个桶，gamma = (1+a)/(1-a)，
+    任意分位数的估计值与真实值的相对误差不超过 a。两个草图按桶计数相加即可合并，
+    与数据到达顺序和分批方式无关。绝对值小于 min_value 的值计为0；
+    输入先按训练时的清洗规则（非有限值置0、裁剪到[-clip_value, clip_value]）处理，桶数因此有界。
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-9, clip_value=1e6):
+        self.relative_accuracy = float(relative_accuracy)
+        self.min_value = float(min_value)
+        self.clip_value = float(clip_value)
+        self.gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values):
+        """批量加入数值（向量化计算桶号）"""
+        values = np.nan_to_num(np.asarray(values, dtype=np.float64).ravel(), nan=0.0, posinf=0.0, neginf=0.0)
+        if values.size == 0:
+            return
+        np.clip(values, -self.clip_value, self.clip_value, out=values)
+        self.count += int(values.size)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        magnitude = np.abs(values)
+        indexable = magnitude >= self.min_value
+        self.zero_count += int(values.size - indexable.sum())
+        keys = np.ceil(np.log(magnitude[indexable]) / self._log_gamma).astype(np.int64)
+        signs = values[indexable] > 0
+        for store, selected in ((self.positive, keys[signs]), (self.negative, keys[~signs])):
+            unique, counts = np.unique(selected, return_counts=True)
+            for key, count in zip(unique.tolist(), counts.tolist()):
+                store[key] = store.get(key, 0) + count
+
+    def merge(self, other):
+        """合并另一个草图（精度参数必须一致）"""
+        if other.count == 0:
+            return self
+        if not math.isclose(other.gamma, self.gamma):
+            raise ValueError("只能合并相对精度相同的草图")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _bucket_value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q):
+        """估计分位数 q（0~1），空草图返回None"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        # 从最小值开始累计：负数按绝对值从大到小，然后是0，最后正数从小到大
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(self.min, -self._bucket_value(key))
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self.max, self._bucket_value(key))
+        return self.max
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'min_value': self.min_value,
+            'clip_value': self.clip_value,
+            'positive': {str(key): count for key, count in self.positive.items()},
+            'negative': {str(key): count for key, count in self.negative.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'], data.get('min_value', 1e-9), data.get('clip_value', 1e6))
+        sketch.positive = {int(key): int(count) for key, count in data.get('positive', {}).items()}
+        sketch.negative = {int(key): int(count) for key, count in data.get('negative', {}).items()}
+        sketch.zero_count = int(data.get('zero_count', 0))
+        sketch.count = int(data.get('count', 0))
+        if sketch.count:
+            sketch.min, sketch.max = float(data['min']), float(data['max'])
+        return sketch
+
+
+class FeatureSketchStore:
+    """按 (用户, 特征列) 维护的分位数草图，随特征写入增量更新
+
+    训练与预测的裁剪边界由全部用户草图合并后的分位数给出，无需对训练矩阵逐列排序；
+    边界在训练时写入模型制品，预测端使用同一组边界。
+    """
+
+    def __init__(self, db_path=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        if db_path is None:
+            paths_config = self.config.get_paths()
+            if 'database' in paths_config and paths_config['database']:
+                db_path = Path(paths_config['database'])
+            else:
+                db_path = Path(paths_config['data']) / 'mouse_data.db'
+        self.db_path = Path(db_path)
+        ensure_schema(self.db_path)
+
+        sketch_config = self.config.get_model_training_config().get('feature_sketch', {}) or {}
+        self.enabled = bool(sketch_config.get('enabled', True))
+        self.relative_accuracy = float(sketch_config.get('relative_accuracy', 0.01))
+
+    def add_samples(self, rows, conn=None):
+        """增量更新草图：rows 为 (feature_id, user_id, feature_vector) 序列，与负样本池写入接口一致
+
+        传入 conn 时复用调用方的连接与事务，由调用方负责提交。返回更新的草图数。
+        """
+        if not self.enabled:
+            return 0
+
+        by_user = {}
+        for _, user_id, feature_vector in rows:
+            try:
+                vector = json.loads(feature_vector) if isinstance(feature_vector, str) else feature_vector
+            except (TypeError, ValueError):
+                continue
+            if isinstance(vector, dict):
+                by_user.setdefault(str(user_id).strip(), []).append(vector)
+        return self._update({user_id: pd.DataFrame.from_records(vectors) for user_id, vectors in by_user.items()},
+                            conn)
+
+    def add_frame(self, user_ids, frame, conn=None):
+        """增量更新草图：frame 为特征列DataFrame，user_ids 为逐行用户ID（批量导入时免去JSON解析）"""
+        if not self.enabled or frame.empty:
+            return 0
+        user_ids = pd.Series(user_ids, index=frame.index).astype(str).str.strip()
+        return self._update({user_id: group for user_id, group in frame.groupby(user_ids, sort=False)}, conn)
+
+    def _update(self, frames, conn=None):
+        """把 {用户: 特征DataFrame} 并入各自的草图并写回"""
+        if not frames:
+            return 0
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            updated = []
+            for user_id, frame in frames.items():
+                # 与训练时一致：缺失或无法解析为数值的特征按0计
+                frame = frame.apply(pd.to_numeric, errors='coerce')
+                cursor.execute('SELECT feature, sketch FROM feature_sketches WHERE user_id = ?', (user_id,))
+                existing = {feature: sketch for feature, sketch in cursor.fetchall()}
+                for column in frame.columns:
+                    feature = str(column)
+                    if feature in existing:
+                        sketch = QuantileSketch.from_dict(json.loads(existing[feature]))
+                    else:
+                        sketch = QuantileSketch(self.relative_accuracy)
+                    sketch.add(frame[column].to_numpy(dtype=np.float64, na_value=0.0))
+                    updated.append((user_id, feature, json.dumps(sketch.to_dict(), separators=(',', ':')),
+                                    sketch.count, time.time()))
+            cursor.executemany('''
+                INSERT OR REPLACE INTO feature_sketches (user_id, feature, sketch, count, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', updated)
+            if own_conn:
+                conn.commit()
+            return len(updated)
+        finally:
+            if own_conn:
+                conn.close()
+
+    def remove_sources(self, like_patterns, conn=None):
+        """移除匹配LIKE模式的用户的草图（与features表清理保持同步）"""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(str(self.db_path))
+        try:
+            removed = 0
+            for pattern in like_patterns:
+                removed += conn.execute('DELETE FROM feature_sketches WHERE user_id LIKE ?', (pattern,)).rowcount
+            if own_conn:
+                conn.commit()
+            return removed
+        finally:
+            if own_conn:
+                conn.close()
+
+    def is_empty(self):
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            return conn.execute('SELECT 1 FROM feature_sketches LIMIT 1').fetchone() is None
+        finally:
+            conn.close()
+
+    def rebuild_from_features(self, batch_size=10000):
+        """从features表全量重建草图（仅在首次启用或手动修复时使用）"""
+        try:
+            start_time = time.time()
+            conn = sqlite3.connect(str(self.db_path))
+            try:
+                conn.execute('DELETE FROM feature_sketches')
+                read_cursor = conn.cursor()
+                read_cursor.execute('SELECT id, user_id, feature_vector FROM features ORDER BY id')
+                total = 0
+                while True:
+                    rows = read_cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    self.add_samples(rows, conn=conn)
+                    total += len(rows)
+                conn.commit()
+            finally:
+                conn.close()
+            self.logger.info(f"特征分位数草图重建完成: 扫描 {total} 条特征, 耗时 {time.time() - start_time:.2f}s")
+            return True
+        except Exception as e:
+            self.logger.error(f"重建特征分位数草图失败: {str(e)}")
+            return False
+
+    def merged(self, feature_cols):
+        """返回 {特征列: 合并全部用户后的草图}，没有草图的列不出现在结果中"""
+        feature_cols = [str(col) for col in feature_cols]
+        sketches = {}
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            # 分块查询，避免超出SQLite的参数个数上限
+            for start in range(0, len(feature_cols), 500):
+                chunk = feature_cols[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                for feature, sketch in conn.execute(
+                    f'SELECT feature, sketch FROM feature_sketches WHERE feature IN ({placeholders})', chunk
+                ):
+                    sketch = QuantileSketch.from_dict(json.loads(sketch))
+                    if feature in sketches:
+                        sketches[feature].merge(sketch)
+                    else:
+                        sketches[feature] = sketch
+        finally:
+            conn.close()
+        return sketches
+
+    def clip_bounds(self, feature_cols, quantile=0.001):
+        """由草图给出逐列裁剪边界 {'lower': [...], 'upper': [...]}（与 compute_clip_bounds 格式一致）
+
+        未启用或有列缺少草图时返回None，由调用方回退到按训练矩阵计算。
+        """
+        if not self.enabled:
+            return None
+        try:
+            if self.is_empty():
+                self.logger.info("特征分位数草图为空，首次从features表构建")
+                self.rebuild_from_features()
+            sketches = self.merged(feature_cols)
+            missing = [col for col in feature_cols if str(col) not in sketches]
+            if missing:
+                self.logger.warning(f"{len(missing)} 个特征列没有分位数草图，改为按训练数据计算裁剪边界")
+                return None
+            lower = [sketches[str(col)].quantile(quantile) for col in feature_cols]
+            upper = [sketches[str(col)].quantile(1 - quantile) for col in feature_cols]
+            return {'lower': lower, 'upper': upper}
+        except Exception as e:
+            self.logger.error(f"读取特征分位数草图失败: {str(e)}")
+            return None
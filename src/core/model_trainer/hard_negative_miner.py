@@ -0,0 +1,110 @@
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.training_governor import training_thread_limit
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+
+def _as_matrix(frame):
+    matrix = np.nan_to_num(frame.to_numpy(dtype=np.float64, na_value=np.nan), nan=0.0, posinf=0.0, neginf=0.0)
+    return np.clip(matrix, -1e6, 1e6)
+
+
+class HardNegativeMiner:
+    """难负样本挖掘：在固定训练集预算内保留最容易与当前用户混淆的负样本
+
+    先用少量正样本与随机负样本训练一个浅层初筛模型，对全部负样本打分，
+    取得分（被判为当前用户的概率）最高的 hard_fraction 部分，其余预算随机抽取以保留整体分布。
+    随机部分按其代表的负样本数加权（重要性权重），使训练损失仍近似于使用全部负样本，
+    否则模型会在远离难样本的区域缺少负样本而给出偏高的分数。
+    """
+
+    def __init__(self):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        mining_config = self.config.get_model_training_config().get('hard_negative', {}) or {}
+        self.enabled = bool(mining_config.get('enabled', False))
+        self.budget = int(mining_config.get('budget', 20000))
+        self.hard_fraction = float(mining_config.get('hard_fraction', 0.3))
+        self.prelim_rounds = int(mining_config.get('prelim_rounds', 20))
+        self.prelim_sample = int(mining_config.get('prelim_sample', 5000))
+        self.random_state = 42
+
+    def select(self, positive, negative):
+        """返回 (positive, negative, negative_weights)，总行数不超过预算
+
+        未启用或不超出预算时原样返回，权重为None；初筛模型不可用时随机抽取（等权）。
+        """
+        if not self.enabled or len(positive) == 0 or len(negative) == 0:
+            return positive, negative, None
+        if len(positive) + len(negative) <= self.budget:
+            return positive, negative, None
+
+        start_time = time.time()
+        # 正样本最多占一半预算，其余全部留给负样本
+        if len(positive) > self.budget // 2:
+            positive = positive.sample(n=self.budget // 2, random_state=self.random_state)
+        negative_budget = min(len(negative), self.budget - len(positive))
+
+        scores = self._score_negatives(positive, negative)
+        if scores is None:
+            selected = negative.sample(n=negative_budget, random_state=self.random_state)
+            self.logger.info(f"初筛模型不可用，随机抽取 {negative_budget}/{len(negative)} 个负样本")
+            return positive, selected.reset_index(drop=True), None
+
+        n_hard = int(negative_budget * self.hard_fraction)
+        order = np.argsort(-scores, kind='stable')
+        hard_rows = order[:n_hard]
+        rest = order[n_hard:]
+        rng = np.random.default_rng(self.random_state)
+        n_random = negative_budget - n_hard
+        random_rows = rng.choice(rest, size=n_random, replace=False)
+        rows = np.concatenate([hard_rows, random_rows])
+        weights = np.concatenate([np.ones(n_hard), np.full(n_random, len(rest) / max(1, n_random))])
+        # 归一化为平均权重1，正负样本的相对比重与预算内行数一致
+        weights *= len(weights) / weights.sum()
+
+        self.logger.info(
+            f"难负样本挖掘: 负样本 {len(negative)} → {len(rows)}（难样本 {n_hard}, "
+            f"难样本得分下限 {scores[hard_rows[-1]] if n_hard else 0:.3f}）, 耗时 {time.time() - start_time:.2f}s"
+        )
+        return positive, negative.iloc[rows].reset_index(drop=True), weights
+
+    def _score_negatives(self, positive, negative):
+        """用浅层初筛模型对全部负样本打分（被判为正样本的概率）"""
+        if not XGBOOST_AVAILABLE:
+            return None
+        try:
+            rng = np.random.default_rng(self.random_state)
+            n_sample = min(len(negative), max(len(positive), self.prelim_sample))
+            sample_rows = rng.choice(len(negative), size=n_sample, replace=False)
+            X_pos = _as_matrix(positive)
+            X_neg = _as_matrix(negative)
+
+            X = np.vstack([X_pos, X_neg[sample_rows]])
+            y = np.concatenate([np.ones(len(X_pos)), np.zeros(n_sample)])
+            model = xgb.XGBClassifier(
+                n_estimators=self.prelim_rounds, max_depth=3, learning_rate=0.3,
+                tree_method='hist', n_jobs=training_thread_limit(self.config),
+                scale_pos_weight=n_sample / max(1, len(X_pos)), random_state=self.random_state
+            )
+            model.fit(X, y)
+            return model.predict_proba(X_neg)[:, 1]
+        except Exception as e:
+            self.logger.error(f"难负样本初筛模型训练失败: {str(e)}")
+            return None
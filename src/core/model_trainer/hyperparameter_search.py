@@ -0,0 +1,176 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.training_governor import training_thread_limit
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+
+# 默认搜索空间：偏向浅树。列表为离散取值，{low, high, log} 为连续区间（log 为真时按对数均匀采样）
+DEFAULT_SEARCH_SPACE = {
+    'max_depth': [2, 3, 4, 6],
+    'learning_rate': {'low': 0.03, 'high': 0.3, 'log': True},
+    'min_child_weight': [1, 3, 5],
+    'subsample': {'low': 0.6, 'high': 1.0},
+    'colsample_bytree': {'low': 0.5, 'high': 1.0},
+    'reg_lambda': {'low': 0.5, 'high': 5.0},
+}
+
+
+class SuccessiveHalvingSearch:
+    """逐次减半超参数搜索：在时间预算内为单个用户挑选小而快的XGBoost配置
+
+    第 r 轮以 min_rounds * eta^r 棵树（验证集早停）并行训练全部存活候选，
+    按验证AUC保留前 1/eta，直到只剩一个候选、达到 max_rounds 或用尽时间预算。
+    AUC与最优相差不超过 auc_tolerance 的候选中选推理代价（树数 × 2^深度）最小的一个。
+    """
+
+    def __init__(self):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        search_config = self.config.get_model_training_config().get('hyperparameter_search', {}) or {}
+        self.enabled = bool(search_config.get('enabled', False))
+        self.time_budget = float(search_config.get('time_budget', 60))
+        self.n_candidates = int(search_config.get('n_candidates', 16))
+        self.eta = max(2, int(search_config.get('eta', 3)))
+        self.min_rounds = int(search_config.get('min_rounds', 25))
+        self.max_rounds = int(search_config.get('max_rounds', 400))
+        self.early_stopping_rounds = int(search_config.get('early_stopping_rounds', 10))
+        self.val_fraction = float(search_config.get('val_fraction', 0.2))
+        self.auc_tolerance = float(search_config.get('auc_tolerance', 0.002))
+        self.max_age_days = float(search_config.get('max_age_days', 7))
+        self.n_parallel = int(search_config.get('n_parallel', 0) or 0)
+        self.search_space = search_config.get('search_space') or DEFAULT_SEARCH_SPACE
+        self.random_state = 42
+
+    def _sample_candidates(self, base_params):
+        rng = np.random.default_rng(self.random_state)
+        candidates = []
+        for _ in range(self.n_candidates):
+            params = dict(base_params)
+            for name, space in self.search_space.items():
+                if isinstance(space, dict):
+                    low, high = float(space['low']), float(space['high'])
+                    if space.get('log'):
+                        params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+                    else:
+                        params[name] = float(rng.uniform(low, high))
+                else:
+                    params[name] = space[int(rng.integers(len(space)))]
+            candidates.append(params)
+        return candidates
+
+    def _fit_candidate(self, params, n_rounds, n_jobs, dtrain, dval):
+        """以 n_rounds 为上限训练单个候选，返回 (验证AUC, 最佳迭代次数)"""
+        booster_params = {key: value for key, value in params.items()
+                          if key not in ('n_estimators', 'random_state', 'n_jobs', 'missing')}
+        booster_params.update({
+            'objective': 'binary:logistic',
+            'eval_metric': 'auc',
+            'tree_method': 'hist',
+            'nthread': n_jobs,
+            'seed': self.random_state,
+        })
+        evals_result = {}
+        booster = xgb.train(
+            booster_params, dtrain, num_boost_round=n_rounds,
+            evals=[(dval, 'val')], early_stopping_rounds=self.early_stopping_rounds,
+            evals_result=evals_result, verbose_eval=False
+        )
+        best_iteration = getattr(booster, 'best_iteration', n_rounds - 1)
+        return float(evals_result['val']['auc'][best_iteration]), int(best_iteration) + 1
+
+    def search(self, X, y, sample_weight=None, base_params=None, feature_names=None):
+        """返回 (最优参数, 搜索摘要)；参数中 n_estimators 为早停得到的最佳树数
+
+        xgboost 不可用、数据不足以划分验证集时返回 (None, None)。
+        """
+        if not XGBOOST_AVAILABLE:
+            return None, None
+        from sklearn.model_selection import train_test_split
+
+        X = np.clip(np.nan_to_num(np.asarray(X, dtype=np.float32), nan=0.0, posinf=0.0, neginf=0.0), -1e6, 1e6)
+        y = np.asarray(y).ravel()
+        if len(np.unique(y)) < 2 or np.bincount(y.astype(int)).min() < 5:
+            self.logger.warning("样本不足，跳过超参数搜索")
+            return None, None
+
+        start_time = time.time()
+        indices = np.arange(len(X))
+        train_idx, val_idx = train_test_split(
+            indices, test_size=self.val_fraction, stratify=y, random_state=self.random_state
+        )
+        weight = np.asarray(sample_weight, dtype=float) if sample_weight is not None else None
+        dtrain = xgb.QuantileDMatrix(X[train_idx], y[train_idx], missing=0,
+                                     weight=weight[train_idx] if weight is not None else None,
+                                     feature_names=feature_names)
+        dval = xgb.QuantileDMatrix(X[val_idx], y[val_idx], ref=dtrain, missing=0,
+                                   weight=weight[val_idx] if weight is not None else None,
+                                   feature_names=feature_names)
+
+        thread_limit = training_thread_limit(self.config)
+        n_parallel = max(1, min(self.n_parallel or thread_limit, self.n_candidates))
+        n_jobs = max(1, thread_limit // n_parallel)
+
+        survivors = [{'params': params} for params in self._sample_candidates(base_params or {})]
+        n_rounds = self.min_rounds
+        rung = 0
+        completed_rungs = 0
+        evaluated = []
+        with ThreadPoolExecutor(max_workers=n_parallel) as pool:
+            while survivors:
+                if rung > 0 and time.time() - start_time > self.time_budget:
+                    self.logger.info(f"超参数搜索用尽时间预算 {self.time_budget:.0f}s，停止于第 {rung} 轮")
+                    break
+                # XGBoost训练时释放GIL，线程池即可并行训练多个候选
+                results = list(pool.map(
+                    lambda candidate: self._fit_candidate(candidate['params'], n_rounds, n_jobs, dtrain, dval),
+                    survivors
+                ))
+                for candidate, (auc, best_rounds) in zip(survivors, results):
+                    candidate.update({'auc': auc, 'rounds': best_rounds, 'rung': rung})
+                evaluated = sorted(survivors, key=lambda c: c['auc'], reverse=True)
+                completed_rungs += 1
+                self.logger.info(
+                    f"超参数搜索第 {rung} 轮: {len(survivors)} 个候选 × 最多 {n_rounds} 棵树, "
+                    f"最优验证AUC {evaluated[0]['auc']:.4f}"
+                )
+                if len(survivors) == 1 or n_rounds >= self.max_rounds:
+                    break
+                survivors = evaluated[:max(1, len(survivors) // self.eta)]
+                n_rounds = min(self.max_rounds, n_rounds * self.eta)
+                rung += 1
+
+        best_auc = evaluated[0]['auc']
+        contenders = [c for c in evaluated if c['auc'] >= best_auc - self.auc_tolerance]
+        winner = min(contenders, key=lambda c: (c['rounds'] * 2 ** int(c['params'].get('max_depth', 6)), -c['auc']))
+
+        best_params = dict(winner['params'])
+        best_params['n_estimators'] = winner['rounds']
+        best_params['max_depth'] = int(best_params.get('max_depth', 6))
+        summary = {
+            'val_auc': winner['auc'],
+            'rungs': completed_rungs,
+            'candidates': self.n_candidates,
+            'elapsed': round(time.time() - start_time, 2),
+        }
+        self.logger.info(
+            f"超参数搜索完成: 验证AUC {winner['auc']:.4f}, 深度 {best_params['max_depth']}, "
+            f"{best_params['n_estimators']} 棵树, 耗时 {summary['elapsed']:.1f}s"
+        )
+        return best_params, summary
@@ -0,0 +1,221 @@
+import hashlib
+import inspect
+import json
+import os
+import struct
+import tempfile
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from src.core.model_trainer.compiled_ensemble import CompiledEnsemble
+except ImportError:
+    # 以 src 目录为工作目录运行（如 python src/predict.py）时按 core 包导入
+    from core.model_trainer.compiled_ensemble import CompiledEnsemble
+
+# 文件布局：固定前缀 | JSON头部 | XGBoost原生模型 | 可选的编译树集成（npz）
+# 原生模型优先使用UBJSON（xgboost>=1.6），旧版本回退到JSON，格式记录在头部 booster_format
+# 编译段位于末尾，只读取模型段的旧版读取方不受影响
+# 前缀为 魔数(4B) + 格式版本(uint16) + 头部长度(uint32) + 头部CRC32(uint32)，小端序
+MAGIC = b'UBMA'
+FORMAT_VERSION = 1
+ARTIFACT_SUFFIX = '.ubm'
+_PREFIX = struct.Struct('<4sHII')
+
+# 可写入头部并在加载时原样传给 XGBClassifier 的构造参数类型
+_PARAM_TYPES = (bool, int, float, str)
+
+
+def booster_to_bytes(booster):
+    """导出原生模型，返回 (字节, 格式)；xgboost<1.6 的 save_raw 不支持 raw_format，回退到JSON"""
+    try:
+        return bytes(booster.save_raw(raw_format='ubj')), 'ubj'
+    except TypeError:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, 'model.json')
+            booster.save_model(json_path)
+            with open(json_path, 'rb') as f:
+                return f.read(), 'json'
+
+
+def _ubj_supported(xgb):
+    return 'raw_format' in inspect.signature(xgb.Booster.save_raw).parameters
+
+
+def artifact_path(models_path, user_id):
+    """用户模型单文件路径：models/user_<id>_model.ubm"""
+    return Path(models_path) / f"user_{user_id}_model{ARTIFACT_SUFFIX}"
+
+
+class ScalerParams:
+    """从头部恢复的标准化参数，提供与 StandardScaler 相同的 transform 接口"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = np.asarray(mean, dtype=np.float64)
+        self.scale_ = np.asarray(scale, dtype=np.float64)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class ModelArtifact:
+    """单文件模型制品：XGBoost原生二进制 + 紧凑头部（特征列、标准化参数、裁剪边界、阈值、版本）
+
+    open() 只读取头部，模型在首次访问 model 时才解码，并校验SHA-256；
+    写入时同时导出纯NumPy的编译树集成（compiled），预测端可不加载 xgboost 直接评分；
+    头部自身由CRC32保护。也支持按 'model'/'scaler'/'feature_names' 键访问，
+    可直接替代 predict.load_models 返回的字典条目。
+    """
+
+    def __init__(self, path, header, booster_offset):
+        self.path = Path(path)
+        self.header = header
+        self.booster_offset = booster_offset
+        self._model = None
+        self._scaler = None
+        self._compiled = None
+
+    @classmethod
+    def write(cls, path, model, feature_cols, scaler=None, threshold=None, metadata=None, clip_bounds=None):
+        """原子写入制品文件（先写临时文件再替换），返回写入的字节数
+
+        clip_bounds 为训练时计算的逐列裁剪边界 {'lower': [...], 'upper': [...]}，预测前按同一边界清洗输入。
+        """
+        path = Path(path)
+        raw, booster_format = booster_to_bytes(model.get_booster())
+        try:
+            compiled = CompiledEnsemble.from_model(model).to_bytes()
+        except (ValueError, KeyError):
+            # 不支持编译的模型（如非二分类目标）只保存原生模型，预测端回退到 XGBoost 推理
+            compiled = b''
+
+        params = {key: value for key, value in model.get_params().items()
+                  if isinstance(value, _PARAM_TYPES) and not (isinstance(value, float) and np.isnan(value))}
+        scaler_params = None
+        if scaler is not None:
+            if not hasattr(scaler, 'mean_') or not hasattr(scaler, 'scale_'):
+                raise ValueError(f"不支持的标准化器类型: {type(scaler).__name__}")
+            scaler_params = {'mean': np.asarray(scaler.mean_).tolist(), 'scale': np.asarray(scaler.scale_).tolist()}
+
+        header = {
+            'format_version': FORMAT_VERSION,
+            'feature_cols': [str(col) for col in feature_cols],
+            'scaler': scaler_params,
+            'threshold': threshold,
+            'clip_bounds': clip_bounds,
+            'params': params,
+            'booster_format': booster_format,
+            'booster_size': len(raw),
+            'booster_sha256': hashlib.sha256(raw).hexdigest(),
+            'compiled': {'size': len(compiled), 'sha256': hashlib.sha256(compiled).hexdigest()} if compiled else None,
+            'created_at': datetime.now().isoformat(),
+            'metadata': metadata or {},
+        }
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes), zlib.crc32(header_bytes)))
+            f.write(header_bytes)
+            f.write(raw)
+            f.write(compiled)
+        os.replace(tmp_path, path)
+        return _PREFIX.size + len(header_bytes) + len(raw) + len(compiled)
+
+    @classmethod
+    def open(cls, path):
+        """只读取并校验头部；文件格式或校验不正确时抛出 ValueError"""
+        with open(path, 'rb') as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) != _PREFIX.size:
+                raise ValueError(f"模型文件不完整: {path}")
+            magic, version, header_len, header_crc = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError(f"不是模型制品文件: {path}")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"模型制品版本 {version} 高于当前支持的 {FORMAT_VERSION}: {path}")
+            header_bytes = f.read(header_len)
+        if len(header_bytes) != header_len or zlib.crc32(header_bytes) != header_crc:
+            raise ValueError(f"模型制品头部校验失败: {path}")
+        return cls(path, json.loads(header_bytes.decode('utf-8')), _PREFIX.size + header_len)
+
+    @property
+    def feature_cols(self):
+        return self.header['feature_cols']
+
+    @property
+    def threshold(self):
+        return self.header.get('threshold')
+
+    @property
+    def clip_bounds(self):
+        return self.header.get('clip_bounds')
+
+    @property
+    def metadata(self):
+        return self.header.get('metadata', {})
+
+    @property
+    def scaler(self):
+        if self._scaler is None and self.header.get('scaler'):
+            self._scaler = ScalerParams(self.header['scaler']['mean'], self.header['scaler']['scale'])
+        return self._scaler
+
+    def read_booster_bytes(self):
+        """读取模型二进制并校验SHA-256"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.booster_offset)
+            raw = f.read(self.header['booster_size'])
+        if len(raw) != self.header['booster_size'] or \
+                hashlib.sha256(raw).hexdigest() != self.header['booster_sha256']:
+            raise ValueError(f"模型制品校验和不匹配: {self.path}")
+        return raw
+
+    @property
+    def model(self):
+        """首次访问时解码为 XGBClassifier（保留训练时的构造参数，可继续增量训练）"""
+        if self._model is None:
+            import xgboost as xgb
+            # 未记录格式的制品由UBJSON写入
+            if self.header.get('booster_format', 'ubj') == 'ubj' and not _ubj_supported(xgb):
+                raise ValueError(f"模型制品为UBJSON格式，需要 xgboost>=1.6: {self.path}")
+            model = xgb.XGBClassifier(**self.header.get('params', {}))
+            model.load_model(bytearray(self.read_booster_bytes()))
+            self._model = model
+        return self._model
+
+    @property
+    def compiled(self):
+        """编译树集成（首次访问时读取并校验SHA-256）；制品中没有编译段时为None"""
+        info = self.header.get('compiled')
+        if self._compiled is None and info:
+            with open(self.path, 'rb') as f:
+                f.seek(self.booster_offset + self.header['booster_size'])
+                data = f.read(info['size'])
+            if len(data) != info['size'] or hashlib.sha256(data).hexdigest() != info['sha256']:
+                raise ValueError(f"编译模型校验和不匹配: {self.path}")
+            self._compiled = CompiledEnsemble.from_bytes(data)
+        return self._compiled
+
+    def __getitem__(self, key):
+        if key == 'model':
+            return self.model
+        if key == 'scaler':
+            return self.scaler
+        if key == 'feature_names':
+            return self.feature_cols
+        if key == 'threshold':
+            return self.threshold
+        if key == 'clip_bounds':
+            return self.clip_bounds
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
@@ -0,0 +1,205 @@
+import sqlite3
+import json
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.sanitize import sanitize_array
+
+try:
+    import xgboost as xgb
+    XGBOOST_AVAILABLE = True
+except ImportError:
+    XGBOOST_AVAILABLE = False
+
+# QuantileDMatrix（及训练时以 ref= 复用其分位点）需要 xgboost>=1.7，旧版本不构建分箱参考
+QUANTILE_DMATRIX_AVAILABLE = XGBOOST_AVAILABLE and hasattr(xgb, 'QuantileDMatrix')
+
+
+class NegativeMatrixCache:
+    """负样本矩阵缓存：按负样本池版本缓存解析后的特征矩阵与预分箱的 QuantileDMatrix
+
+    负样本池内容不变时，多个用户、多次重训共用同一份解析结果与分位点切分，
+    每个用户只需把自己的正样本按已有切分量化，不再重复解析JSON和计算分位数草图。
+    """
+
+    def __init__(self, negative_pool, cache_dir=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        self.negative_pool = negative_pool
+
+        if cache_dir is None:
+            cache_dir = Path(self.config.get_paths()['models']) / 'cache'
+        self.cache_dir = Path(cache_dir)
+
+        pool_config = self.config.get_model_training_config().get('negative_pool', {}) or {}
+        self.max_bin = int(pool_config.get('max_bin', 256))
+
+        self.version = None
+        self.columns = []
+        self.matrix = None
+        self.sources = None
+        self.ranks = None
+        self._reference = None
+        self._reference_key = None
+
+    def _cache_file(self, version):
+        return self.cache_dir / f"negative_pool_v{version}.npz"
+
+    def refresh(self):
+        """确保缓存与当前负样本池版本一致，版本变化时重新加载"""
+        if self.negative_pool.is_empty():
+            self.logger.info("负样本池为空，首次从features表构建")
+            self.negative_pool.rebuild_from_features()
+
+        version = self.negative_pool.get_version()
+        if version == self.version and self.matrix is not None:
+            return True
+
+        start_time = time.time()
+        if not self._load_from_disk(version):
+            self._load_from_pool()
+            self._save_to_disk(version)
+
+        self.version = version
+        self._reference = None
+        self._reference_key = None
+        self.logger.info(
+            f"负样本矩阵缓存已更新: 版本 {version}, {len(self.matrix)} 条 × {len(self.columns)} 个特征, "
+            f"耗时 {time.time() - start_time:.2f}s"
+        )
+        return True
+
+    def _load_from_pool(self):
+        """从负样本池一次性读取并解析全部缓存行"""
+        conn = sqlite3.connect(str(self.negative_pool.db_path))
+        try:
+            n_users = conn.execute('SELECT COUNT(*) FROM negative_pool_stats').fetchone()[0]
+            # 排除任一用户后仍能凑满 max_size 的每用户槽位上限
+            quota = max(1, -(-self.negative_pool.max_size // max(1, n_users - 1)))
+            # 低号槽位偏向各用户最早的窗口（Algorithm R 按到达顺序填充），按每用户随机排名取 quota 条；
+            # 排名随缓存保存，取样时按排名截取即为均匀子样本
+            rows = conn.execute('''
+                SELECT source_user_id, pick, feature_vector FROM (
+                    SELECT source_user_id, feature_vector,
+                           ROW_NUMBER() OVER (PARTITION BY source_user_id ORDER BY random()) - 1 AS pick
+                    FROM negative_pool
+                )
+                WHERE pick < ?
+                ORDER BY source_user_id, pick
+            ''', (quota,)).fetchall()
+        finally:
+            conn.close()
+
+        vectors = []
+        for _, _, vector_str in rows:
+            try:
+                vectors.append(json.loads(vector_str) if isinstance(vector_str, str) else (vector_str or {}))
+            except Exception:
+                vectors.append({})
+
+        frame = pd.DataFrame(vectors)
+        frame = frame.apply(pd.to_numeric, errors='coerce') if not frame.empty else frame
+        self.columns = [str(col) for col in frame.columns]
+        self.matrix = frame.to_numpy(dtype=np.float32, na_value=np.nan) if len(frame) else \
+            np.empty((0, 0), dtype=np.float32)
+        self.sources = np.array([row[0] for row in rows], dtype=object)
+        self.ranks = np.array([row[1] for row in rows], dtype=np.int64)
+
+    def _load_from_disk(self, version):
+        cache_file = self._cache_file(version)
+        if not cache_file.exists():
+            return False
+        try:
+            with np.load(cache_file, allow_pickle=False) as data:
+                self.matrix = data['matrix']
+                self.columns = [str(col) for col in data['columns']]
+                self.sources = data['sources'].astype(object)
+                self.ranks = data['ranks']
+            return True
+        except Exception as e:
+            self.logger.warning(f"读取负样本矩阵缓存失败，将重新构建: {str(e)}")
+            return False
+
+    def _save_to_disk(self, version):
+        """持久化当前版本的矩阵，并清理旧版本缓存文件"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            cache_file = self._cache_file(version)
+            tmp_file = cache_file.with_suffix('.tmp.npz')
+            np.savez(
+                tmp_file,
+                matrix=self.matrix,
+                columns=np.array(self.columns, dtype=str),
+                sources=np.array(self.sources, dtype=str),
+                ranks=self.ranks
+            )
+            tmp_file.replace(cache_file)
+            for old_file in self.cache_dir.glob('negative_pool_v*.npz'):
+                if old_file != cache_file:
+                    old_file.unlink(missing_ok=True)
+        except Exception as e:
+            self.logger.warning(f"保存负样本矩阵缓存失败: {str(e)}")
+
+    def get_negative_samples(self, exclude_user_id, limit=None):
+        """按来源用户分层取负样本（排除当前用户），返回已解析的特征DataFrame"""
+        try:
+            self.refresh()
+            limit = int(limit) if limit else self.negative_pool.max_size
+            exclude_user = str(exclude_user_id).strip()
+
+            other = self.sources != exclude_user
+            n_users = len(np.unique(self.sources[other]))
+            if n_users == 0:
+                self.logger.warning("负样本池中没有其他用户的数据")
+                return pd.DataFrame()
+
+            # 与 NegativeSamplePool.load_negative_samples 相同的分层规则：每个用户按随机排名取 quota 条
+            quota = max(1, -(-limit // n_users))
+            rows = np.flatnonzero(other & (self.ranks < quota))
+            df = pd.DataFrame(self.matrix[rows], columns=self.columns)
+            if len(df) > limit:
+                df = df.sample(n=limit, random_state=42).reset_index(drop=True)
+            return df
+
+        except Exception as e:
+            self.logger.error(f"从负样本矩阵缓存读取负样本失败: {str(e)}")
+            return pd.DataFrame()
+
+    def get_reference(self, feature_cols, clip_bounds=None):
+        """返回按负样本构建的 QuantileDMatrix 作为分箱参考（特征列可以是缓存列的子集）
+
+        clip_bounds 为训练使用的逐列裁剪边界：负样本按与训练矩阵相同的边界与类型清洗后再分箱，
+        分位点不会落在训练数据中不存在的取值上。参考按 (池版本, 特征列, 边界) 缓存。
+        特征列不在缓存中、xgboost不可用或版本不支持 QuantileDMatrix 时返回 None，调用方回退到常规训练。
+        """
+        if not QUANTILE_DMATRIX_AVAILABLE or self.matrix is None or len(self.matrix) == 0:
+            return None
+        feature_cols = [str(col) for col in feature_cols]
+        if not set(feature_cols) <= set(self.columns):
+            return None
+
+        bounds = clip_bounds or {}
+        lower, upper = bounds.get('lower'), bounds.get('upper')
+        key = (self.version, tuple(feature_cols),
+               tuple(lower) if lower is not None else None, tuple(upper) if upper is not None else None)
+        if self._reference is None or self._reference_key != key:
+            start_time = time.time()
+            order = [self.columns.index(col) for col in feature_cols]
+            # 与 train_model_arrays 相同的清洗（sanitize_array，float32，逐列边界），保证分位点与训练输入一致
+            reference_matrix = sanitize_array(self.matrix[:, order], lower=lower, upper=upper)
+            self._reference = xgb.QuantileDMatrix(
+                reference_matrix, missing=0, max_bin=self.max_bin, feature_names=feature_cols
+            )
+            self._reference_key = key
+            self.logger.info(f"负样本分箱参考构建完成: 耗时 {time.time() - start_time:.2f}s")
+        return self._reference
@@ -0,0 +1,256 @@
+import sqlite3
+import random
+import time
+from pathlib import Path
+import sys
+
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.database.schema_migrations import ensure_schema
+
+
+class NegativeSamplePool:
+    """负样本池：按来源用户分层的蓄水池采样，随特征写入增量维护
+
+    每个来源用户最多保留 per_user_size 条特征（Algorithm R），训练时按用户
+    均分 max_size 的配额读取，读取量与数据库总规模无关。
+    """
+
+    def __init__(self, db_path=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        if db_path is None:
+            paths_config = self.config.get_paths()
+            if 'database' in paths_config and paths_config['database']:
+                db_path = Path(paths_config['database'])
+            else:
+                db_path = Path(paths_config['data']) / 'mouse_data.db'
+        self.db_path = Path(db_path)
+        ensure_schema(self.db_path)
+
+        pool_config = self.config.get_model_training_config().get('negative_pool', {}) or {}
+        self.enabled = bool(pool_config.get('enabled', True))
+        self.per_user_size = int(pool_config.get('per_user_size', 2000))
+        self.max_size = int(pool_config.get('max_size', 100000))
+        self._rng = random.Random(pool_config.get('random_state'))
+
+    def add_samples(self, rows, conn=None):
+        """增量加入新特征：rows 为 (feature_id, user_id, feature_vector) 序列
+
+        传入 conn 时复用调用方的连接与事务，由调用方负责提交。
+        """
+        if not self.enabled:
+            return 0
+
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+
+            seen_cache = {}
+            changed = 0
+            for feature_id, user_id, feature_vector in rows:
+                source_user = str(user_id).strip()
+                if source_user not in seen_cache:
+                    cursor.execute(
+                        'SELECT seen_count FROM negative_pool_stats WHERE source_user_id = ?',
+                        (source_user,)
+                    )
+                    result = cursor.fetchone()
+                    seen_cache[source_user] = result[0] if result else 0
+
+                seen = seen_cache[source_user] + 1
+                seen_cache[source_user] = seen
+
+                # Algorithm R：前 k 条直接入池，之后以 k/seen 的概率替换随机槽位
+                if seen <= self.per_user_size:
+                    slot = seen - 1
+                else:
+                    slot = self._rng.randrange(seen)
+                    if slot >= self.per_user_size:
+                        continue
+
+                cursor.execute('''
+                    INSERT OR REPLACE INTO negative_pool
+                    (source_user_id, slot, feature_id, feature_vector)
+                    VALUES (?, ?, ?, ?)
+                ''', (source_user, slot, feature_id, feature_vector))
+                changed += 1
+
+            if seen_cache:
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO negative_pool_stats (source_user_id, seen_count)
+                    VALUES (?, ?)
+                ''', list(seen_cache.items()))
+            if changed:
+                self._bump_version(cursor)
+
+            if own_conn:
+                conn.commit()
+            return changed
+        finally:
+            if own_conn:
+                conn.close()
+
+    def remove_sources(self, like_patterns, conn=None):
+        """移除匹配LIKE模式的来源用户（与features表清理保持同步）"""
+        own_conn = conn is None
+        if own_conn:
+            conn = sqlite3.connect(str(self.db_path))
+        try:
+            cursor = conn.cursor()
+            removed = 0
+            for pattern in like_patterns:
+                cursor.execute('DELETE FROM negative_pool WHERE source_user_id LIKE ?', (pattern,))
+                removed += cursor.rowcount
+                cursor.execute('DELETE FROM negative_pool_stats WHERE source_user_id LIKE ?', (pattern,))
+            if removed:
+                self._bump_version(cursor)
+            if own_conn:
+                conn.commit()
+            return removed
+        finally:
+            if own_conn:
+                conn.close()
+
+    def _bump_version(self, cursor):
+        """负样本池内容变化时递增版本号，供下游缓存失效使用"""
+        cursor.execute('''
+            INSERT INTO negative_pool_meta (key, value) VALUES ('version', '1')
+            ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+        ''')
+        cursor.execute('''
+            INSERT OR REPLACE INTO negative_pool_meta (key, value) VALUES ('updated_at', ?)
+        ''', (str(time.time()),))
+
+    def get_version(self):
+        """获取负样本池版本号（池不存在时返回0）"""
+        try:
+            conn = sqlite3.connect(str(self.db_path))
+            try:
+                result = conn.execute(
+                    "SELECT value FROM negative_pool_meta WHERE key = 'version'"
+                ).fetchone()
+                return int(result[0]) if result else 0
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.error(f"获取负样本池版本失败: {str(e)}")
+            return 0
+
+    def is_empty(self):
+        """负样本池是否为空"""
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            return conn.execute('SELECT 1 FROM negative_pool LIMIT 1').fetchone() is None
+        finally:
+            conn.close()
+
+    def rebuild_from_features(self, batch_size=10000):
+        """从features表全量重建负样本池（仅在首次启用或手动修复时使用）"""
+        try:
+            start_time = time.time()
+            self.logger.info("开始从features表重建负样本池...")
+
+            conn = sqlite3.connect(str(self.db_path))
+            try:
+                conn.execute('DELETE FROM negative_pool')
+                conn.execute('DELETE FROM negative_pool_stats')
+
+                read_cursor = conn.cursor()
+                read_cursor.execute('SELECT id, user_id, feature_vector FROM features ORDER BY id')
+                total = 0
+                while True:
+                    rows = read_cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    self.add_samples(rows, conn=conn)
+                    total += len(rows)
+                conn.commit()
+            finally:
+                conn.close()
+
+            self.logger.info(f"负样本池重建完成: 扫描 {total} 条特征, 耗时 {time.time() - start_time:.2f}s")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"重建负样本池失败: {str(e)}")
+            return False
+
+    def load_negative_samples(self, exclude_user_id, limit=None):
+        """按来源用户分层读取负样本，排除当前用户，返回原始feature_vector的DataFrame"""
+        try:
+            if self.is_empty():
+                self.logger.info("负样本池为空，首次从features表构建")
+                self.rebuild_from_features()
+
+            limit = int(limit) if limit else self.max_size
+            exclude_user = str(exclude_user_id).strip()
+
+            conn = sqlite3.connect(str(self.db_path))
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT COUNT(*) FROM negative_pool_stats WHERE source_user_id != ?',
+                    (exclude_user,)
+                )
+                n_users = cursor.fetchone()[0]
+                if n_users == 0:
+                    self.logger.warning("负样本池中没有其他用户的数据")
+                    return pd.DataFrame()
+
+                # 蓄水池整体是均匀样本，但槽位号不是：前 k 个槽位按到达顺序填充，低号槽位偏向最早的窗口。
+                # 因此每个用户在已填充槽位中随机取 quota 个，才是分层均匀子样本
+                quota = max(1, -(-limit // n_users))
+                df = pd.read_sql_query('''
+                    SELECT feature_vector FROM (
+                        SELECT feature_vector,
+                               ROW_NUMBER() OVER (PARTITION BY source_user_id ORDER BY random()) AS pick
+                        FROM negative_pool
+                        WHERE source_user_id != ?
+                    )
+                    WHERE pick <= ?
+                ''', conn, params=(exclude_user, quota))
+            finally:
+                conn.close()
+
+            if len(df) > limit:
+                df = df.sample(n=limit, random_state=42).reset_index(drop=True)
+
+            self.logger.info(f"从负样本池读取了 {len(df)} 条负样本（{n_users} 个来源用户，每用户上限 {quota}）")
+            return df
+
+        except Exception as e:
+            self.logger.error(f"从负样本池读取负样本失败: {str(e)}")
+            return pd.DataFrame()
+
+    def get_pool_stats(self):
+        """获取负样本池统计信息"""
+        try:
+            conn = sqlite3.connect(str(self.db_path))
+            try:
+                pool_size = conn.execute('SELECT COUNT(*) FROM negative_pool').fetchone()[0]
+                n_users, total_seen = conn.execute(
+                    'SELECT COUNT(*), COALESCE(SUM(seen_count), 0) FROM negative_pool_stats'
+                ).fetchone()
+            finally:
+                conn.close()
+            return {
+                'pool_size': pool_size,
+                'source_users': n_users,
+                'total_seen': total_seen,
+                'version': self.get_version(),
+                'per_user_size': self.per_user_size,
+                'max_size': self.max_size
+            }
+        except Exception as e:
+            self.logger.error(f"获取负样本池统计失败: {str(e)}")
+            return {}
@@ -0,0 +1,64 @@
+import warnings
+
+import numpy as np
+
+# 训练与预测共用的特征清洗：只依赖 NumPy，预测进程导入时不会加载 xgboost/sklearn
+
+
+def sanitize_array(X, clip_value=1e6, dtype=np.float32, block_rows=8192, lower=None, upper=None, report=False):
+    """单次清洗特征矩阵：转为连续浮点数组，非有限值置0并裁剪到[-clip_value, clip_value]
+
+    按行块处理，类型转换、nan/inf替换和裁剪在同一块上完成，块数据常驻缓存，
+    整体只遍历一次内存。等价于 preprocess_data/train_model 中的多次 replace/fillna/clip。
+    lower/upper 为逐列裁剪边界（训练时由 compute_clip_bounds 计算并随模型保存），给定时代替 clip_value。
+    report 为真时返回 (数组, {'nonfinite': 各列非有限值个数, 'clipped': 各列被裁剪个数})，计数在同一块上完成。
+    """
+    X = np.asarray(X)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    low = -clip_value if lower is None else np.asarray(lower, dtype=dtype)
+    high = clip_value if upper is None else np.asarray(upper, dtype=dtype)
+    out = np.empty(X.shape, dtype=dtype, order='C')
+    nonfinite = np.zeros(X.shape[1], dtype=np.int64) if report else None
+    clipped = np.zeros(X.shape[1], dtype=np.int64) if report else None
+    for start in range(0, X.shape[0], block_rows):
+        block = out[start:start + block_rows]
+        block[...] = X[start:start + block_rows]
+        if report:
+            nonfinite += (~np.isfinite(block)).sum(axis=0)
+        np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+        if report:
+            clipped += ((block < low) | (block > high)).sum(axis=0)
+        np.clip(block, low, high, out=block)
+    if report:
+        return out, {'nonfinite': nonfinite, 'clipped': clipped}
+    return out
+
+def compute_clip_bounds(X, quantile=0.001):
+    """逐列裁剪边界：各列有限值的 [quantile, 1 - quantile] 分位数（quantile 为0时即列最小/最大值）
+
+    nan/inf 不参与计算，输入无需预先清洗；某列没有有限值时边界为0（与 sanitize_array 的替换值一致）。
+    返回 {'lower': [...], 'upper': [...]}，可写入模型制品，预测时传给 sanitize_array。
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim == 1:
+        X = X.reshape(-1, 1)
+    if len(X) == 0:
+        return None
+    finite = np.isfinite(X)
+    if finite.all():
+        if quantile > 0:
+            lower, upper = np.quantile(X, [quantile, 1 - quantile], axis=0)
+        else:
+            lower, upper = X.min(axis=0), X.max(axis=0)
+    else:
+        X = np.where(finite, X, np.nan)
+        with warnings.catch_warnings():
+            # 全为非有限值的列返回nan（All-NaN slice 警告），下面置0
+            warnings.simplefilter('ignore', RuntimeWarning)
+            if quantile > 0:
+                lower, upper = np.nanquantile(X, [quantile, 1 - quantile], axis=0)
+            else:
+                lower, upper = np.nanmin(X, axis=0), np.nanmax(X, axis=0)
+        lower, upper = np.nan_to_num(lower, nan=0.0), np.nan_to_num(upper, nan=0.0)
+    return {'lower': lower.astype(float).tolist(), 'upper': upper.astype(float).tolist()}
@@ -15,17 +15,29 @@ sys.path.insert(0, str(project_root))
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.negative_sample_pool import NegativeSamplePool
+from src.core.model_trainer.negative_matrix_cache import NegativeMatrixCache
+from src.core.model_trainer.feature_selector import FeatureSelector
+from src.core.model_trainer.feature_sketch import FeatureSketchStore
+from src.core.model_trainer.hard_negative_miner import HardNegativeMiner
+from src.core.model_trainer.hyperparameter_search import SuccessiveHalvingSearch
+from src.core.model_trainer.external_memory_trainer import ExternalMemoryTrainer
+from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+from src.core.model_trainer.training_governor import training_thread_limit
+from src.core.database.schema_migrations import prefix_bounds
 
 # 仅在导入错误时才回退到mock；其他错误直接抛出，避免误用mock
 try:
     from src.classification import (
-        load_data, preprocess_data, train_model, evaluate_model, save_model
+        load_data, preprocess_data, train_model, train_model_arrays, cross_validate_arrays, evaluate_model, save_model,
+        sanitize_array, compute_clip_bounds
     )
     CLASSIFICATION_AVAILABLE = True
 except (ImportError, ModuleNotFoundError) as e:
     print(f"警告: 未找到真实classification依赖，将回退到模拟版: {e}")
     from src.classification_mock import (
-        load_data, preprocess_data, train_model, evaluate_model, save_model
+        load_data, preprocess_data, train_model, train_model_arrays, cross_validate_arrays, evaluate_model, save_model,
+        sanitize_array, compute_clip_bounds
     )
     CLASSIFICATION_AVAILABLE = False
 
@@ -41,24 +53,74 @@ class SimpleModelTrainer:
             self.db_path = Path(paths_config['data']) / 'mouse_data.db'
         self.models_path = Path(self.config.get_paths()['models'])
         self.models_path.mkdir(parents=True, exist_ok=True)
+        self.negative_pool = NegativeSamplePool(self.db_path)
+        self.negative_cache = NegativeMatrixCache(self.negative_pool, self.models_path / 'cache')
+        self.feature_selector = FeatureSelector(self.negative_cache, self.models_path / 'cache')
+        self.hard_negative_miner = HardNegativeMiner()
+        self.hyperparameter_search = SuccessiveHalvingSearch()
+        self.feature_sketches = FeatureSketchStore(self.db_path)
+        
+        # 增量训练配置：在已有模型上继续boosting，超出条件时回退全量训练
+        training_config = self.config.get_model_training_config()
+        incremental_config = training_config.get('incremental', {}) or {}
+        self.incremental_enabled = bool(incremental_config.get('enabled', True))
+        self.max_extra_rounds = int(incremental_config.get('max_extra_rounds', 20))
+        self.max_total_rounds = int(incremental_config.get('max_total_rounds', 400))
+        self.min_new_samples = int(incremental_config.get('min_new_samples', 10))
+        self.drift_threshold = float(incremental_config.get('drift_threshold', 0.5))
+        self.min_accuracy = float(incremental_config.get('min_accuracy',
+                                                         training_config.get('retrain_threshold', 0.8)))
+        
+        # 逐列裁剪边界取全部用户特征分位数草图的 [q, 1-q] 分位数，随模型保存，预测时按同一边界清洗
+        self.clip_quantile = float(training_config.get('clip_quantile', 0.001))
+        
+        # 外存训练：负样本池整体超出内存预算时按批流式训练
+        external_config = training_config.get('external_memory', {}) or {}
+        self.external_memory_enabled = bool(external_config.get('enabled', False))
+        
+        # 交叉验证评估：以折外预测计算指标，替代在训练集上的评估
+        cv_config = training_config.get('cross_validation', {}) or {}
+        self.cv_enabled = bool(cv_config.get('enabled', True))
+        self.cv_splits = int(cv_config.get('n_splits', 3))
+        self.cv_max_rows = int(cv_config.get('max_rows', 50000) or 0)
+        self.cv_workers = int(cv_config.get('n_workers', 0) or 0)
+        # XGBoost训练线程数：与训练调度器子进程的线程预算一致
+        self.training_threads = training_thread_limit(self.config)
+        # 写入模型制品头部，供预测端直接使用
+        self.anomaly_threshold = self.config.get_prediction_config().get('anomaly_threshold')
+        
+        # 后台训练服务设置：进度回调(stage, percent)，以及模型输出目录（暂存目录，完成后再原子移交）
+        self.progress_callback = None
+        self.output_path = self.models_path
         
         if not CLASSIFICATION_AVAILABLE:
             self.logger.error("classification模块不可用，模型训练功能受限")
         
         self.logger.info("简单模型训练器初始化完成")
 
-    def load_user_features_from_db(self, user_id):
-        """从数据库加载用户特征数据"""
+    def _report_progress(self, stage, percent):
+        if self.progress_callback is not None:
+            try:
+                self.progress_callback(stage, percent)
+            except Exception:
+                pass
+
+    def load_user_features_from_db(self, user_id, since=None):
+        """从数据库加载用户特征数据（指定since时只加载该时间戳之后新增的窗口）"""
         try:
             conn = sqlite3.connect(self.db_path)
             
             query = '''
-                SELECT feature_vector FROM features 
+                SELECT feature_vector, timestamp FROM features 
                 WHERE user_id = ?
-                ORDER BY timestamp DESC
             '''
+            params = [user_id]
+            if since is not None:
+                query += ' AND timestamp > ?'
+                params.append(since)
+            query += ' ORDER BY timestamp DESC'
             
-            df = pd.read_sql_query(query, conn, params=(user_id,))
+            df = pd.read_sql_query(query, conn, params=params)
             conn.close()
             
             if not df.empty:
@@ -79,14 +141,15 @@ class SimpleModelTrainer:
             
             query = '''
                 SELECT feature_vector FROM features 
-                WHERE user_id LIKE 'training_user%' OR user_id LIKE 'test_user%'
+                WHERE (user_id >= ? AND user_id < ?) OR (user_id >= ? AND user_id < ?)
                 ORDER BY timestamp DESC
             '''
             
             if limit:
                 query += f' LIMIT {limit}'
             
-            df = pd.read_sql_query(query, conn, params=())
+            params = prefix_bounds('training_user') + prefix_bounds('test_user')
+            df = pd.read_sql_query(query, conn, params=params)
             conn.close()
             
             if not df.empty:
@@ -112,7 +175,7 @@ class SimpleModelTrainer:
             # 优先加载其他非当前用户的数据作为负样本
             query = '''
                 SELECT feature_vector FROM features 
-                WHERE TRIM(user_id) != TRIM(?)
+                WHERE user_id != ?
                 ORDER BY timestamp DESC
             '''
             
@@ -122,7 +185,8 @@ class SimpleModelTrainer:
             self.logger.info(f"执行查询: {query}")
             self.logger.info(f"查询参数: {exclude_user_id}")
             
-            df = pd.read_sql_query(query, conn, params=(exclude_user_id,))
+            # 用户ID已在迁移中规范化，直接比较即可走 timestamp 索引
+            df = pd.read_sql_query(query, conn, params=(str(exclude_user_id).strip(),))
             self.logger.info(f"查询结果: {len(df)} 条记录")
             
             conn.close()
@@ -145,6 +209,16 @@ class SimpleModelTrainer:
             self.logger.error(f"异常详情: {traceback.format_exc()}")
             return pd.DataFrame()
 
+    def load_negative_samples_from_pool(self, exclude_user_id, limit=None):
+        """从负样本池读取分层采样的负样本，读取量只取决于池容量而非数据库总规模"""
+        if not self.negative_pool.enabled:
+            return self.load_other_users_features_from_db(exclude_user_id, limit=limit)
+        
+        # 解析结果按负样本池版本缓存，多用户/多次重训共用
+        df = self.negative_cache.get_negative_samples(exclude_user_id, limit=limit)
+        self.logger.info(f"从负样本池加载了 {len(df)} 条负样本")
+        return df
+
     def _parse_feature_vectors(self, df):
         """解析特征向量JSON字符串"""
         try:
@@ -183,9 +257,9 @@ class SimpleModelTrainer:
                 
                 cursor.execute('''
                     SELECT feature_vector FROM features 
-                    WHERE user_id LIKE 'training_user%' 
+                    WHERE user_id >= ? AND user_id < ?
                     LIMIT 1
-                ''')
+                ''', prefix_bounds('training_user'))
                 
                 result = cursor.fetchone()
                 conn.close()
@@ -213,8 +287,12 @@ class SimpleModelTrainer:
             self.logger.error(f"特征对齐失败: {str(e)}")
             return features_df
 
-    def prepare_training_data(self, user_id, negative_sample_limit=100000):
-        """准备训练数据：当前用户作为正样本，负样本仅使用非当前用户的全部样本"""
+    def prepare_training_data(self, user_id, negative_sample_limit=None, return_weights=False):
+        """准备训练数据：当前用户作为正样本，负样本取自按来源用户分层的负样本池
+
+        return_weights=True 时额外返回样本权重（未做难负样本挖掘时为None）。
+        """
+        failed = (None, None, None, None) if return_weights else (None, None, None)
         try:
             self.logger.info(f"开始准备用户 {user_id} 的训练数据")
             
@@ -222,10 +300,11 @@ class SimpleModelTrainer:
             positive_samples = self.load_user_features_from_db(user_id)
             if positive_samples.empty:
                 self.logger.error(f"用户 {user_id} 没有特征数据")
-                return None, None, None
+                return failed
             
-            # 2. 负样本：仅使用非当前用户的全部样本（不再补充训练数据，不限数量）
-            negative_samples = self.load_other_users_features_from_db(user_id, limit=None)
+            # 2. 负样本：从负样本池读取非当前用户的分层样本（上限由 negative_pool.max_size 控制）
+            negative_samples = self.load_negative_samples_from_pool(user_id, limit=negative_sample_limit)
+            negative_weights = None
             
             # 4. 特征对齐
             if not negative_samples.empty:
@@ -233,6 +312,11 @@ class SimpleModelTrainer:
                 aligned_positive = self._align_features(positive_samples, negative_samples.columns)
                 aligned_negative = self._align_features(negative_samples, negative_samples.columns)
 
+                # 超出训练集预算时只保留难负样本与加权的随机余量（未启用时不做处理）
+                aligned_positive, aligned_negative, negative_weights = self.hard_negative_miner.select(
+                    aligned_positive, aligned_negative
+                )
+
                 # 平衡样本：若正样本多于负样本，则下采样正样本至与负样本相同数量
                 if len(aligned_positive) > len(aligned_negative) and len(aligned_negative) > 0:
                     self.logger.info(
@@ -263,7 +347,11 @@ class SimpleModelTrainer:
             
             if len(feature_cols) == 0:
                 self.logger.error("没有找到有效的特征列")
-                return None, None, None
+                return failed
+            
+            # 按负样本池版本缓存的方差/互信息排名筛选特征（各用户共用，不再逐用户计算）
+            if not negative_samples.empty:
+                feature_cols = self.feature_selector.select(feature_cols)
             
             # 准备特征矩阵
             X = combined_data[feature_cols].fillna(0)
@@ -281,72 +369,222 @@ class SimpleModelTrainer:
             self.logger.info(f"  负样本（其他用户）: {negative_count}")
             self.logger.info(f"  总计: {len(X)} 个样本, {len(feature_cols)} 个特征")
             
+            if return_weights:
+                sample_weight = None
+                if negative_weights is not None:
+                    sample_weight = np.concatenate([np.ones(positive_count), negative_weights])
+                return X, y, feature_cols, sample_weight
             return X, y, feature_cols
             
         except Exception as e:
             self.logger.error(f"准备训练数据失败: {str(e)}")
-            return None, None, None
+            return failed
+
+    def get_user_watermark(self, user_id):
+        """获取用户特征的最新时间戳，作为训练水位线"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            result = conn.execute(
+                'SELECT MAX(timestamp) FROM features WHERE user_id = ?', (user_id,)
+            ).fetchone()
+            conn.close()
+            return result[0] if result else None
+        except Exception as e:
+            self.logger.error(f"获取用户 {user_id} 训练水位线失败: {str(e)}")
+            return None
+
+    def _load_feature_info(self, user_id):
+        """读取模型对应的特征信息文件"""
+        feature_info_path = self.models_path / f"user_{user_id}_features.json"
+        if not feature_info_path.exists():
+            return None
+        with open(feature_info_path, 'r') as f:
+            return json.load(f)
 
-    def train_user_model(self, user_id):
-        """训练用户模型"""
+    def train_user_model(self, user_id, incremental=None):
+        """训练用户模型（默认优先增量更新已有模型，不满足条件时全量训练）"""
         self.logger.info(f"开始训练用户 {user_id} 的模型")
         
+        if incremental is None:
+            incremental = self.incremental_enabled
+        if incremental:
+            self._report_progress('incremental', 5)
+            result = self._incremental_update(user_id)
+            if result is not None:
+                return result
+            self.logger.info(f"用户 {user_id} 执行全量训练")
+        
+        # 先记录水位线再读取数据：之后写入的窗口会在下次增量训练中被覆盖
+        watermark = self.get_user_watermark(user_id)
+        
+        if self.external_memory_enabled:
+            return self._train_with_external_memory(user_id, watermark=watermark)
+        
         # 1. 准备训练数据
-        X, y, feature_cols = self.prepare_training_data(user_id)
+        self._report_progress('prepare', 10)
+        X, y, feature_cols, sample_weight = self.prepare_training_data(user_id, return_weights=True)
         if X is None:
             self.logger.error(f"用户 {user_id} 训练数据准备失败")
             return False
+        self._report_progress('train', 30)
         
         # 2. 使用classification模块训练模型
-        return self._train_with_classification_module(X, y, user_id, feature_cols)
+        return self._train_with_classification_module(X, y, user_id, feature_cols, watermark=watermark,
+                                                       sample_weight=sample_weight)
 
-    def _train_with_classification_module(self, X, y, user_id, feature_cols):
-        """使用classification模块训练模型"""
+    def _incremental_update(self, user_id):
+        """在已有模型上用水位线之后的新窗口继续boosting
+
+        返回 True/False 表示增量训练结果；返回 None 表示需要回退到全量训练。
+        """
         try:
-            self.logger.info("使用classification模块训练模型")
+            feature_info = self._load_feature_info(user_id)
+            model = self._load_model_file(user_id) if feature_info else None
+            if not feature_info or feature_info.get('watermark') is None or model is None:
+                self.logger.info(f"用户 {user_id} 没有可增量更新的模型")
+                return None
             
-            # 创建临时数据文件
-            temp_data_path = self.models_path / f"temp_data_{user_id}.csv"
+            if not hasattr(model, 'get_booster'):
+                self.logger.info("现有模型不支持继续boosting")
+                return None
             
-            # 准备数据
-            data_df = X.copy()
-            data_df['label'] = y
-            data_df.to_csv(temp_data_path, index=False)
+            # 1. 只加载水位线之后新增的窗口
+            watermark = self.get_user_watermark(user_id)
+            new_positive = self.load_user_features_from_db(user_id, since=feature_info['watermark'])
+            if len(new_positive) < self.min_new_samples:
+                # 显式重训不能在未训练的情况下报告成功：新窗口不足以增量更新时回退全量训练
+                self.logger.info(
+                    f"用户 {user_id} 新增窗口 {len(new_positive)} 个，少于 {self.min_new_samples}，回退全量训练"
+                )
+                return None
             
-            # 使用classification模块的函数
-            data_result = load_data(str(temp_data_path))
-            if data_result is None or len(data_result) < 1:
-                self.logger.error("数据加载失败")
-                return False
+            feature_cols = feature_info['feature_cols']
+            new_negative = self.load_negative_samples_from_pool(user_id, limit=len(new_positive))
+            if new_negative.empty:
+                return None
             
-            # 提取数据（load_data返回(data, None, None)）
-            data = data_result[0] if isinstance(data_result, tuple) else data_result
-            if data is None:
-                self.logger.error("数据加载失败")
-                return False
+            clip_bounds = feature_info.get('clip_bounds') or {}
+            
+            def to_matrix(df):
+                df = df.apply(pd.to_numeric, errors='coerce')
+                X = df.reindex(columns=feature_cols).to_numpy(dtype=np.float64, na_value=np.nan)
+                return sanitize_array(X, lower=clip_bounds.get('lower'), upper=clip_bounds.get('upper'))
+            
+            X_pos = to_matrix(new_positive)
+            X_neg = to_matrix(new_negative)
+            X_new = np.vstack([X_pos, X_neg])
+            y_new = np.concatenate([np.ones(len(X_pos)), np.zeros(len(X_neg))])
+            
+            # 2. 漂移检查：新正样本均值相对全量训练时的偏移（以标准差计）
+            means = feature_info.get('feature_means')
+            stds = feature_info.get('feature_stds')
+            if means is not None and stds is not None:
+                drift = float(np.mean(
+                    np.abs(X_pos.mean(axis=0) - np.asarray(means)) / np.maximum(np.asarray(stds), 1e-6)
+                ))
+                self.logger.info(f"用户 {user_id} 特征漂移度: {drift:.4f}")
+                if drift > self.drift_threshold:
+                    self.logger.info(f"特征漂移 {drift:.4f} 超过阈值 {self.drift_threshold}，回退全量训练")
+                    return None
+            
+            # 3. 准确率检查：旧模型在新数据上表现过差时不再在其基础上修补
+            X_frame = pd.DataFrame(X_new, columns=feature_cols)
+            old_accuracy = float(np.mean(model.predict(X_frame) == y_new))
+            self.logger.info(f"现有模型在新数据上的准确率: {old_accuracy:.4f}")
+            if old_accuracy < self.min_accuracy:
+                self.logger.info(f"准确率低于 {self.min_accuracy}，回退全量训练")
+                return None
             
-            # 预处理数据
-            preprocess_result = preprocess_data(data)
-            if preprocess_result is None or len(preprocess_result) < 2:
-                self.logger.error("数据预处理失败")
-                return False
+            # 4. 追加有限轮数的树
+            n_rounds = model.get_booster().num_boosted_rounds()
+            if n_rounds + self.max_extra_rounds > self.max_total_rounds:
+                self.logger.info(f"模型已有 {n_rounds} 棵树，超过上限 {self.max_total_rounds}，回退全量训练")
+                return None
+            
+            start_time = time.time()
+            updated = type(model)(**model.get_params())
+            updated.set_params(n_estimators=self.max_extra_rounds, early_stopping_rounds=None)
+            updated.fit(X_frame, y_new, xgb_model=model.get_booster())
+            
+            y_pred = updated.predict(X_frame)
+            y_pred_proba = updated.predict_proba(X_frame)
+            evaluation_result = evaluate_model(y_new, y_pred, y_pred_proba)
+            metrics = evaluation_result[0] if evaluation_result and evaluation_result[0] else {}
             
-            # 提取预处理结果（preprocess_data返回(X, y, None)）
-            X_processed, y_processed = preprocess_result[0], preprocess_result[1]
-            if X_processed is None or y_processed is None:
-                self.logger.error("数据预处理失败")
+            self._report_progress('save', 90)
+            if self._write_model_file(updated, user_id, feature_cols, feature_info.get('clip_bounds')) is None:
+                self.logger.error("模型保存失败")
                 return False
             
-            # 训练模型
-            model = train_model(X_processed, y_processed)
+            feature_info.update({
+                'watermark': watermark,
+                'training_samples': int(feature_info.get('training_samples', 0)) + len(X_new),
+                'n_rounds': updated.get_booster().num_boosted_rounds(),
+                'accuracy': metrics.get('accuracy', feature_info.get('accuracy')),
+                'metrics': metrics or feature_info.get('metrics'),
+                'trained_at': datetime.now().isoformat(),
+                'update_type': 'incremental'
+            })
+            with open(self.output_path / f"user_{user_id}_features.json", 'w') as f:
+                json.dump(feature_info, f, indent=2)
+            
+            self.logger.info(
+                f"用户 {user_id} 增量训练完成: 新增 {len(X_pos)} 个窗口, 追加 {self.max_extra_rounds} 轮, "
+                f"共 {feature_info['n_rounds']} 棵树, 耗时 {time.time() - start_time:.2f}s"
+            )
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"用户 {user_id} 增量训练失败，回退全量训练: {str(e)}")
+            return None
+
+    def _train_with_classification_module(self, X, y, user_id, feature_cols, watermark=None, sample_weight=None):
+        """使用classification模块训练模型"""
+        try:
+            self.logger.info("使用classification模块训练模型")
+            
+            # 直接在内存中训练：一次转换为NumPy数组并清洗，避免CSV序列化往返
+            X_array = X.to_numpy() if hasattr(X, 'to_numpy') else np.asarray(X)
+            used_feature_cols = list(X.columns) if hasattr(X, 'columns') else list(feature_cols)
+            # 逐列裁剪边界读自随特征写入维护的分位数草图（不对训练矩阵排序），草图不全时按训练数据计算；
+            # 矩阵只在 train_model_arrays 中按该边界清洗一次
+            clip_bounds = self.feature_sketches.clip_bounds(used_feature_cols, self.clip_quantile) \
+                or compute_clip_bounds(X_array, self.clip_quantile)
+            # 负样本池分箱参考可用时复用其分位点切分（按同一边界清洗），不再对负样本重复做分位数草图
+            train_kwargs = {}
+            ref = self.negative_cache.get_reference(used_feature_cols, clip_bounds) if CLASSIFICATION_AVAILABLE else None
+            if ref is not None:
+                train_kwargs = {'ref': ref, 'max_bin': self.negative_cache.max_bin}
+            if sample_weight is not None:
+                train_kwargs['sample_weight'] = sample_weight
+            hyperparameters = self._resolve_hyperparameters(user_id, X_array, y, sample_weight, used_feature_cols)
+            train_kwargs.update(hyperparameters['params'])
+            train_kwargs['clip_bounds'] = clip_bounds
+            train_kwargs['n_jobs'] = self.training_threads
+            model, X_processed, y_processed, weight_processed = train_model_arrays(
+                X_array, y, used_feature_cols, return_weights=True, **train_kwargs
+            )
             if model is None:
                 self.logger.error("模型训练失败")
                 return False
             
-            # 评估模型
-            y_pred = model.predict(X_processed)
-            y_pred_proba = model.predict_proba(X_processed)
-            evaluation_result = evaluate_model(y_processed, y_pred, y_pred_proba)
+            # 评估模型：优先使用交叉验证的折外预测，失败时回退到训练集评估（结果偏乐观）
+            self._report_progress('evaluate', 80)
+            cv_summary = None
+            if self.cv_enabled:
+                # 权重已随去重与训练数据对齐，交叉验证使用与训练相同的样本权重
+                y_eval, oof_proba, cv_summary = self._cross_validate(
+                    X_processed, y_processed, weight_processed, hyperparameters['params']
+                )
+            if cv_summary is not None:
+                evaluation_result = evaluate_model(
+                    y_eval, (oof_proba >= 0.5).astype(int), np.column_stack([1 - oof_proba, oof_proba])
+                )
+            else:
+                self.logger.warning("未进行交叉验证，以下指标基于训练集")
+                y_pred = model.predict(X_processed)
+                y_pred_proba = model.predict_proba(X_processed)
+                evaluation_result = evaluate_model(y_processed, y_pred, y_pred_proba)
             
             if evaluation_result is None or evaluation_result[0] is None:
                 self.logger.error("模型评估失败")
@@ -354,39 +592,22 @@ class SimpleModelTrainer:
             
             # 提取准确率
             metrics, cm = evaluation_result
+            if cv_summary is not None:
+                metrics['cross_validation'] = cv_summary
             accuracy = metrics.get('accuracy', 0.0)
             self.logger.info(f"模型准确率: {accuracy:.4f}")
             
-            # 保存模型
-            model_path = self.models_path / f"user_{user_id}_model.pkl"
-            save_success = save_model(model, str(model_path))
-            if not save_success:
-                self.logger.error("模型保存失败")
-                return False
-            else:
-                self.logger.info(f"模型已保存: {model_path.resolve()}")
-            
-            # 保存特征列信息（以实际用于训练的数据列为准，避免后续预测特征名不一致）
-            feature_info_path = self.models_path / f"user_{user_id}_features.json"
-            
-            with open(feature_info_path, 'w') as f:
-                used_feature_cols = list(X_processed.columns) if hasattr(X_processed, 'columns') else list(feature_cols)
-                json.dump({
-                    'feature_cols': used_feature_cols,
-                    'n_features': len(used_feature_cols),
-                    'training_samples': int(len(X_processed) if hasattr(X_processed, '__len__') else len(X)),
-                    'accuracy': accuracy,
-                    'metrics': metrics,
-                    'trained_at': datetime.now().isoformat(),
-                    'model_type': 'simple_classification'
-                }, f, indent=2)
-            self.logger.info(f"特征信息已保存: {feature_info_path.resolve()}")
-            
-            # 清理临时文件
-            temp_data_path.unlink(missing_ok=True)
-            
-            self.logger.info(f"用户 {user_id} 模型训练完成，保存到 {model_path}")
-            return True
+            # 正样本特征分布作为后续增量训练的漂移基准
+            X_positive = np.asarray(X_processed)[np.asarray(y_processed) == 1]
+            return self._save_model_artifacts(
+                model, user_id, used_feature_cols, metrics,
+                training_samples=len(X_processed),
+                feature_means=X_positive.mean(axis=0) if len(X_positive) else None,
+                feature_stds=X_positive.std(axis=0) if len(X_positive) else None,
+                watermark=watermark,
+                hyperparameters=hyperparameters,
+                clip_bounds=clip_bounds
+            )
             
         except Exception as e:
             self.logger.error(f"使用classification模块训练失败: {str(e)}")
@@ -398,22 +619,174 @@ class SimpleModelTrainer:
             self.logger.debug(f"异常详情: {traceback.format_exc()}")
             return False
 
+    def _cross_validate(self, X, y, sample_weight, params):
+        """分层K折交叉验证（多进程并行，受训练线程/内存预算约束），返回 (标签, 折外概率, 摘要)，失败时摘要为None"""
+        try:
+            y_eval, oof_proba, summary = cross_validate_arrays(
+                X, y, n_splits=self.cv_splits, sample_weight=sample_weight,
+                max_rows=self.cv_max_rows, n_workers=self.cv_workers,
+                memory_limit=self.config.get_memory_limit_bytes(), **params
+            )
+            if summary is None:
+                return None, None, None
+            self.logger.info(
+                f"交叉验证完成: {summary['n_splits']} 折AUC {summary['fold_auc']}, "
+                f"均值 {summary['auc_mean']:.4f} ± {summary['auc_std']:.4f}, "
+                f"{summary['n_workers']} 个进程, 耗时 {summary['wall_time']:.2f}s"
+            )
+            return y_eval, oof_proba, summary
+        except Exception as e:
+            self.logger.error(f"交叉验证失败: {str(e)}")
+            return None, None, None
+
+    def _resolve_hyperparameters(self, user_id, X, y, sample_weight, feature_cols):
+        """确定本次全量训练的模型参数：基础参数取 model.params；启用搜索时优先复用
+        未过期的该用户搜索结果，否则执行逐次减半搜索（X 为None时不搜索）。返回 {'params': ..., ...搜索记录}
+        """
+        base_params = dict(self.config.get_model_config().get('params', {}) or {})
+        if not self.hyperparameter_search.enabled or not CLASSIFICATION_AVAILABLE:
+            return {'params': base_params}
+        
+        stored = (self._load_feature_info(user_id) or {}).get('hyperparameters') or {}
+        searched_at = stored.get('searched_at')
+        if stored.get('params') and searched_at:
+            age_days = (datetime.now() - datetime.fromisoformat(searched_at)).total_seconds() / 86400
+            if age_days < self.hyperparameter_search.max_age_days:
+                self.logger.info(f"复用用户 {user_id} 的超参数搜索结果（{age_days:.1f} 天前）")
+                return stored
+        if X is None:
+            # 外存训练没有内存中的训练矩阵，使用基础参数
+            return {'params': base_params}
+        
+        self._report_progress('search', 30)
+        params, summary = self.hyperparameter_search.search(
+            X, y, sample_weight=sample_weight, base_params=base_params, feature_names=list(feature_cols)
+        )
+        self._report_progress('train', 60)
+        if params is None:
+            return {'params': base_params}
+        return {'params': params, 'searched_at': datetime.now().isoformat(), **summary}
+
+    def _train_with_external_memory(self, user_id, watermark=None):
+        """外存模式训练：正样本与其他全部用户的特征窗口按批从SQLite流入XGBoost"""
+        try:
+            trainer = ExternalMemoryTrainer(self.db_path, self.models_path / 'cache')
+            feature_cols = trainer.resolve_feature_cols()
+            if not feature_cols:
+                self.logger.error("特征表为空，无法进行外存训练")
+                return False
+            feature_cols = self.feature_selector.select(feature_cols)
+            hyperparameters = self._resolve_hyperparameters(user_id, None, None, None, feature_cols)
+            clip_bounds = self.feature_sketches.clip_bounds(feature_cols, self.clip_quantile)
+            
+            self._report_progress('train', 30)
+            model, evaluation, stats = trainer.train(
+                user_id, feature_cols, params=hyperparameters['params'], n_jobs=self.training_threads,
+                clip_bounds=clip_bounds
+            )
+            if model is None:
+                return False
+            self._report_progress('evaluate', 80)
+            
+            evaluation_result = evaluate_model(*evaluation)
+            if evaluation_result is None or evaluation_result[0] is None:
+                self.logger.error("模型评估失败")
+                return False
+            metrics, cm = evaluation_result
+            metrics['evaluation_samples'] = stats['evaluation_samples']
+            self.logger.info(f"模型准确率: {metrics.get('accuracy', 0.0):.4f}")
+            
+            return self._save_model_artifacts(
+                model, user_id, feature_cols, metrics,
+                training_samples=stats['training_samples'],
+                feature_means=stats['feature_means'],
+                feature_stds=stats['feature_stds'],
+                watermark=watermark,
+                hyperparameters=hyperparameters,
+                clip_bounds=clip_bounds
+            )
+            
+        except Exception as e:
+            self.logger.error(f"用户 {user_id} 外存训练失败: {str(e)}")
+            return False
+
+    def _save_model_artifacts(self, model, user_id, feature_cols, metrics, training_samples,
+                              feature_means=None, feature_stds=None, watermark=None, hyperparameters=None,
+                              clip_bounds=None):
+        """保存模型与特征信息（特征列以实际用于训练的数据列为准，避免后续预测特征名不一致）"""
+        accuracy = metrics.get('accuracy', 0.0)
+        self._report_progress('save', 90)
+        model_path = self._write_model_file(model, user_id, feature_cols, clip_bounds)
+        if model_path is None:
+            self.logger.error("模型保存失败")
+            return False
+        self.logger.info(f"模型已保存: {model_path.resolve()}")
+        
+        feature_info_path = self.output_path / f"user_{user_id}_features.json"
+        n_rounds = model.get_booster().num_boosted_rounds() if hasattr(model, 'get_booster') else None
+        
+        with open(feature_info_path, 'w') as f:
+            json.dump({
+                'feature_cols': list(feature_cols),
+                'n_features': len(feature_cols),
+                'training_samples': int(training_samples),
+                'accuracy': accuracy,
+                'metrics': metrics,
+                'trained_at': datetime.now().isoformat(),
+                'model_type': 'simple_classification',
+                'watermark': watermark,
+                'n_rounds': n_rounds,
+                'feature_means': np.asarray(feature_means).tolist() if feature_means is not None else None,
+                'feature_stds': np.asarray(feature_stds).tolist() if feature_stds is not None else None,
+                'hyperparameters': hyperparameters if hyperparameters and 'searched_at' in hyperparameters else None,
+                'clip_bounds': clip_bounds,
+                'update_type': 'full'
+            }, f, indent=2)
+        self.logger.info(f"特征信息已保存: {feature_info_path.resolve()}")
+        
+        self.logger.info(f"用户 {user_id} 模型训练完成，保存到 {model_path}")
+        return True
+
+    def _write_model_file(self, model, user_id, feature_cols, clip_bounds=None):
+        """保存模型文件，返回路径（失败返回None）
+
+        XGBoost模型写为单文件制品（原生UBJSON + 头部，含逐列裁剪边界），并移除旧版pickle；
+        其他模型（如模拟模块的随机森林）仍使用pickle。
+        """
+        if hasattr(model, 'get_booster'):
+            model_path = artifact_path(self.output_path, user_id)
+            ModelArtifact.write(model_path, model, feature_cols, threshold=self.anomaly_threshold,
+                                metadata={'user_id': str(user_id)}, clip_bounds=clip_bounds)
+            (self.output_path / f"user_{user_id}_model.pkl").unlink(missing_ok=True)
+            return model_path
+        
+        model_path = self.output_path / f"user_{user_id}_model.pkl"
+        return model_path if save_model(model, str(model_path)) else None
+
+    def _load_model_file(self, user_id):
+        """只加载模型对象（优先单文件制品，兼容旧版pickle），不存在时返回None"""
+        model_path = artifact_path(self.models_path, user_id)
+        if model_path.exists():
+            return ModelArtifact.open(model_path).model
+        legacy_path = self.models_path / f"user_{user_id}_model.pkl"
+        if legacy_path.exists():
+            with open(legacy_path, 'rb') as f:
+                return pickle.load(f)
+        return None
+
     def load_user_model(self, user_id):
-        """加载用户模型"""
+        """加载用户模型（优先单文件制品，兼容旧版pickle + 特征JSON）"""
         try:
             # 尝试不同的文件名格式
-            possible_model_paths = [
-                self.models_path / f"user_{user_id}_model.pkl",
-                self.models_path / f"user_{user_id}_model.pkl"
-            ]
-            
+            candidate_ids = [user_id]
             # 如果user_id不包含"user"后缀，也尝试添加
             if not user_id.endswith('_user'):
-                possible_model_paths.append(self.models_path / f"user_{user_id}_user_model.pkl")
+                candidate_ids.append(f"{user_id}_user")
             
-            self.logger.info("模型加载路径候选:")
-            for p in possible_model_paths:
-                self.logger.info(f"  - {p.resolve()}")
+            possible_model_paths = []
+            for candidate in candidate_ids:
+                possible_model_paths.append(artifact_path(self.models_path, candidate))
+                possible_model_paths.append(self.models_path / f"user_{candidate}_model.pkl")
             
             model_path = None
             for path in possible_model_paths:
@@ -427,12 +800,20 @@ class SimpleModelTrainer:
                 for p in possible_model_paths:
                     self.logger.info(f"  - {p.resolve()}")
                 # 列出所有可用的模型文件以便调试
-                available_models = list(self.models_path.glob("user_*_model.pkl"))
+                available_models = list(self.models_path.glob("user_*_model.*"))
                 if available_models:
                     self.logger.debug(f"可用的模型文件: {[m.name for m in available_models]}")
                 return None, None, None
             
             self.logger.info(f"选定模型路径: {model_path.resolve()}")
+            
+            if model_path.suffix != '.pkl':
+                # 单文件制品：头部含特征列与标准化参数，模型二进制校验后解码
+                artifact = ModelArtifact.open(model_path)
+                model = artifact.model
+                self.logger.info(f"成功加载用户 {user_id} 的模型: {model_path.name}")
+                return model, artifact.scaler, artifact.feature_cols
+            
             # 对应的特征信息文件（修正文件名与后缀构造）
             feature_info_name = model_path.stem.replace('_model', '_features') + '.json'
             feature_info_path = model_path.with_name(feature_info_name)
@@ -457,6 +838,17 @@ class SimpleModelTrainer:
             self.logger.error(f"加载用户 {user_id} 模型失败: {str(e)}")
             return None, None, None
 
+    def get_clip_bounds(self, user_id):
+        """训练时保存的逐列裁剪边界（优先读取制品头部，其次特征信息），没有时返回None"""
+        try:
+            model_path = artifact_path(self.models_path, user_id)
+            if model_path.exists():
+                return ModelArtifact.open(model_path).clip_bounds
+            return (self._load_feature_info(user_id) or {}).get('clip_bounds')
+        except Exception as e:
+            self.logger.warning(f"读取用户 {user_id} 裁剪边界失败: {str(e)}")
+            return None
+
     def predict_user_behavior(self, user_id, features):
         """预测用户行为"""
         try:
@@ -477,8 +869,12 @@ class SimpleModelTrainer:
                 numeric_cols = features.select_dtypes(include=[np.number]).columns
                 X = features[numeric_cols].fillna(0)
             
-            # 预测：传numpy避免xgboost特征名校验
-            X_np = X.values
+            # 与训练及 SimplePredictor 一致：按训练时保存的逐列边界裁剪；传numpy避免xgboost特征名校验
+            bounds = self.get_clip_bounds(user_id) or {}
+            lower, upper = bounds.get('lower'), bounds.get('upper')
+            if lower is None or len(lower) != X.shape[1]:
+                lower = upper = None
+            X_np = sanitize_array(X.to_numpy(dtype=np.float64, na_value=np.nan), lower=lower, upper=upper)
             predictions = model.predict(X_np)
             probabilities = model.predict_proba(X_np)
             
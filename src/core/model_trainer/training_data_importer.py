@@ -14,12 +14,25 @@ sys.path.insert(0, str(project_root))
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.negative_sample_pool import NegativeSamplePool
+from src.core.model_trainer.feature_sketch import FeatureSketchStore
+from src.core.database.schema_migrations import prefix_bounds, suspend_indexes, restore_indexes, normalize_user_id
+
+
+def _to_native(value):
+    """json.dumps 的 default：对象列中的 numpy 标量转为 Python 原生类型（与 Series.to_dict 一致）"""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化的特征值类型: {type(value).__name__}")
+
 
 class TrainingDataImporter:
     def __init__(self):
         self.logger = Logger()
         self.config = ConfigLoader()
         self.db_path = Path(self.config.get_paths()['data']) / 'mouse_data.db'
+        self.negative_pool = NegativeSamplePool(self.db_path)
+        self.feature_sketches = FeatureSketchStore(self.db_path)
         
         self.logger.info("训练数据导入器初始化完成")
 
@@ -50,32 +63,17 @@ class TrainingDataImporter:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # 确保features表存在
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS features (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    session_id TEXT NOT NULL,
-                    timestamp REAL NOT NULL,
-                    feature_vector TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 创建索引
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_user_session ON features(user_id, session_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_features_timestamp ON features(timestamp)')
-            
             # 导入数据
             imported_count = 0
             current_time = time.time()
+            pool_rows = []
             
             for idx, row in df.iterrows():
                 try:
                     # 生成用户ID和会话ID
                     original_user = row.get('user', 'unknown')
                     session_id = str(row.get('session', f'session_{idx}'))
-                    user_id = f"{user_id_prefix}_{original_user}"
+                    user_id = normalize_user_id(f"{user_id_prefix}_{original_user}")
                     
                     # 准备特征向量（排除session和user列）
                     feature_data = row.drop(['session', 'user']).to_dict()
@@ -94,11 +92,15 @@ class TrainingDataImporter:
                         current_time + idx,  # 使用递增时间戳
                         feature_vector
                     ))
+                    pool_rows.append((cursor.lastrowid, user_id, feature_vector))
                     
                     imported_count += 1
                     
-                    # 每1000条记录提交一次
+                    # 每1000条记录提交一次（负样本池与草图按批更新，避免逐行读写）
                     if imported_count % 1000 == 0:
+                        self.negative_pool.add_samples(pool_rows, conn=conn)
+                        self.feature_sketches.add_samples(pool_rows, conn=conn)
+                        pool_rows = []
                         conn.commit()
                         self.logger.info(f"已导入 {imported_count} 条记录")
                 
@@ -107,6 +109,8 @@ class TrainingDataImporter:
                     continue
             
             # 最终提交
+            self.negative_pool.add_samples(pool_rows, conn=conn)
+            self.feature_sketches.add_samples(pool_rows, conn=conn)
             conn.commit()
             conn.close()
             
@@ -117,6 +121,122 @@ class TrainingDataImporter:
             self.logger.error(f"导入训练数据失败: {str(e)}")
             return False
 
+    def _chunk_rows(self, chunk, labels, user_id_prefix, current_time):
+        """按逐行导入的规则生成一块数据的用户ID、会话ID、时间戳与特征向量JSON列表
+
+        与 import_training_data_to_db 的逐行结果一致：iterrows 按整表公共类型取行（如整数列在含浮点列的表中变为浮点，
+        用户ID与会话ID同样取自这些值），缺省会话ID与时间戳使用行索引标签，缺失值经 json.dumps 写为 NaN。
+        整块一次取出值矩阵，每行只做一次 json.dumps，不再构造逐行 Series。
+        """
+        columns = list(chunk.columns)
+        user_pos = columns.index('user') if 'user' in columns else None
+        session_pos = columns.index('session') if 'session' in columns else None
+        feature_pos = [i for i, col in enumerate(columns) if col not in ('session', 'user')]
+        feature_keys = [columns[i] for i in feature_pos]
+
+        user_ids, session_ids, timestamps, feature_vectors = [], [], [], []
+        for label, row in zip(labels, chunk.to_numpy().tolist()):
+            original_user = row[user_pos] if user_pos is not None else 'unknown'
+            user_ids.append(normalize_user_id(f"{user_id_prefix}_{original_user}"))
+            session_ids.append(str(row[session_pos]) if session_pos is not None else f'session_{label}')
+            timestamps.append(current_time + label)
+            feature_vectors.append(json.dumps(dict(zip(feature_keys, [row[i] for i in feature_pos])),
+                                              default=_to_native))
+        return user_ids, session_ids, timestamps, feature_vectors
+
+    def bulk_import_training_data_to_db(self, pickle_path, user_id_prefix="training_user",
+                                        chunk_size=50000):
+        """批量导入训练数据：整块序列化 + executemany单事务写入，导入完成后再建索引
+
+        写入内容与 import_training_data_to_db 逐行导入完全一致（时间戳为导入开始时间加行索引标签）。
+        """
+        try:
+            df = self.load_training_data(pickle_path)
+            if df is None:
+                return False
+            if df.empty:
+                self.logger.warning(f"训练数据为空: {pickle_path}")
+                return True
+
+            start_time = time.time()
+            current_time = start_time
+            total_rows = len(df)
+
+            # 与逐行导入一致，递增时间戳取自行索引标签；非数值索引无法相加，退回行位置
+            if pd.api.types.is_numeric_dtype(df.index):
+                labels = df.index.tolist()
+            else:
+                self.logger.warning("训练数据的行索引不是数值，时间戳与缺省会话ID改用行位置")
+                labels = list(range(total_rows))
+
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            # 导入期间放宽同步策略，结束后恢复
+            old_synchronous = cursor.execute('PRAGMA synchronous').fetchone()[0]
+            old_journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+            cursor.execute('PRAGMA synchronous = OFF')
+            cursor.execute('PRAGMA journal_mode = MEMORY')
+
+            saved_indexes = []
+            try:
+                # 先删除索引，数据写入后统一重建，避免逐行维护B树
+                saved_indexes = suspend_indexes(cursor, 'features')
+                cursor.execute('BEGIN')
+                # AUTOINCREMENT的下一个id取决于sqlite_sequence（删除过的行也会计入）
+                seq_row = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'features'").fetchone()
+                max_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM features').fetchone()[0]
+                first_id = max(seq_row[0] if seq_row else 0, max_id) + 1
+                imported_count = 0
+                for start in range(0, total_rows, chunk_size):
+                    end = min(start + chunk_size, total_rows)
+                    chunk = df.iloc[start:end]
+                    user_ids, session_ids, timestamps, feature_vectors = self._chunk_rows(
+                        chunk, labels[start:end], user_id_prefix, current_time
+                    )
+                    cursor.executemany('''
+                        INSERT INTO features
+                        (user_id, session_id, timestamp, feature_vector)
+                        VALUES (?, ?, ?, ?)
+                    ''', zip(user_ids, session_ids, timestamps, feature_vectors))
+                    # 同一事务内增量更新负样本池（单事务插入的id连续）
+                    self.negative_pool.add_samples(
+                        zip(range(first_id + start, first_id + end), user_ids, feature_vectors),
+                        conn=conn
+                    )
+                    # 草图直接由数值块更新，无需再解析JSON
+                    self.feature_sketches.add_frame(
+                        user_ids, chunk.drop(columns=['session', 'user'], errors='ignore'), conn=conn
+                    )
+                    imported_count += end - start
+                    self.logger.info(f"已导入 {imported_count}/{total_rows} 条记录")
+                conn.commit()
+
+                load_time = time.time() - start_time
+                self.logger.info("数据写入完成，开始重建索引...")
+                restore_indexes(cursor, saved_indexes)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                restore_indexes(cursor, saved_indexes)
+                raise
+            finally:
+                cursor.execute(f'PRAGMA journal_mode = {old_journal_mode}')
+                cursor.execute(f'PRAGMA synchronous = {int(old_synchronous)}')
+                conn.close()
+
+            elapsed = time.time() - start_time
+            rows_per_sec = imported_count / elapsed if elapsed > 0 else float('inf')
+            self.logger.info(
+                f"训练数据批量导入完成: 共导入 {imported_count} 条记录, "
+                f"写入 {load_time:.2f}s, 总耗时 {elapsed:.2f}s, {rows_per_sec:.0f} 行/秒"
+            )
+            return True
+
+        except Exception as e:
+            self.logger.error(f"批量导入训练数据失败: {str(e)}")
+            return False
+
     def import_all_training_data(self):
         """导入所有训练数据"""
         try:
@@ -126,7 +246,7 @@ class TrainingDataImporter:
             # 导入训练数据
             training_file = data_path / 'processed' / 'all_training_aggregation.pickle'
             if training_file.exists():
-                success = self.import_training_data_to_db(training_file, "training_user")
+                success = self.bulk_import_training_data_to_db(training_file, "training_user")
                 if success:
                     self.logger.info("训练数据导入成功")
                 else:
@@ -138,7 +258,7 @@ class TrainingDataImporter:
             if debug_mode:
                 test_file = data_path / 'processed' / 'all_test_aggregation.pickle'
                 if test_file.exists():
-                    success = self.import_training_data_to_db(test_file, "test_user")
+                    success = self.bulk_import_training_data_to_db(test_file, "test_user")
                     if success:
                         self.logger.info("测试数据导入成功 (调试模式)")
                     else:
@@ -188,22 +308,36 @@ class TrainingDataImporter:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            # 前缀区间条件可走 user_id 索引，避免 LIKE 全表扫描
+            delete_query = 'DELETE FROM features WHERE user_id >= ? AND user_id < ?'
             if data_type == "training":
                 # 清理训练数据
-                cursor.execute('DELETE FROM features WHERE user_id LIKE "training_user%"')
+                cursor.execute(delete_query, prefix_bounds('training_user'))
                 deleted_count = cursor.rowcount
                 self.logger.info(f"清理了 {deleted_count} 条训练数据")
             elif data_type == "test":
                 # 清理测试数据
-                cursor.execute('DELETE FROM features WHERE user_id LIKE "test_user%"')
+                cursor.execute(delete_query, prefix_bounds('test_user'))
                 deleted_count = cursor.rowcount
                 self.logger.info(f"清理了 {deleted_count} 条测试数据")
             else:
                 # 清理所有导入的数据
-                cursor.execute('DELETE FROM features WHERE user_id LIKE "training_user%" OR user_id LIKE "test_user%"')
+                cursor.execute(delete_query, prefix_bounds('training_user'))
                 deleted_count = cursor.rowcount
+                cursor.execute(delete_query, prefix_bounds('test_user'))
+                deleted_count += cursor.rowcount
                 self.logger.info(f"清理了 {deleted_count} 条导入数据")
             
+            # 同步清理负样本池中对应来源用户
+            if data_type == "training":
+                patterns = ['training_user%']
+            elif data_type == "test":
+                patterns = ['test_user%']
+            else:
+                patterns = ['training_user%', 'test_user%']
+            self.negative_pool.remove_sources(patterns, conn=conn)
+            self.feature_sketches.remove_sources(patterns, conn=conn)
+            
             conn.commit()
             conn.close()
             
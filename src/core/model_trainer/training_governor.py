@@ -0,0 +1,228 @@
+import multiprocessing as mp
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+
+import psutil
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+
+# 数值库（OpenMP/BLAS）线程数环境变量，只在库首次导入时读取
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+
+def training_thread_limit(config=None):
+    """训练可用线程数：不超过 system.max_workers，并为采集/预测线程保留一个核心"""
+    config = config or ConfigLoader()
+    max_workers = int(config.get_system_config().get('max_workers', 4) or 1)
+    return max(1, min(max_workers, (os.cpu_count() or 2) - 1))
+
+
+def _apply_child_limits(limits):
+    """在训练子进程内降低调度优先级；线程数环境变量已由父进程在启动前设置，这里再写一次供子进程后续创建的进程继承"""
+    threads = str(limits['threads'])
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = threads
+    try:
+        if sys.platform.startswith('win'):
+            psutil.Process().nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            os.nice(limits['nice'])
+    except Exception:
+        pass
+
+
+def _train_user_in_child(user_id, limits, result_queue):
+    """子进程入口：应用资源限制后训练单个用户模型，结果写入队列"""
+    _apply_child_limits(limits)
+    try:
+        from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
+        result_queue.put(bool(SimpleModelTrainer().train_user_model(user_id)))
+    except Exception as e:
+        Logger().error(f"训练子进程异常: {str(e)}")
+        result_queue.put(False)
+
+
+class TrainingGovernor:
+    """训练资源调度：在低优先级子进程中训练，限制线程数与内存，
+    采集速率缺口或预测延迟超过阈值时暂停子进程，保证实时检测不被训练拖慢
+    """
+
+    def __init__(self):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        governor_config = self.config.get_system_config().get('training_governor', {}) or {}
+        self.enabled = bool(governor_config.get('enabled', True))
+        self.nice = int(governor_config.get('nice', 10))
+        self.check_interval = float(governor_config.get('check_interval', 1.0))
+        self.max_collector_deficit = float(governor_config.get('max_collector_deficit', 0.3))
+        self.max_prediction_latency = float(governor_config.get('max_prediction_latency', 2.0))
+        self.max_pause = float(governor_config.get('max_pause', 30))
+        self.min_run = float(governor_config.get('min_run', 5))
+        self.threads = training_thread_limit(self.config)
+        self.memory_limit = self.config.get_memory_limit_bytes()
+
+        self._probes = {}
+        self._process = None
+
+    def add_probe(self, name, func, threshold):
+        """注册压力探针：func() 返回当前值，超过 threshold 时暂停训练（同名探针会被替换）"""
+        self._probes[name] = (func, threshold)
+
+    def watch_collector(self, collector):
+        if collector is not None and hasattr(collector, 'get_sample_rate_deficit'):
+            self.add_probe('采集速率缺口', collector.get_sample_rate_deficit, self.max_collector_deficit)
+
+    def watch_predictor(self, predictor):
+        if predictor is not None and hasattr(predictor, 'get_prediction_latency'):
+            self.add_probe('预测延迟', predictor.get_prediction_latency, self.max_prediction_latency)
+
+    def _check_pressure(self):
+        """返回超过阈值的探针描述列表"""
+        exceeded = []
+        for name, (func, threshold) in list(self._probes.items()):
+            try:
+                value = func()
+            except Exception:
+                continue
+            if value is not None and value > threshold:
+                exceeded.append(f"{name} {value:.2f} > {threshold}")
+        return exceeded
+
+    def _limits(self):
+        return {'threads': self.threads, 'nice': self.nice, 'memory_limit': self.memory_limit}
+
+    def run(self, target, args=(), on_progress=None, cancel_event=None):
+        """在受控子进程中执行 target(*args, limits, result_queue)，返回其写入队列的结果
+
+        子进程写入的 ('progress', stage, percent) 消息转交 on_progress，其余消息视为结果。
+        子进程超出内存上限或 cancel_event 被置位时终止子进程并返回None。
+        """
+        ctx = mp.get_context('spawn')
+        result_queue = ctx.Queue()
+        process = ctx.Process(target=target, args=(*args, self._limits(), result_queue), daemon=True)
+        # spawn子进程启动时先重新导入主模块（入口脚本可能已导入numpy/xgboost），之后才执行target，
+        # 在target中设置线程数为时已晚：在父进程中设置环境变量后启动，子进程继承启动时的环境
+        saved_env = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+        os.environ.update({var: str(self.threads) for var in THREAD_ENV_VARS})
+        try:
+            process.start()
+        finally:
+            for var, value in saved_env.items():
+                if value is None:
+                    os.environ.pop(var, None)
+                else:
+                    os.environ[var] = value
+        self._process = process
+        self.logger.info(
+            f"训练子进程已启动: pid={process.pid}, 线程数={self.threads}, "
+            f"内存上限={self.memory_limit / 1024 / 1024:.0f}MB"
+        )
+
+        child = psutil.Process(process.pid)
+        paused_since = None
+        no_pause_until = 0.0
+        total_paused = 0.0
+        result = None
+
+        def drain():
+            nonlocal result
+            while True:
+                try:
+                    message = result_queue.get_nowait()
+                except queue.Empty:
+                    return
+                if isinstance(message, tuple) and len(message) == 3 and message[0] == 'progress':
+                    if on_progress is not None:
+                        on_progress(message[1], message[2])
+                else:
+                    result = message
+
+        try:
+            while process.is_alive():
+                now = time.time()
+                drain()
+                if cancel_event is not None and cancel_event.is_set():
+                    self.logger.info("训练已取消，终止子进程")
+                    if paused_since is not None:
+                        child.resume()
+                    process.terminate()
+                    result = None
+                    break
+                try:
+                    rss = child.memory_info().rss
+                except psutil.Error:
+                    rss = 0
+                if rss > self.memory_limit:
+                    self.logger.error(
+                        f"训练子进程内存 {rss / 1024 / 1024:.0f}MB 超过上限 "
+                        f"{self.memory_limit / 1024 / 1024:.0f}MB，已终止"
+                    )
+                    if paused_since is not None:
+                        child.resume()
+                    process.terminate()
+                    break
+
+                pressure = self._check_pressure() if self._probes else []
+                try:
+                    if pressure and paused_since is None and now >= no_pause_until:
+                        child.suspend()
+                        paused_since = now
+                        self.logger.info(f"实时任务压力过高，暂停训练: {', '.join(pressure)}")
+                    elif paused_since is not None and (not pressure or now - paused_since >= self.max_pause):
+                        child.resume()
+                        total_paused += now - paused_since
+                        if pressure:
+                            # 长时间暂停后强制运行一段时间，保证训练最终能完成
+                            no_pause_until = now + self.min_run
+                        self.logger.info(f"恢复训练（已暂停 {now - paused_since:.1f}s）")
+                        paused_since = None
+                except psutil.Error:
+                    pass
+
+                process.join(self.check_interval)
+
+            if process.exitcode == 0:
+                # 子进程正常退出时队列数据已全部写出
+                deadline = time.time() + 1
+                while result is None and time.time() < deadline:
+                    drain()
+                    if result is None:
+                        time.sleep(0.05)
+            else:
+                result = None
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join(5)
+            self._process = None
+
+        if total_paused:
+            self.logger.info(f"训练期间累计暂停 {total_paused:.1f}s")
+        return result
+
+    def train_user_model(self, user_id):
+        """在受控子进程中训练用户模型；未启用时在当前进程中训练"""
+        if not self.enabled:
+            from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
+            return SimpleModelTrainer().train_user_model(user_id)
+        return bool(self.run(_train_user_in_child, (user_id,)))
+
+    def cancel(self):
+        """终止正在运行的训练子进程"""
+        process = self._process
+        if process is not None and process.is_alive():
+            try:
+                psutil.Process(process.pid).resume()
+            except psutil.Error:
+                pass
+            process.terminate()
+            self.logger.info("训练子进程已终止")
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+from src.core.model_trainer.compiled_ensemble import CompiledEnsemble
+
+# 对齐输入时排除的非特征列
+EXCLUDE_COLS = ('id', 'timestamp', 'user_id', 'session_id')
+
+
+class CachedModel:
+    """缓存条目：模型、对齐后的特征列、逐列裁剪边界与阈值，以及用于失效判断的文件状态
+
+    model 可以是 ModelArtifact，首次访问时才解码为 XGBoost 模型；
+    compiled 为纯NumPy的编译树集成（不支持编译或未启用时为None），小批量评分可不加载 xgboost。
+    """
+
+    def __init__(self, path, model, feature_cols, clip_bounds, threshold, mtime_ns, size, checksum, compiled=None):
+        self.path = path
+        self._model = model
+        self.compiled = compiled
+        self.feature_cols = [col for col in (feature_cols or []) if col not in EXCLUDE_COLS]
+        bounds = clip_bounds or {}
+        if len(bounds.get('lower') or []) == len(self.feature_cols) and self.feature_cols:
+            self.clip_lower = np.asarray(bounds['lower'], dtype=np.float32)
+            self.clip_upper = np.asarray(bounds['upper'], dtype=np.float32)
+        else:
+            self.clip_lower = self.clip_upper = None
+        self.threshold = threshold
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checksum = checksum
+        self.loaded_at = time.time()
+
+    @property
+    def model(self):
+        if isinstance(self._model, ModelArtifact):
+            self._model = self._model.model
+        return self._model
+
+
+class ModelCache:
+    """预测端的用户模型缓存：每次取用只做一次 stat，文件未变化时直接返回已加载的模型
+
+    文件的 mtime 或大小变化时先比较校验和（制品头部的模型SHA-256，旧版pickle为文件SHA-256），
+    只有校验和也变化才重新加载；新模型在锁外加载完成后整体替换缓存条目，
+    并发读取方要么拿到旧条目要么拿到新条目，不会看到半更新的状态。
+    """
+
+    def __init__(self, models_path=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        self.models_path = Path(models_path or self.config.get_paths()['models'])
+        compiled_config = self.config.get_prediction_config().get('compiled_inference', {}) or {}
+        self.compiled_enabled = bool(compiled_config.get('enabled', True))
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _resolve_path(self, user_id):
+        """按训练器的命名规则查找模型文件（优先单文件制品，其次旧版pickle）"""
+        candidate_ids = [user_id]
+        if not str(user_id).endswith('_user'):
+            candidate_ids.append(f"{user_id}_user")
+        for candidate in candidate_ids:
+            for path in (artifact_path(self.models_path, candidate),
+                         self.models_path / f"user_{candidate}_model.pkl"):
+                if path.exists():
+                    return path
+        return None
+
+    def get(self, user_id):
+        """返回用户的 CachedModel；模型文件不存在或加载失败时返回None（加载失败时保留旧条目）"""
+        entry = self._entries.get(user_id)
+        path = entry.path if entry is not None and entry.path.exists() else self._resolve_path(user_id)
+        if path is None:
+            if entry is not None:
+                with self._lock:
+                    self._entries.pop(user_id, None)
+            return None
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return entry
+        if entry is not None and entry.path == path and \
+                entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            self.hits += 1
+            return entry
+
+        try:
+            checksum = self._checksum(path)
+            if entry is not None and entry.path == path and entry.checksum == checksum:
+                # 文件被重写但内容未变（如 touch 或重复移交），只更新文件状态
+                self.hits += 1
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                return entry
+
+            start_time = time.time()
+            loaded = self._load(path, stat, checksum)
+            with self._lock:
+                self._entries[user_id] = loaded
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self.logger.info(
+                f"{'加载' if entry is None else '重新加载'}用户 {user_id} 的模型: {path.name}, "
+                f"耗时 {(time.time() - start_time) * 1000:.1f}ms"
+            )
+            return loaded
+        except Exception as e:
+            self.logger.error(f"加载用户 {user_id} 模型失败: {str(e)}")
+            return entry
+
+    def _checksum(self, path):
+        if path.suffix == '.pkl':
+            with open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        return ModelArtifact.open(path).header['booster_sha256']
+
+    def _load(self, path, stat, checksum):
+        if path.suffix != '.pkl':
+            artifact = ModelArtifact.open(path)
+            compiled = artifact.compiled if self.compiled_enabled else None
+            if compiled is None:
+                model = artifact.model
+            else:
+                # 有编译树集成时只校验原生模型，XGBoost 模型留到大批量评分时再解码
+                artifact.read_booster_bytes()
+                model = artifact
+            return CachedModel(path, model, artifact.feature_cols, artifact.clip_bounds,
+                               artifact.threshold, stat.st_mtime_ns, stat.st_size, checksum, compiled=compiled)
+
+        with open(path, 'rb') as f:
+            model = pickle.load(f)
+        compiled = None
+        if self.compiled_enabled:
+            try:
+                compiled = CompiledEnsemble.from_model(model)
+            except ValueError:
+                pass
+        feature_info = {}
+        feature_info_path = path.with_name(path.stem.replace('_model', '_features') + '.json')
+        if feature_info_path.exists():
+            with open(feature_info_path, 'r') as f:
+                feature_info = json.load(f)
+        return CachedModel(path, model, feature_info.get('feature_cols'), feature_info.get('clip_bounds'),
+                           None, stat.st_mtime_ns, stat.st_size, checksum, compiled=compiled)
+
+    def invalidate(self, user_id=None):
+        """丢弃指定用户（或全部）的缓存条目"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+    def get_stats(self):
+        return {
+            'models': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+        }
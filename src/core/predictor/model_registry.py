@@ -0,0 +1,206 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+import sys
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.model_trainer.model_artifact import ModelArtifact, ARTIFACT_SUFFIX
+
+
+class _RegistryEntry:
+    """注册表条目：模型信息及用于失效判断的文件状态，nbytes 为按文件大小估算的内存占用"""
+
+    def __init__(self, path, mtime_ns, size, info, nbytes):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.info = info
+        self.nbytes = nbytes
+
+
+class ModelRegistry(Mapping):
+    """predict 模块的用户模型注册表：按用户按需加载，按数量与内存上限做LRU淘汰
+
+    以 load_models 的文件名前缀为键（如 user_alice），也接受训练器的用户ID（alice）；
+    条目与 load_models 原先返回的字典条目相同（ModelArtifact，或旧版 model/scaler/feature_names 字典）。
+    只有被访问的用户才会加载模型，模型文件变化（mtime 或大小）时重新加载。
+    """
+
+    def __init__(self, models_dir='models', max_models=None, max_memory_bytes=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+        self.models_dir = Path(models_dir)
+
+        registry_config = self.config.get_prediction_config().get('model_registry', {}) or {}
+        self.max_models = int(max_models or registry_config.get('max_models', 64))
+        if max_memory_bytes is None:
+            max_memory_mb = registry_config.get('max_memory_mb', 1024)
+            max_memory_bytes = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        self.max_memory_bytes = max_memory_bytes
+        self.preload_count = int(registry_config.get('preload_recent', 16))
+        self.preload_hours = float(registry_config.get('preload_hours', 24))
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def _resolve(self, user_id):
+        """返回 (键, 模型文件路径)：依次尝试 user_<id>、user_<id>_user 与文件名前缀本身，单文件制品优先"""
+        user_id = str(user_id)
+        stems = [f'user_{user_id}']
+        if not user_id.endswith('_user'):
+            stems.append(f'user_{user_id}_user')
+        stems.append(user_id)
+        for stem in stems:
+            for path in (self.models_dir / f'{stem}_model{ARTIFACT_SUFFIX}', self.models_dir / f'{stem}_model.pkl'):
+                if path.exists():
+                    return stem, path
+        return None
+
+    def _load(self, stem, path):
+        if path.suffix != '.pkl':
+            return ModelArtifact.open(path), path.stat().st_size
+        info = {}
+        nbytes = 0
+        for key, suffix in (('model', 'model'), ('scaler', 'scaler'), ('feature_names', 'features')):
+            part = self.models_dir / f'{stem}_{suffix}.pkl'
+            with open(part, 'rb') as f:
+                info[key] = pickle.load(f)
+            nbytes += part.stat().st_size
+        return info, nbytes
+
+    def __getitem__(self, user_id):
+        info = self.get(user_id)
+        if info is None:
+            raise KeyError(user_id)
+        return info
+
+    def get(self, user_id, default=None):
+        """取用户的模型信息；未加载或文件已变化时从磁盘加载，找不到模型时返回 default"""
+        resolved = self._resolve(user_id)
+        if resolved is None:
+            return default
+        stem, path = resolved
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return default
+
+        with self._lock:
+            entry = self._entries.get(stem)
+            if entry is not None and entry.path == path and \
+                    entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._entries.move_to_end(stem)
+                self.hits += 1
+                return entry.info
+
+        try:
+            start_time = time.time()
+            info, nbytes = self._load(stem, path)
+        except Exception as e:
+            self.logger.error(f"加载用户 {user_id} 的模型失败: {str(e)}")
+            return default if entry is None else entry.info
+
+        with self._lock:
+            self._entries[stem] = _RegistryEntry(path, stat.st_mtime_ns, stat.st_size, info, nbytes)
+            self._entries.move_to_end(stem)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            self._evict()
+        self.logger.debug(f"加载用户 {user_id} 的模型: {path.name}, 耗时 {(time.time() - start_time) * 1000:.1f}ms")
+        return info
+
+    def _evict(self):
+        """淘汰最久未使用的条目，直到满足数量与内存上限（至少保留刚加载的一个）"""
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_models
+            or (self.max_memory_bytes is not None and self.memory_bytes() > self.max_memory_bytes)
+        ):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def __contains__(self, user_id):
+        return self._resolve(user_id) is not None
+
+    def __iter__(self):
+        """遍历 models 目录中有模型的用户（文件名前缀），不加载模型"""
+        if not self.models_dir.exists():
+            return iter(())
+        stems = set()
+        for name in os.listdir(self.models_dir):
+            for suffix in (f'_model{ARTIFACT_SUFFIX}', '_model.pkl'):
+                if name.endswith(suffix):
+                    stems.add(name[:-len(suffix)])
+        return iter(sorted(stems))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def memory_bytes(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def preload(self, user_ids):
+        """按给定顺序预加载（最后一个成为最近使用），返回加载成功的用户数"""
+        return sum(1 for user_id in user_ids if self.get(user_id) is not None)
+
+    def preload_recent(self, db_path, limit=None, hours=None):
+        """预加载最近活跃用户（预测水位线最近有更新的用户）的模型，返回加载成功的用户数"""
+        limit = min(self.preload_count if limit is None else limit, self.max_models)
+        hours = self.preload_hours if hours is None else hours
+        if limit <= 0:
+            return 0
+        try:
+            conn = sqlite3.connect(str(db_path))
+            try:
+                rows = conn.execute('''
+                    SELECT user_id FROM prediction_watermarks
+                    WHERE updated_at >= ?
+                    ORDER BY updated_at DESC
+                ''', (time.time() - hours * 3600,)).fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            self.logger.warning(f"读取最近活跃用户失败: {str(e)}")
+            return 0
+
+        # 水位线表每个用户一行；跳过没有模型的用户，最近活跃的用户最后加载，位于LRU的最新端
+        users = [user_id for user_id, in rows if user_id in self][:limit]
+        loaded = self.preload(reversed(users))
+        self.logger.info(f"预加载了 {loaded} 个最近活跃用户的模型")
+        return loaded
+
+    def evict(self, user_id=None):
+        """丢弃指定用户（或全部）的已加载模型"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                resolved = self._resolve(user_id)
+                self._entries.pop(resolved[0] if resolved else str(user_id), None)
+
+    def get_stats(self):
+        lookups = self.hits + self.misses + self.reloads
+        return {
+            'models': len(self._entries),
+            'memory_bytes': self.memory_bytes(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'reloads': self.reloads,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else None,
+        }
@@ -0,0 +1,112 @@
+import threading
+import time
+from pathlib import Path
+import sys
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+
+
+class AdaptivePredictionScheduler:
+    """连续预测的自适应调度：有新特征窗口时立即唤醒，用户空闲时指数退避，活跃或异常分数升高时收紧间隔
+
+    定时等待只是兜底：特征处理器保存新窗口后调用 notify_windows 唤醒预测循环；
+    采集器事件经 notify_activity 标记用户活跃，空闲退避后的第一个事件把间隔恢复为基准间隔并唤醒。
+    没有新窗口且最近没有活动时，间隔按 backoff_factor 增长到 max_interval，空闲时几乎不占CPU。
+    """
+
+    def __init__(self, base_interval=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        prediction_config = self.config.get_prediction_config()
+        scheduler_config = prediction_config.get('scheduler', {}) or {}
+        self.min_interval = float(scheduler_config.get('min_interval', 1))
+        self.max_interval = float(scheduler_config.get('max_interval', 300))
+        self.backoff_factor = float(scheduler_config.get('backoff_factor', 2.0))
+        self.tighten_score = float(scheduler_config.get('tighten_anomaly_score', 0.5))
+        self.activity_window = float(scheduler_config.get('activity_window', 60))
+        if base_interval is None:
+            base_interval = prediction_config.get('interval', 30)
+        self.base_interval = min(max(float(base_interval), self.min_interval), self.max_interval)
+
+        self.interval = self.base_interval
+        self.last_activity = None
+        self._last_position = None
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.wakeups = {'window': 0, 'activity': 0, 'timeout': 0}
+        self._wake_reason = None
+
+    def notify_windows(self, user_id=None, count=1):
+        """特征处理器的窗口监听入口：有新窗口可评分，立即唤醒预测循环"""
+        with self._lock:
+            self._wake_reason = self._wake_reason or 'window'
+        self._wakeup.set()
+
+    def notify_activity(self, event=None):
+        """采集器事件监听入口：只记录活动时间；处于空闲退避时恢复基准间隔并唤醒
+
+        采集器每个轮询周期都会发出 move 事件，位置未变化的 move 不算用户活动，
+        只有点击、滚轮和位置确实变化的移动才更新活动时间。
+        """
+        if event is not None and event.get('event_type') == 'move':
+            position = (event.get('x'), event.get('y'))
+            if position == self._last_position:
+                return
+            self._last_position = position
+        self.last_activity = time.time()
+        if self.interval > self.base_interval:
+            with self._lock:
+                self.interval = self.base_interval
+                self._wake_reason = self._wake_reason or 'activity'
+            self._wakeup.set()
+
+    def wake(self):
+        """停止时唤醒等待中的预测循环"""
+        with self._lock:
+            self._wake_reason = 'stop'
+        self._wakeup.set()
+
+    def is_active(self):
+        return self.last_activity is not None and time.time() - self.last_activity < self.activity_window
+
+    def wait(self):
+        """等待到下次预测：被新窗口或用户恢复活动唤醒时提前返回，返回唤醒原因"""
+        woken = self._wakeup.wait(self.interval)
+        with self._lock:
+            self._wakeup.clear()
+            reason = self._wake_reason if woken else 'timeout'
+            self._wake_reason = None
+        if reason in self.wakeups:
+            self.wakeups[reason] += 1
+        return reason
+
+    def record_cycle(self, n_windows, max_anomaly_score=None):
+        """根据本轮结果调整下次等待的间隔，返回新的间隔（秒）"""
+        previous = self.interval
+        with self._lock:
+            if max_anomaly_score is not None and max_anomaly_score >= self.tighten_score:
+                # 异常分数升高：以最小间隔密切跟踪
+                self.interval = self.min_interval
+            elif n_windows > 0 or self.is_active():
+                # 有新窗口或用户活跃：退避状态直接回到基准间隔，收紧状态逐步放宽到基准间隔
+                self.interval = min(self.interval * self.backoff_factor, self.base_interval)
+            else:
+                # 空闲：指数退避
+                self.interval = min(self.interval * self.backoff_factor, self.max_interval)
+        if self.interval != previous:
+            self.logger.debug(f"预测间隔调整: {previous:.1f}s -> {self.interval:.1f}s")
+        return self.interval
+
+    def get_stats(self):
+        return {
+            'interval': self.interval,
+            'base_interval': self.base_interval,
+            'active': self.is_active(),
+            'wakeups': dict(self.wakeups),
+        }
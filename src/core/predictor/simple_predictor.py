@@ -15,42 +15,73 @@ sys.path.insert(0, str(project_root))
 
 from src.utils.logger.logger import Logger
 from src.utils.config.config_loader import ConfigLoader
+from src.core.database.schema_migrations import ensure_schema, normalize_user_id
+from src.core.predictor.model_cache import ModelCache, EXCLUDE_COLS
+from src.core.predictor.prediction_scheduler import AdaptivePredictionScheduler
+from src.core.model_trainer.sanitize import sanitize_array
 
-# 条件导入predict模块
-try:
-    from src.predict import predict_anomaly
-    PREDICT_AVAILABLE = True
-except ImportError:
+# predict模块（依赖 xgboost/sklearn）只用于备用预测方案，首次使用时才导入：
+# 编译树集成评分的监控进程不加载 xgboost。None 表示尚未尝试导入
+PREDICT_AVAILABLE = None
+predict_anomaly = predict_anomaly_batch = None
+
+
+def _load_predict_module():
+    """按需导入predict模块，返回是否可用"""
+    global PREDICT_AVAILABLE, predict_anomaly, predict_anomaly_batch
+    if PREDICT_AVAILABLE is not None:
+        return PREDICT_AVAILABLE
     try:
-        from src.predict_mock import predict_anomaly
-        PREDICT_AVAILABLE = False
-        print("警告: 使用模拟的predict模块")
+        from src.predict import predict_anomaly, predict_anomaly_batch
+        PREDICT_AVAILABLE = True
     except ImportError:
-        PREDICT_AVAILABLE = False
-        # 创建模拟函数
-        def predict_anomaly(*args, **kwargs): 
-            return {"anomaly_score": 0.0, "prediction": 0}
-        print("警告: 使用内置模拟函数")
+        try:
+            from src.predict_mock import predict_anomaly, predict_anomaly_batch
+            PREDICT_AVAILABLE = False
+            print("警告: 使用模拟的predict模块")
+        except ImportError:
+            PREDICT_AVAILABLE = False
+            # 创建模拟函数
+            def predict_anomaly(*args, **kwargs):
+                return {"anomaly_score": 0.0, "prediction": 0}
+            def predict_anomaly_batch(*args, **kwargs):
+                return None
+            print("警告: 使用内置模拟函数")
+    return PREDICT_AVAILABLE
 
 class SimplePredictor:
     def __init__(self):
         self.logger = Logger()
         self.config = ConfigLoader()
         self.db_path = Path(self.config.get_paths()['data']) / 'mouse_data.db'
-        
-        if not PREDICT_AVAILABLE:
-            self.logger.error("predict模块不可用，预测功能受限")
+        ensure_schema(self.db_path)
         
         # 预测配置
         self.prediction_config = self.config.get_prediction_config()
         self.batch_size = self.prediction_config.get('batch_size', 50)
-        self.prediction_interval = self.prediction_config.get('prediction_interval', 5)  # 降低到5秒
-        self.anomaly_threshold = self.prediction_config.get('anomaly_threshold', 0.3)  # 降低阈值到0.3
+        # 配置项为 prediction.interval，兼容旧的 prediction_interval
+        self.prediction_interval = self.prediction_config.get(
+            'interval', self.prediction_config.get('prediction_interval', 5)
+        )
+        # 配置的阈值为准；未配置时才使用模型制品中训练时写入的阈值，两者都没有时为0.3
+        self.configured_threshold = self.prediction_config.get('anomaly_threshold')
+        self.anomaly_threshold = self.configured_threshold if self.configured_threshold is not None else 0.3
+        
+        # 用户模型缓存：每个预测周期只检查模型文件是否变化，不再重复加载
+        self.model_cache = ModelCache(self.config.get_paths()['models'])
+        compiled_config = self.prediction_config.get('compiled_inference', {}) or {}
+        self.compiled_max_rows = int(compiled_config.get('max_rows', 32))
+        
+        # 自适应调度：新窗口到达时唤醒，空闲时退避，预测间隔只作为兜底
+        self.scheduler = AdaptivePredictionScheduler(self.prediction_interval)
         
         # 预测状态
         self.is_predicting = False
         self.prediction_thread = None
         self.data_buffer = deque(maxlen=self.batch_size * 2)
+        # 最近一次预测耗时，供训练资源调度判断预测是否被拖慢
+        self.last_prediction_latency = None
+        self.last_prediction_time = None
         
         self.logger.info("简单预测器初始化完成")
         self.logger.info(f"预测配置: batch_size={self.batch_size}, interval={self.prediction_interval}s, threshold={self.anomaly_threshold}")
@@ -83,6 +114,62 @@ class SimplePredictor:
             self.logger.error(f"从数据库加载特征数据失败: {str(e)}")
             return pd.DataFrame()
 
+    def get_scoring_watermark(self, user_id):
+        """读取用户的预测水位线 (最后已评分的特征id, 时间戳)，尚未评分过时返回None"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute(
+                    'SELECT last_feature_id, last_timestamp FROM prediction_watermarks WHERE user_id = ?',
+                    (user_id,)
+                ).fetchone()
+            finally:
+                conn.close()
+            return (int(row[0]), row[1]) if row else None
+        except Exception as e:
+            self.logger.error(f"读取预测水位线失败: {str(e)}")
+            return None
+
+    def load_new_features(self, user_id, limit=None):
+        """加载水位线之后尚未评分的特征窗口（按id升序）；没有水位线时取最近的 limit 条"""
+        try:
+            watermark = self.get_scoring_watermark(user_id)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                if watermark is None:
+                    query = 'SELECT id, feature_vector, timestamp FROM features WHERE user_id = ? ORDER BY id DESC'
+                    params = (user_id,)
+                else:
+                    query = '''
+                        SELECT id, feature_vector, timestamp FROM features
+                        WHERE user_id = ? AND id > ?
+                        ORDER BY id
+                    '''
+                    params = (user_id, watermark[0])
+                if limit:
+                    query += f' LIMIT {int(limit)}'
+                df = pd.read_sql_query(query, conn, params=params)
+            finally:
+                conn.close()
+            
+            if df.empty:
+                return df
+            if watermark is None:
+                df = df.iloc[::-1].reset_index(drop=True)
+            return self._parse_feature_vectors(df)
+            
+        except Exception as e:
+            self.logger.error(f"加载未评分特征数据失败: {str(e)}")
+            return pd.DataFrame()
+
+    @staticmethod
+    def _batch_watermark(features_df):
+        """一批特征窗口对应的新水位线 (最大特征id, 其时间戳)；没有id列时返回None"""
+        if features_df.empty or 'id' not in features_df.columns:
+            return None
+        last = features_df['id'].idxmax()
+        return int(features_df.at[last, 'id']), float(features_df.at[last, 'timestamp'])
+
     def _parse_feature_vectors(self, df):
         """解析特征向量JSON字符串"""
         try:
@@ -112,61 +199,59 @@ class SimplePredictor:
             return df
 
     def predict_with_trained_model(self, features_df, user_id):
-        """使用训练好的模型进行预测"""
+        """使用训练好的模型进行预测（模型取自缓存，模型文件变化时才重新加载）"""
         try:
-            # 导入模型训练器来加载模型
-            from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
-            model_trainer = SimpleModelTrainer()
-            
-            # 加载用户模型
-            model, scaler, feature_cols = model_trainer.load_user_model(user_id)
-            if model is None:
+            entry = self.model_cache.get(user_id)
+            if entry is None:
                 self.logger.error(f"用户 {user_id} 的模型不存在，无法预测")
                 return None
             
             # 特征对齐（严格一致：列集合与顺序必须与训练一致；缺失列用0补齐）
-            if feature_cols:
-                exclude_cols = ['id', 'timestamp', 'user_id', 'session_id']
-                feature_cols_filtered = [col for col in feature_cols if col not in exclude_cols]
-                
-                # 将所有列尽可能转为数值，保证与训练阶段一致的输入类型
-                features_df = features_df.apply(pd.to_numeric, errors='coerce').fillna(0)
-                
-                # 缺失特征用0补齐
+            if entry.feature_cols:
+                feature_cols_filtered = entry.feature_cols
                 missing_features = [col for col in feature_cols_filtered if col not in features_df.columns]
                 if missing_features:
                     self.logger.warning(f"缺少特征: {missing_features}")
-                    for feature in missing_features:
-                        features_df[feature] = 0.0
-                
-                # 严格按照训练时顺序取列
-                X = features_df.reindex(columns=feature_cols_filtered, fill_value=0).fillna(0)
             else:
                 # 如果没有特征列信息，使用所有数值列（排除非特征列）
                 numeric_cols = features_df.select_dtypes(include=[np.number]).columns
-                exclude_cols = ['id', 'timestamp', 'user_id', 'session_id']
-                feature_cols_filtered = [col for col in numeric_cols if col not in exclude_cols]
-                X = features_df[feature_cols_filtered].fillna(0)
-            
-            # 预测：传入numpy以避免XGBoost对特征名的严格校验
-            X_np = X.values
-            predictions = model.predict(X_np)
-            probabilities = model.predict_proba(X_np)
+                feature_cols_filtered = [col for col in numeric_cols if col not in EXCLUDE_COLS]
+            
+            # 只对非数值列做类型转换，其余列直接取出；缺失列为NaN，随后与 inf/nan 一起置0
+            X = features_df.reindex(columns=feature_cols_filtered)
+            object_cols = X.columns[~X.dtypes.map(pd.api.types.is_numeric_dtype).to_numpy(dtype=bool)]
+            if len(object_cols):
+                X[object_cols] = X[object_cols].apply(pd.to_numeric, errors='coerce')
+            
+            # 单次清洗：非有限值置0、按训练时保存的逐列边界裁剪、转为float32
+            # 传入numpy以避免XGBoost对特征名的严格校验
+            X_np = sanitize_array(X.to_numpy(dtype=np.float64, na_value=np.nan),
+                                  lower=entry.clip_lower, upper=entry.clip_upper)
+            # 小批量用编译树集成（纯NumPy，没有 DMatrix 构造与线程调度开销），大批量用 XGBoost 原生推理
+            if entry.compiled is not None and len(X_np) <= self.compiled_max_rows:
+                probabilities = entry.compiled.predict_proba(X_np)
+            else:
+                probabilities = entry.model.predict_proba(X_np)
+            
+            # 处理预测结果：正常类别概率为最后一列，预测标签与 predict() 一致取概率最大的类别
+            normal_probs = probabilities[:, -1]
+            predictions = probabilities.argmax(axis=1)
+            threshold = self.resolve_threshold(entry)
+            if 'timestamp' in features_df.columns:
+                timestamps = features_df['timestamp'].tolist()
+            else:
+                timestamps = [time.time()] * len(features_df)
             
-            # 处理预测结果
             results = []
-            for i, (pred, prob) in enumerate(zip(predictions, probabilities)):
-                # 获取正常类别的概率
-                normal_prob = prob[1] if len(prob) > 1 else prob[0]
+            for pred, normal_prob, timestamp in zip(predictions.tolist(), normal_probs.tolist(), timestamps):
                 anomaly_score = 1 - normal_prob
-                is_anomaly = anomaly_score > self.anomaly_threshold
-                
+                is_anomaly = anomaly_score > threshold
                 results.append({
-                    'prediction': int(pred),
+                    'prediction': pred,
                     'anomaly_score': float(anomaly_score),
                     'is_normal': not is_anomaly,
                     'probability': float(normal_prob),
-                    'timestamp': features_df.iloc[i].get('timestamp', time.time())
+                    'timestamp': timestamp
                 })
             
             self.logger.info(f"使用训练模型预测完成: {len(results)} 个结果")
@@ -176,11 +261,21 @@ class SimplePredictor:
             self.logger.error(f"使用训练模型预测失败: {str(e)}")
             return None
 
+    def resolve_threshold(self, entry):
+        """模型实际使用的异常阈值：配置优先，修改配置即对已有模型生效；未配置时回退到模型制品中的阈值"""
+        if self.configured_threshold is not None:
+            if entry.threshold is not None and entry.threshold != self.configured_threshold:
+                self.logger.debug(f"模型阈值 {entry.threshold} 与配置不一致，使用配置阈值 {self.configured_threshold}")
+            return self.configured_threshold
+        if entry.threshold is not None:
+            return entry.threshold
+        return self.anomaly_threshold
+
     def predict_with_predict_module(self, features_df, user_id):
         """使用predict模块进行预测（备用方案）"""
         try:
-            if not PREDICT_AVAILABLE:
-                self.logger.error("predict模块不可用")
+            if not _load_predict_module():
+                self.logger.error("predict模块不可用，备用预测方案无法使用")
                 return None
             
             if features_df.empty:
@@ -202,25 +297,12 @@ class SimplePredictor:
             
             X = features_df[feature_cols].fillna(0)
             
-            # 使用predict模块进行预测
-            # 批量处理，避免重复加载模型
-            predictions = []
-            
-            # 尝试一次性加载模型，避免重复加载
+            # 使用predict模块进行预测：只加载该用户的模型（带缓存），
+            # 整批数据一次对齐、一次标准化、一次 predict_proba
             try:
-                from src.predict import load_models
-                model_info = load_models()
-                user_model_info = model_info.get(user_id)
-                
-                if user_model_info:
-                    # 如果有模型，批量预测
-                    for i, row in X.iterrows():
-                        feature_dict = row.to_dict()
-                        result = predict_anomaly(user_id, feature_dict, model_info)
-                        if result:
-                            predictions.append(result['anomaly_score'])
-                        else:
-                            predictions.append(0.5)
+                scored = predict_anomaly_batch(user_id, X)
+                if scored is not None:
+                    predictions = scored['anomaly_score'].tolist()
                 else:
                     # 如果没有模型，使用默认值
                     predictions = [0.5] * len(X)
@@ -229,10 +311,15 @@ class SimplePredictor:
                 self.logger.warning(f"批量预测失败，使用默认值: {str(e)}")
                 predictions = [0.5] * len(X)
             
+            if 'timestamp' in features_df.columns:
+                timestamps = features_df['timestamp'].tolist()
+            else:
+                timestamps = [time.time()] * len(features_df)
+            
             # 处理预测结果
             results = []
-            for i, pred in enumerate(predictions):
-                # 假设predict_anomaly返回异常分数（0-1之间，越高越异常）
+            for pred, timestamp in zip(predictions, timestamps):
+                # 异常分数（0-1之间，越高越异常）
                 anomaly_score = float(pred)
                 is_anomaly = anomaly_score > self.anomaly_threshold
                 
@@ -241,7 +328,7 @@ class SimplePredictor:
                     'anomaly_score': anomaly_score,
                     'is_normal': not is_anomaly,
                     'probability': 1 - anomaly_score,  # 正常概率
-                    'timestamp': features_df.iloc[i].get('timestamp', time.time())
+                    'timestamp': timestamp
                 })
             
             self.logger.info(f"预测完成: {len(results)} 个结果")
@@ -251,12 +338,17 @@ class SimplePredictor:
             self.logger.error(f"使用predict模块预测失败: {str(e)}")
             return None
 
-    def predict_user_behavior(self, user_id, features_df=None):
-        """预测用户行为"""
+    def predict_user_behavior(self, user_id, features_df=None, watermark=None):
+        """预测用户行为
+
+        未提供特征数据时只加载水位线之后的新窗口；预测结果与新水位线 watermark=(特征id, 时间戳)
+        在同一事务中保存，每个窗口只评分、入库一次。
+        """
         try:
-            # 如果没有提供特征数据，从数据库加载最近的
+            # 如果没有提供特征数据，从数据库加载尚未评分的窗口
             if features_df is None:
-                features_df = self.load_recent_features(user_id, self.batch_size)
+                features_df = self.load_new_features(user_id, self.batch_size)
+                watermark = self._batch_watermark(features_df)
             
             if features_df.empty:
                 self.logger.warning(f"用户 {user_id} 没有特征数据")
@@ -278,7 +370,7 @@ class SimplePredictor:
                 self.logger.info(f"用户 {user_id} 预测结果: 正常 {normal_count}, 异常 {anomaly_count}")
                 
                 # 保存预测结果到数据库
-                self.save_predictions_to_db(user_id, results)
+                self.save_predictions_to_db(user_id, results, watermark=watermark)
             
             return results or []
             
@@ -286,26 +378,18 @@ class SimplePredictor:
             self.logger.error(f"预测用户 {user_id} 行为失败: {str(e)}")
             return []
 
-    def save_predictions_to_db(self, user_id, predictions):
-        """保存预测结果到数据库"""
+    def save_predictions_to_db(self, user_id, predictions, watermark=None, conn=None):
+        """保存预测结果到数据库；给定 watermark=(特征id, 时间戳) 时在同一事务中推进预测水位线
+
+        传入 conn 时复用调用方的连接与事务，由调用方负责提交。
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
+            user_id = normalize_user_id(user_id)
+            own_conn = conn is None
+            if own_conn:
+                conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # 创建预测结果表（如果不存在）
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS predictions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT NOT NULL,
-                    timestamp REAL NOT NULL,
-                    prediction INTEGER NOT NULL,
-                    anomaly_score REAL NOT NULL,
-                    is_normal BOOLEAN NOT NULL,
-                    probability REAL NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
             # 批量插入预测结果
             data_to_insert = [
                 (user_id, pred['timestamp'], pred['prediction'], 
@@ -319,8 +403,16 @@ class SimplePredictor:
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', data_to_insert)
             
-            conn.commit()
-            conn.close()
+            if watermark is not None:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO prediction_watermarks
+                    (user_id, last_feature_id, last_timestamp, updated_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_id, watermark[0], watermark[1], time.time()))
+            
+            if own_conn:
+                conn.commit()
+                conn.close()
             
             self.logger.info(f"保存了 {len(predictions)} 条预测结果到数据库")
             
@@ -350,6 +442,7 @@ class SimplePredictor:
             return
         
         self.is_predicting = False
+        self.scheduler.wake()
         if self.prediction_thread:
             self.prediction_thread.join(timeout=5)
         
@@ -357,18 +450,25 @@ class SimplePredictor:
 
     def _prediction_loop(self, user_id, callback=None):
         """预测循环"""
-        self.logger.info(f"开始预测循环 - 用户: {user_id}, 间隔: {self.prediction_interval}秒")
+        self.logger.info(f"开始预测循环 - 用户: {user_id}, 基准间隔: {self.scheduler.base_interval}秒, "
+                         f"范围: {self.scheduler.min_interval}-{self.scheduler.max_interval}秒")
         
         while self.is_predicting:
             try:
-                # 加载最近的特征数据
-                features_df = self.load_recent_features(user_id, self.batch_size)
+                # 只加载水位线之后的新窗口，已评分的窗口不会重复推理、入库和告警
+                features_df = self.load_new_features(user_id, self.batch_size)
+                predictions = []
                 
                 if not features_df.empty:
-                    self.logger.debug(f"加载到 {len(features_df)} 条特征数据")
+                    self.logger.debug(f"加载到 {len(features_df)} 条未评分的特征数据")
                     
                     # 进行预测
-                    predictions = self.predict_user_behavior(user_id, features_df)
+                    predict_start = time.time()
+                    predictions = self.predict_user_behavior(
+                        user_id, features_df, watermark=self._batch_watermark(features_df)
+                    )
+                    self.last_prediction_latency = time.time() - predict_start
+                    self.last_prediction_time = time.time()
                     
                     if predictions:
                         self.logger.debug(f"完成 {len(predictions)} 个预测")
@@ -395,14 +495,28 @@ class SimplePredictor:
                 else:
                     self.logger.debug("没有新的特征数据")
                 
-                # 等待下次预测
-                time.sleep(self.prediction_interval)
+                # 按本轮的窗口数与最高异常分数调整间隔
+                self.scheduler.record_cycle(
+                    len(features_df), max((p['anomaly_score'] for p in predictions), default=None)
+                )
+                
+                # 积压超过一批且本批评分成功时立即处理下一批，否则等待新窗口或下次兜底预测
+                if not predictions or len(features_df) < self.batch_size:
+                    self.scheduler.wait()
                 
             except Exception as e:
                 self.logger.error(f"预测循环出错: {str(e)}")
                 import traceback
                 self.logger.debug(f"异常详情: {traceback.format_exc()}")
-                time.sleep(self.prediction_interval)
+                self.scheduler.wait()
+
+    def get_prediction_latency(self):
+        """最近一次预测的耗时（秒）；超过两个预测周期没有新的预测时返回0"""
+        if self.last_prediction_latency is None or self.last_prediction_time is None:
+            return 0.0
+        if time.time() - self.last_prediction_time > self.prediction_interval * 2 + self.last_prediction_latency:
+            return 0.0
+        return self.last_prediction_latency
 
     def get_user_predictions(self, user_id, limit=100):
         """获取用户的预测历史"""
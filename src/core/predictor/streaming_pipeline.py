@@ -0,0 +1,223 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger.logger import Logger
+from src.utils.config.config_loader import ConfigLoader
+from src.core.feature_engineer.simple_feature_processor import SimpleFeatureProcessor
+from src.core.feature_engineer.incremental_featurizer import IncrementalFeaturizer
+from src.core.predictor.simple_predictor import SimplePredictor
+
+
+class StreamingDetectionPipeline:
+    """进程内流式检测：采集事件 -> 内存队列 -> 增量窗口特征 -> 缓存模型评分 -> 回调
+
+    窗口关闭（第 window_size 条事件入队）到回调之间只有内存操作与一次模型推理，不读写SQLite；
+    特征、预测结果与预测水位线由后台线程按批在同一事务中异步写入，与轮询式预测共用同一套表，
+    流式评分过的窗口不会再被轮询预测重复评分。
+    """
+
+    def __init__(self, predictor=None, feature_processor=None, callback=None, window_size=None):
+        self.logger = Logger()
+        self.config = ConfigLoader()
+
+        streaming_config = self.config.get_prediction_config().get('streaming', {}) or {}
+        self.queue_size = int(streaming_config.get('queue_size', 10000))
+        self.max_latency = float(streaming_config.get('max_latency_ms', 500)) / 1000
+        self.persist_batch_size = int(streaming_config.get('persist_batch_size', 20))
+        self.persist_interval = float(streaming_config.get('persist_interval', 1.0))
+        self.session_idle_timeout = float(streaming_config.get('session_idle_timeout', 600))
+
+        self.predictor = predictor or SimplePredictor()
+        self.feature_processor = feature_processor or SimpleFeatureProcessor()
+        self.callback = callback
+        self.window_size = window_size
+        self.featurizer = None
+
+        self.events = queue.Queue(maxsize=self.queue_size)
+        self.persist_queue = queue.Queue()
+        self.is_running = False
+        self.detection_thread = None
+        self.persistence_thread = None
+
+        # 运行统计
+        self.received_events = 0
+        self.dropped_events = 0
+        self.windows = 0
+        self.late_windows = 0
+        self.persisted_windows = 0
+        self.latencies = deque(maxlen=1000)
+        self._missing_models = set()
+
+    def start(self):
+        """启动检测线程与持久化线程"""
+        if self.is_running:
+            self.logger.warning("流式检测已在运行中")
+            return False
+        try:
+            # 对齐用的训练特征列只在启动时读取一次，检测路径上不再访问数据库
+            self.featurizer = IncrementalFeaturizer(
+                window_size=self.window_size,
+                target_features=self.feature_processor.get_training_feature_columns()
+            )
+            self.is_running = True
+            self.detection_thread = threading.Thread(target=self._detection_loop, daemon=True)
+            self.persistence_thread = threading.Thread(target=self._persistence_loop, daemon=True)
+            self.persistence_thread.start()
+            self.detection_thread.start()
+            self.logger.info(f"流式检测已启动: 窗口 {self.featurizer.window_size} 条事件, "
+                             f"延迟上限 {self.max_latency * 1000:.0f}ms")
+            return True
+        except Exception as e:
+            self.logger.error(f"启动流式检测失败: {str(e)}")
+            self.is_running = False
+            return False
+
+    def stop(self, timeout=5):
+        """停止检测：处理完已入队的事件，并把尚未落库的窗口写入数据库"""
+        if not self.is_running:
+            return
+        self.is_running = False
+        try:
+            self.events.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        if self.detection_thread:
+            self.detection_thread.join(timeout=timeout)
+        self.persist_queue.put(None)
+        if self.persistence_thread:
+            self.persistence_thread.join(timeout=timeout)
+        self.logger.info(f"流式检测已停止: {self.get_stats()}")
+
+    def submit(self, event):
+        """采集器事件监听入口：非阻塞入队，队列满时丢弃并计数，不拖慢采集线程"""
+        try:
+            self.events.put_nowait((event, time.perf_counter()))
+            self.received_events += 1
+            return True
+        except queue.Full:
+            self.dropped_events += 1
+            return False
+
+    def _detection_loop(self):
+        last_sweep = time.time()
+        while True:
+            try:
+                item = self.events.get(timeout=1.0)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+
+            if item:
+                event, enqueued_at = item
+                try:
+                    features = self.featurizer.add_event(event)
+                    if features is not None:
+                        self._score_window(event.get('user_id'), event.get('session_id'), features, enqueued_at)
+                except Exception as e:
+                    self.logger.error(f"流式检测处理事件失败: {str(e)}")
+
+            if time.time() - last_sweep >= 60:
+                self.featurizer.drop_idle_sessions(self.session_idle_timeout)
+                last_sweep = time.time()
+
+    def _score_window(self, user_id, session_id, features, closed_at):
+        """对刚关闭的窗口评分并回调；closed_at 为关闭窗口的事件入队时刻"""
+        results = None
+        if self.predictor.model_cache.get(user_id) is not None:
+            results = self.predictor.predict_with_trained_model(features, user_id)
+        elif user_id not in self._missing_models:
+            self._missing_models.add(user_id)
+            self.logger.warning(f"用户 {user_id} 没有可用模型，流式窗口只保存特征")
+
+        if results and self.callback:
+            try:
+                self.callback(user_id, results)
+            except Exception as e:
+                self.logger.error(f"流式检测回调失败: {str(e)}")
+
+        latency = time.perf_counter() - closed_at
+        self.windows += 1
+        self.latencies.append(latency)
+        if results:
+            self.predictor.last_prediction_latency = latency
+            self.predictor.last_prediction_time = time.time()
+        if latency > self.max_latency:
+            self.late_windows += 1
+            self.logger.warning(f"流式检测延迟 {latency * 1000:.0f}ms 超过上限 {self.max_latency * 1000:.0f}ms")
+
+        self.persist_queue.put((user_id, session_id, features, results))
+
+    def _persistence_loop(self):
+        pending = []
+        last_flush = time.time()
+        stopping = False
+        while not stopping:
+            try:
+                item = self.persist_queue.get(timeout=self.persist_interval)
+                if item is None:
+                    stopping = True
+                else:
+                    pending.append(item)
+            except queue.Empty:
+                pass
+
+            if pending and (stopping or len(pending) >= self.persist_batch_size
+                            or time.time() - last_flush >= self.persist_interval):
+                self._persist(pending)
+                pending = []
+                last_flush = time.time()
+
+    def _persist(self, items):
+        """一批窗口的特征、预测结果与预测水位线在同一事务中写入
+
+        同一会话的窗口合并为一次写入，负样本池与分位数草图每批只更新一次。
+        """
+        groups = {}
+        for user_id, session_id, features, results in items:
+            frames, session_results = groups.setdefault((user_id, session_id), ([], []))
+            frames.append(features)
+            session_results.extend(results or [])
+        try:
+            conn = sqlite3.connect(self.feature_processor.db_path)
+            try:
+                for (user_id, session_id), (frames, results) in groups.items():
+                    features = pd.concat(frames, ignore_index=True)
+                    if not self.feature_processor.save_features_to_db(features, user_id, session_id, conn=conn):
+                        continue
+                    if results:
+                        self.predictor.save_predictions_to_db(
+                            user_id, results, watermark=self.predictor._batch_watermark(features), conn=conn
+                        )
+                conn.commit()
+            finally:
+                conn.close()
+            self.persisted_windows += len(items)
+        except Exception as e:
+            self.logger.error(f"流式检测结果写入数据库失败: {str(e)}")
+
+    def get_stats(self):
+        latencies = np.asarray(self.latencies, dtype=np.float64) * 1000
+        return {
+            'received_events': self.received_events,
+            'dropped_events': self.dropped_events,
+            'queued_events': self.events.qsize(),
+            'windows': self.windows,
+            'late_windows': self.late_windows,
+            'persisted_windows': self.persisted_windows,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies.size else None,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if latencies.size else None,
+            'latency_max_ms': float(latencies.max()) if latencies.size else None,
+        }
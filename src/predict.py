@@ -27,6 +27,15 @@ except ImportError:
             print("使用内置模拟的prepare_features函数")
             return df
 import logging
+try:
+    from src.core.model_trainer.model_artifact import ModelArtifact, ARTIFACT_SUFFIX
+    from src.core.model_trainer.sanitize import sanitize_array
+    from src.core.predictor.model_registry import ModelRegistry
+except ImportError:
+    # 直接以脚本方式运行（python src/predict.py）时 src 目录位于 sys.path
+    from core.model_trainer.model_artifact import ModelArtifact, ARTIFACT_SUFFIX
+    from core.model_trainer.sanitize import sanitize_array
+    from core.predictor.model_registry import ModelRegistry
 
 # 配置日志记录
 def setup_logging():
@@ -82,42 +91,34 @@ def log_message(message, level='info'):
 setup_logging()
 
 def load_models():
-    """Load trained models"""
+    """Return the lazy model registry: each user's model is loaded on first access and LRU-bounded.
+
+    返回值可像原先的 {用户: 模型信息} 字典一样使用（get/[]/items），遍历时逐个按需加载。
+    """
     log_message("Loading models...")
-    model_info = {}
-    
-    # 遍历models目录下的所有模型文件
-    for file in os.listdir('models'):
-        if file.endswith('_model.pkl'):
-            user_id = file.replace('_model.pkl', '')
-            try:
-                # 加载模型
-                with open(f'models/{user_id}_model.pkl', 'rb') as f:
-                    model = pickle.load(f)
-                
-                # 加载scaler
-                with open(f'models/{user_id}_scaler.pkl', 'rb') as f:
-                    scaler = pickle.load(f)
-                
-                # 加载特征名称
-                with open(f'models/{user_id}_features.pkl', 'rb') as f:
-                    feature_names = pickle.load(f)
-                
-                model_info[user_id] = {
-                    'model': model,
-                    'scaler': scaler,
-                    'feature_names': feature_names
-                }
-                log_message(f"Loaded model for user {user_id}")
-            except Exception as e:
-                log_message(f"Error loading model for user {user_id}: {str(e)}", level='error')
-                continue
-    
-    if not model_info:
+    registry = get_model_registry()
+    if len(registry) == 0:
         log_message("No models were loaded successfully", level='error')
         raise ValueError("No models were loaded successfully")
-    
-    return model_info
+    log_message(f"Found models for {len(registry)} users (loaded on demand)")
+    return registry
+
+# 按模型目录共享的惰性模型注册表
+_model_registries = {}
+
+def get_model_registry(models_dir='models'):
+    """Shared lazy model registry for a models directory (limits from prediction.model_registry)"""
+    registry = _model_registries.get(models_dir)
+    if registry is None:
+        registry = _model_registries[models_dir] = ModelRegistry(models_dir)
+    return registry
+
+def load_user_model(user_id, models_dir='models'):
+    """Load only the given user's model (artifact or legacy pickle set), cached until the model file changes.
+
+    返回与 load_models 条目相同的模型信息（ModelArtifact 或 model/scaler/feature_names 字典），找不到时返回None。
+    """
+    return get_model_registry(models_dir).get(user_id)
 
 def load_data():
     """Load training and test data"""
@@ -601,26 +602,30 @@ def predict_user_behavior_agg(test_data, user_id):
     """Predict user behavior using the trained model (aggregated features)."""
     try:
         # 加载模型和编码器
+        artifact_file = f'./models/user_{user_id}_model{ARTIFACT_SUFFIX}'
         model_path = f'./models/user_{user_id}_model.pkl'
         scaler_path = f'./models/user_{user_id}_scaler.pkl'
         feature_path = f'./models/user_{user_id}_features.pkl'
 
-        if not os.path.exists(model_path):
+        if os.path.exists(artifact_file):
+            artifact = ModelArtifact.open(artifact_file)
+            model, scaler, feature_names = artifact.model, artifact.scaler, artifact.feature_cols
+        elif not os.path.exists(model_path):
             log_message(f"[AGG] Model file {model_path} not found", level='error')
             return None, None
-        if not os.path.exists(scaler_path):
+        elif not os.path.exists(scaler_path):
             log_message(f"[AGG] Scaler file {scaler_path} not found", level='error')
             return None, None
-        if not os.path.exists(feature_path):
+        elif not os.path.exists(feature_path):
             log_message(f"[AGG] Feature file {feature_path} not found", level='error')
             return None, None
-            
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        with open(scaler_path, 'rb') as f:
-            scaler = pickle.load(f)
-        with open(feature_path, 'rb') as f:
-            feature_names = pickle.load(f)
+        else:
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+            with open(scaler_path, 'rb') as f:
+                scaler = pickle.load(f)
+            with open(feature_path, 'rb') as f:
+                feature_names = pickle.load(f)
 
         # 1. 处理异常值并严格按训练特征顺序对齐
         X = test_data.reindex(columns=feature_names, fill_value=0).copy()
@@ -701,25 +706,31 @@ def main():
     except Exception as e:
         log_message(f"Error in main: {str(e)}", level='error')
 
+def _sanitize_features(feature_df, user_model_info):
+    """Align-then-clean as at training time: non-finite values to 0, clipped to the per-column bounds stored with the model."""
+    bounds = user_model_info.get('clip_bounds') or {}
+    lower, upper = bounds.get('lower'), bounds.get('upper')
+    if lower is None or len(lower) != feature_df.shape[1]:
+        lower = upper = None
+    return sanitize_array(feature_df.to_numpy(dtype=np.float64, na_value=np.nan), dtype=np.float64,
+                          lower=lower, upper=upper)
+
 def predict_anomaly(user_id, features, model_info=None):
     """预测异常行为 - 兼容性函数"""
     try:
         log_message(f"Predicting anomaly for user {user_id}...")
         
         if model_info is None:
-            # 尝试加载模型
-            try:
-                model_info = load_models()
-            except Exception as e:
-                log_message(f"Error loading models: {str(e)}", level='error')
-                return None
-        
-        if user_id not in model_info:
+            # 只加载该用户的模型（带缓存）
+            user_model_info = load_user_model(user_id)
+        else:
+            user_model_info = model_info.get(user_id)
+        
+        if user_model_info is None:
             log_message(f"No model found for user {user_id}", level='error')
             return None
         
         # 获取用户模型
-        user_model_info = model_info[user_id]
         model = user_model_info['model']
         scaler = user_model_info['scaler']
         feature_names = user_model_info['feature_names']
@@ -739,11 +750,11 @@ def predict_anomaly(user_id, features, model_info=None):
             if feature not in feature_df.columns:
                 feature_df[feature] = 0.0
 
-        # 严格按训练顺序对齐
-        feature_df = feature_df.reindex(columns=feature_names, fill_value=0).fillna(0)
+        # 严格按训练顺序对齐，缺失值置0并按训练时的逐列边界裁剪（使用numpy避免XGBoost特征名校验）
+        feature_df = feature_df.reindex(columns=feature_names, fill_value=0)
+        X_np = _sanitize_features(feature_df, user_model_info)
 
-        # 标准化特征（使用numpy避免XGBoost特征名校验）
-        X_np = feature_df.values
+        # 标准化特征
         if scaler is not None:
             X_np = scaler.transform(X_np)
 
@@ -773,6 +784,43 @@ def predict_anomaly(user_id, features, model_info=None):
         log_message(f"Error predicting anomaly for user {user_id}: {str(e)}", level='error')
         return None
 
+def predict_anomaly_batch(user_id, features, model_info=None):
+    """Score a whole feature DataFrame for one user: one column alignment, one scaler transform, one predict_proba.
+
+    model_info 为 load_models 的返回值时从中取该用户的模型，否则只加载该用户的模型（带缓存）。
+    返回 {'prediction': 逐行预测标签, 'anomaly_score': 逐行异常分数}（与 predict_anomaly 的单行结果一致），
+    没有模型或出错时返回None。
+    """
+    try:
+        if model_info is not None:
+            user_model_info = model_info.get(user_id)
+        else:
+            user_model_info = load_user_model(user_id)
+        if user_model_info is None:
+            log_message(f"No model found for user {user_id}", level='error')
+            return None
+        
+        model = user_model_info['model']
+        scaler = user_model_info['scaler']
+        feature_names = user_model_info['feature_names']
+        
+        # 严格按训练顺序对齐，缺失列与缺失值补0并按训练时的逐列边界裁剪（使用numpy避免XGBoost特征名校验）
+        X_np = _sanitize_features(features.reindex(columns=feature_names, fill_value=0), user_model_info)
+        if scaler is not None:
+            X_np = scaler.transform(X_np)
+        
+        proba = model.predict_proba(X_np)
+        classes = np.asarray(getattr(model, 'classes_', np.arange(proba.shape[1])))
+        # 异常分数 = 1 - 正常类别（第二列）概率；单列时取唯一一列
+        anomaly_score = 1 - proba[:, 1 if proba.shape[1] > 1 else 0]
+        
+        log_message(f"Batch prediction completed for user {user_id}: {len(X_np)} rows")
+        return {'prediction': classes[proba.argmax(axis=1)], 'anomaly_score': anomaly_score}
+        
+    except Exception as e:
+        log_message(f"Error in batch prediction for user {user_id}: {str(e)}", level='error')
+        return None
+
 def predict_user_behavior(user_id, features, threshold=0.5):
     """预测用户行为 - 兼容性函数"""
     try:
@@ -10,6 +10,11 @@ def predict_anomaly(user_id, features, model_info=None):
     logger.warning("使用模拟的predict_anomaly函数")
     return {"anomaly_score": 0.0, "prediction": 0}
 
+def predict_anomaly_batch(user_id, features, model_info=None):
+    """模拟的批量异常预测函数"""
+    logger.warning("使用模拟的predict_anomaly_batch函数")
+    return None
+
 def predict_user_behavior(user_id, features, threshold=0.5):
     """模拟的用户行为预测函数"""
     logger.warning("使用模拟的predict_user_behavior函数")
@@ -20,6 +25,11 @@ def load_models():
     logger.warning("使用模拟的load_models函数")
     return {}
 
+def get_model_registry(models_dir='models'):
+    """模拟的模型注册表函数"""
+    logger.warning("使用模拟的get_model_registry函数")
+    return None
+
 def process_file(file_path):
     """模拟的文件处理函数"""
     logger.warning("使用模拟的process_file函数")
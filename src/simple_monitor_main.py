@@ -21,7 +21,10 @@ from src.utils.config.config_loader import ConfigLoader
 from src.core.data_collector.windows_mouse_collector import WindowsMouseCollector
 from src.core.feature_engineer.simple_feature_processor import SimpleFeatureProcessor
 from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
+from src.core.model_trainer.training_governor import TrainingGovernor
+from src.core.model_trainer.background_trainer import BackgroundTrainer, TrainingJob
 from src.core.predictor.simple_predictor import SimplePredictor
+from src.core.predictor.streaming_pipeline import StreamingDetectionPipeline
 from src.core.alert.alert_service import AlertService
 from src.core.user_manager import UserManager
 
@@ -47,6 +50,10 @@ class SimpleMonitor:
         self.logger.debug("正在初始化预测器...")
         self.predictor = SimplePredictor()
         
+        self.training_governor = TrainingGovernor()
+        self.training_governor.watch_predictor(self.predictor)
+        self.background_trainer = BackgroundTrainer(self.training_governor)
+        
         self.logger.debug("正在初始化告警服务...")
         self.alert_service = AlertService()
         
@@ -58,6 +65,8 @@ class SimpleMonitor:
         
         # 线程
         self.monitoring_thread = None
+        # 流式检测管道（prediction.streaming.enabled 时由 start_prediction 创建）
+        self.streaming_pipeline = None
         
         # 注册用户管理器的回调函数
         self.logger.debug("正在注册用户管理器回调函数...")
@@ -238,13 +247,15 @@ class SimpleMonitor:
             config = ConfigLoader()
             models_path = Path(config.get_paths()['models'])
             
-            # 尝试不同的文件名格式
+            # 尝试不同的文件名格式（单文件制品 .ubm 与旧版 .pkl）
             possible_model_paths = [
+                models_path / f"user_{user_id}_model.ubm",
                 models_path / f"user_{user_id}_model.pkl",
             ]
             
             # 如果user_id不包含"user"后缀，也尝试添加
             if not user_id.endswith('_user'):
+                possible_model_paths.append(models_path / f"user_{user_id}_user_model.ubm")
                 possible_model_paths.append(models_path / f"user_{user_id}_user_model.pkl")
             
             # 检查是否存在
@@ -300,6 +311,10 @@ class SimpleMonitor:
             # 初始化鼠标采集器
             self.logger.debug("初始化鼠标采集器...")
             self.mouse_collector = WindowsMouseCollector(user_id)
+            if self.streaming_pipeline is not None:
+                self.mouse_collector.add_event_listener(self.streaming_pipeline.submit)
+            elif self.is_predicting:
+                self.mouse_collector.add_event_listener(self.predictor.scheduler.notify_activity)
             
             # 启动数据采集
             self.logger.debug("启动数据采集...")
@@ -403,8 +418,20 @@ class SimpleMonitor:
             print(f"[系统] 特征处理出错: {str(e)}")
             return False
 
+    def _on_training_finished(self, job):
+        """后台训练结束回调（在训练服务工作线程中执行）"""
+        if job.state == TrainingJob.SUCCEEDED:
+            self.logger.info(f"用户 {job.user_id} 模型训练完成")
+            print(f"[系统] 用户 {job.user_id} 模型训练完成")
+        elif job.state == TrainingJob.CANCELLED:
+            self.logger.info(f"用户 {job.user_id} 模型训练已取消")
+            print(f"[系统] 用户 {job.user_id} 模型训练已取消")
+        else:
+            self.logger.error(f"用户 {job.user_id} 模型训练失败")
+            print(f"[系统] 用户 {job.user_id} 模型训练失败")
+
     def train_model(self):
-        """训练模型"""
+        """提交后台训练任务（立即返回，结果由 _on_training_finished 输出）"""
         self.logger.info("=== 训练模型 ===")
         self.logger.debug(f"当前用户ID: {self.current_user_id}")
         
@@ -414,18 +441,11 @@ class SimpleMonitor:
                 print("[系统] 错误: 没有当前用户ID")
                 return False
             
-            self.logger.debug("开始训练用户模型...")
-            success = self.model_trainer.train_user_model(self.current_user_id)
-            
-            if success:
-                self.logger.info("模型训练完成")
-                print("[系统] 模型训练完成")
-                self.logger.debug("=== 模型训练完成 ===")
-                return True
-            else:
-                self.logger.error("模型训练失败")
-                print("[系统] 模型训练失败")
-                return False
+            self.logger.debug("提交后台训练任务...")
+            self.training_governor.watch_collector(getattr(self, 'mouse_collector', None))
+            job = self.background_trainer.submit(self.current_user_id, callback=self._on_training_finished)
+            print(f"[系统] 模型训练已在后台开始（任务 {job.job_id}）")
+            return True
                 
         except Exception as e:
             self.logger.error(f"模型训练出错: {str(e)}")
@@ -461,12 +481,27 @@ class SimpleMonitor:
                             data=anomaly
                         )
             
-            # 启动连续预测
-            self.logger.debug("启动连续预测...")
-            success = self.predictor.start_continuous_prediction(
-                self.current_user_id, 
-                callback=anomaly_callback
-            )
+            streaming_config = self.config.get_prediction_config().get('streaming', {}) or {}
+            if streaming_config.get('enabled', False):
+                # 流式检测：采集事件在进程内直接进入增量特征与缓存模型，不经数据库轮询
+                self.logger.debug("启动流式检测...")
+                self.streaming_pipeline = StreamingDetectionPipeline(
+                    self.predictor, self.feature_processor, callback=anomaly_callback
+                )
+                success = self.streaming_pipeline.start()
+                if success and getattr(self, 'mouse_collector', None):
+                    self.mouse_collector.add_event_listener(self.streaming_pipeline.submit)
+            else:
+                # 启动连续预测：新特征窗口与采集活动唤醒预测循环，空闲时退避
+                self.logger.debug("启动连续预测...")
+                success = self.predictor.start_continuous_prediction(
+                    self.current_user_id, 
+                    callback=anomaly_callback
+                )
+                if success:
+                    self.feature_processor.add_window_listener(self.predictor.scheduler.notify_windows)
+                    if getattr(self, 'mouse_collector', None):
+                        self.mouse_collector.add_event_listener(self.predictor.scheduler.notify_activity)
             
             if success:
                 self.is_predicting = True
@@ -495,8 +530,18 @@ class SimpleMonitor:
             return
         
         try:
-            self.logger.debug("停止连续预测...")
-            self.predictor.stop_continuous_prediction()
+            if self.streaming_pipeline is not None:
+                self.logger.debug("停止流式检测...")
+                if getattr(self, 'mouse_collector', None):
+                    self.mouse_collector.remove_event_listener(self.streaming_pipeline.submit)
+                self.streaming_pipeline.stop()
+                self.streaming_pipeline = None
+            else:
+                self.logger.debug("停止连续预测...")
+                self.feature_processor.remove_window_listener(self.predictor.scheduler.notify_windows)
+                if getattr(self, 'mouse_collector', None):
+                    self.mouse_collector.remove_event_listener(self.predictor.scheduler.notify_activity)
+                self.predictor.stop_continuous_prediction()
             self.is_predicting = False
             self.logger.info("在线预测已停止")
             print("[系统] 在线预测已停止")
@@ -507,31 +552,17 @@ class SimpleMonitor:
             self.logger.debug(f"异常详情: {traceback.format_exc()}")
 
     def retrain_model(self, user_id):
-        """重新训练模型"""
+        """提交后台重新训练任务：特征处理与训练都在子进程中进行，热键回调立即返回"""
         self.logger.info("=== 重新训练模型 ===")
         self.logger.debug(f"参数 - user_id: {user_id}")
         
         try:
             self.logger.info(f"开始重新训练用户 {user_id} 的模型")
-            
-            # 处理所有会话的特征
-            self.logger.debug("处理所有用户会话的特征...")
-            success_count = self.feature_processor.process_all_user_sessions(user_id)
-            self.logger.debug(f"成功处理 {success_count} 个会话")
-            
-            if success_count > 0:
-                # 重新训练模型
-                self.logger.debug("重新训练模型...")
-                success = self.model_trainer.train_user_model(user_id)
-                if success:
-                    self.logger.info("模型重新训练完成")
-                    print(f"[系统] 用户 {user_id} 模型重新训练完成")
-                    self.logger.debug("=== 重新训练完成 ===")
-                    return True
-            
-            self.logger.error("模型重新训练失败")
-            print(f"[系统] 用户 {user_id} 模型重新训练失败")
-            return False
+            self.training_governor.watch_collector(getattr(self, 'mouse_collector', None))
+            job = self.background_trainer.submit(user_id, process_features=True,
+                                                 callback=self._on_training_finished)
+            print(f"[系统] 用户 {user_id} 模型重新训练已在后台开始（任务 {job.job_id}）")
+            return True
             
         except Exception as e:
             self.logger.error(f"重新训练模型出错: {str(e)}")
@@ -551,6 +582,10 @@ class SimpleMonitor:
         self.logger.debug("停止预测...")
         self.stop_prediction()
         
+        # 停止后台训练
+        self.logger.debug("停止后台训练...")
+        self.background_trainer.stop()
+        
         self.logger.debug("=== 所有服务停止完成 ===")
 
     def show_system_status(self):
@@ -583,6 +618,10 @@ class SimpleMonitor:
         print(f"在线预测: {'运行中' if status['is_predicting'] else '已停止'}")
         print(f"会话ID: {status['session_id']}")
         
+        training_job = self.background_trainer.get_current_job()
+        if training_job is not None:
+            print(f"后台训练: 用户 {training_job.user_id} {training_job.stage or '启动中'} {training_job.percent}%")
+        
         if 'anomaly_stats' in status and status['anomaly_stats']:
             stats = status['anomaly_stats']
             print(f"异常统计 (24小时): {stats.get('anomaly_count', 0)}/{stats.get('total_count', 0)} ({stats.get('anomaly_rate', 0):.2f}%)")
@@ -132,6 +132,15 @@ class ConfigLoader:
         """获取系统配置"""
         return self._config.get('system', {})
 
+    def get_memory_limit_bytes(self, default='2GB'):
+        """获取 system.memory_limit 对应的字节数（支持 512MB / 2GB 或纯数字字节）"""
+        value = str(self.get_system_config().get('memory_limit', default)).strip().upper()
+        units = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4, 'B': 1}
+        for unit, factor in units.items():
+            if value.endswith(unit):
+                return int(float(value[:-len(unit)].strip()) * factor)
+        return int(float(value))
+
     def get_platform(self):
         """获取平台信息"""
         return self.get_system_config().get('platform', 'unknown')
@@ -0,0 +1,99 @@
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+
+def _fake_training_child(user_id, staging_dir, process_features, limits, result_queue):
+    """子进程：模拟训练，分阶段回报进度并把产物写入暂存目录"""
+    result_queue.put(('progress', 'train', 30))
+    (Path(staging_dir) / f"user_{user_id}_features.json").write_text('{"feature_cols": ["a"]}')
+    (Path(staging_dir) / f"user_{user_id}_model.pkl").write_bytes(b'new-model')
+    result_queue.put(('progress', 'save', 90))
+    result_queue.put(True)
+
+
+def _slow_training_child(user_id, staging_dir, process_features, limits, result_queue):
+    result_queue.put(('progress', 'train', 30))
+    time.sleep(30)
+    (Path(staging_dir) / f"user_{user_id}_model.pkl").write_bytes(b'new-model')
+    result_queue.put(True)
+
+
+class TestBackgroundTrainer(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.models_dir = Path(self.tmpdir.name) / 'models'
+        self.models_dir.mkdir()
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'system': {'max_workers': 1, 'training_governor': {'check_interval': 0.1}},
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_paths_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.get_paths',
+            return_value={'models': str(self.models_dir)}
+        )
+        self.cfg_load_patch.start()
+        self.cfg_paths_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        from src.core.model_trainer.background_trainer import BackgroundTrainer
+        self.trainer = BackgroundTrainer()
+        (self.models_dir / 'user_alice_model.pkl').write_bytes(b'old-model')
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        self.trainer.stop()
+        self.cfg_load_patch.stop()
+        self.cfg_paths_patch.stop()
+        ConfigLoader._config = None
+        self.tmpdir.cleanup()
+
+    def test_finished_job_hands_over_staged_artifacts(self):
+        from src.core.model_trainer.background_trainer import TrainingJob
+        finished = []
+        with patch('src.core.model_trainer.background_trainer._background_training_entry',
+                   _fake_training_child):
+            job = self.trainer.submit('alice', callback=finished.append)
+            self.assertTrue(self.trainer.wait(job, timeout=60))
+
+        self.assertEqual(job.state, TrainingJob.SUCCEEDED)
+        self.assertEqual((job.stage, job.percent), ('done', 100))
+        self.assertEqual(finished, [job])
+        self.assertEqual((self.models_dir / 'user_alice_model.pkl').read_bytes(), b'new-model')
+        self.assertTrue((self.models_dir / 'user_alice_features.json').exists())
+        self.assertEqual(list((self.models_dir / 'staging').iterdir()), [])
+
+    def test_cancel_keeps_existing_model(self):
+        from src.core.model_trainer.background_trainer import TrainingJob
+        with patch('src.core.model_trainer.background_trainer._background_training_entry',
+                   _slow_training_child):
+            job = self.trainer.submit('alice')
+            deadline = time.time() + 30
+            while job.stage is None and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(job.state, TrainingJob.RUNNING)
+            self.trainer.cancel(job.job_id)
+            self.assertFalse(self.trainer.wait(job, timeout=30))
+
+        self.assertEqual(job.state, TrainingJob.CANCELLED)
+        self.assertEqual((self.models_dir / 'user_alice_model.pkl').read_bytes(), b'old-model')
+
+
+if __name__ == '__main__':
+    unittest.main()
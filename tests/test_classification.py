@@ -0,0 +1,187 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+
+class TestParallelTraining(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        # 训练线程预算读自 system.max_workers
+        def _fake_load_config(self):
+            type(self)._config = {'system': {'max_workers': 2}}
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        import src.classification as classification
+        self.classification = classification
+
+        rng = np.random.default_rng(0)
+        users = np.repeat([10, 20, 30], 100)
+        self.data = pd.DataFrame(rng.normal(size=(300, 4)) + users[:, None] / 10.0,
+                                 columns=['a', 'b', 'c', 'd'])
+        self.data['user'] = users
+        self.data['session'] = np.tile(np.arange(100) // 10, 3)
+        self.data = self.data.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+
+    def test_user_splits_use_own_rows_as_positives(self):
+        c = self.classification
+        order, users, starts, ends = c.group_user_rows(self.data)
+        splits = c.build_user_splits(self.data, order, users, starts, ends)
+        sorted_users = self.data['user'].to_numpy()[order]
+
+        self.assertEqual(set(splits), {10, 20, 30})
+        for user, split in splits.items():
+            train_users = sorted_users[split['train_idx']]
+            val_users = sorted_users[split['val_idx']]
+            np.testing.assert_array_equal(train_users == user, split['y_train'] == 1)
+            np.testing.assert_array_equal(val_users == user, split['y_val'] == 1)
+            self.assertEqual(int(split['y_train'].sum()) + int(split['y_val'].sum()), 100)
+            self.assertEqual(len(np.intersect1d(split['train_idx'], split['val_idx'])), 0)
+
+    def test_parallel_training_from_shared_memory(self):
+        c = self.classification
+        # 进程数受训练线程预算约束：请求4个进程、预算2个线程时只启动2个进程；
+        # 工作进程以 spawn 启动，不 fork 已初始化OpenMP的父进程
+        spawn = c.mp.get_context('spawn')
+        with patch.object(c, 'training_thread_limit', return_value=2), \
+                patch.object(c.mp, 'get_context', return_value=spawn) as get_context, \
+                patch.object(spawn, 'Pool', wraps=spawn.Pool) as pool:
+            results, total_users = c.train_all_users_parallel(self.data, n_workers=4)
+        get_context.assert_called_once_with('spawn')
+        self.assertEqual(pool.call_args.kwargs['processes'], 2)
+        self.assertEqual(total_users, 3)
+        self.assertEqual({r['user_id'] for r in results}, {10, 20, 30})
+        for r in results:
+            self.assertGreater(r['metrics']['auc'], 0.5)
+
+    def test_cross_validation_in_worker_processes_matches_in_process(self):
+        c = self.classification
+        X = self.data[['a', 'b', 'c', 'd']].to_numpy()
+        y = (self.data['user'] == 20).to_numpy().astype(int)
+        with patch.object(c, 'training_thread_limit', return_value=2):
+            y_eval, parallel_proba, summary = c.cross_validate_arrays(
+                X, y, n_splits=3, min_parallel_cells=0, n_estimators=10
+            )
+            _, serial_proba, serial_summary = c.cross_validate_arrays(X, y, n_splits=3, n_workers=1, n_estimators=10)
+
+        self.assertEqual(summary['n_workers'], 2)
+        self.assertEqual(serial_summary['n_workers'], 1)
+        self.assertEqual(len(summary['fold_auc']), 3)
+        np.testing.assert_array_equal(y_eval, y)
+        # 折外概率与在当前进程中逐折训练一致
+        np.testing.assert_allclose(parallel_proba, serial_proba, rtol=1e-6)
+        self.assertAlmostEqual(summary['auc_mean'], np.mean(summary['fold_auc']), places=5)
+
+    def test_saved_models_carry_no_threshold(self):
+        import xgboost as xgb
+        from sklearn.preprocessing import StandardScaler
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+
+        X = self.data[['a', 'b', 'c', 'd']].to_numpy()
+        y = (self.data['user'] == 10).astype(int).to_numpy()
+        model = xgb.XGBClassifier(n_estimators=5, max_depth=2).fit(X, y)
+        result = {'user_id': 10, 'model': model, 'scaler': StandardScaler().fit(X),
+                  'feature_names': ['a', 'b', 'c', 'd'], 'metrics': {'accuracy': 1.0}}
+
+        # save_models 写入工作目录下的 models/ 与 results/
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                self.classification.save_models([result], {})
+                artifact = ModelArtifact.open(artifact_path('models', 10))
+                # 未校准的阈值不写入制品，预测时由配置决定
+                self.assertIsNone(artifact.threshold)
+                self.assertEqual(artifact.feature_cols, ['a', 'b', 'c', 'd'])
+            finally:
+                os.chdir(cwd)
+
+
+class TestSplitUserData(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        import src.classification as classification
+        self.classification = classification
+
+        # 特征列 a/b 分别复制用户与会话编号，便于从划分结果反查每行的来源；用户40只有一个会话
+        rng = np.random.default_rng(0)
+        users = np.repeat([10, 20, 30, 40], 60)
+        sessions = np.concatenate([rng.integers(0, 6, size=180) + users[:180] * 10, np.full(60, 400)])
+        self.data = pd.DataFrame({'a': users.astype(float), 'b': sessions.astype(float),
+                                  'c': rng.normal(size=240)})
+        self.data['user'] = users
+        self.data['session'] = sessions
+        self.data = self.data.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    def _legacy_split(self, user):
+        """旧版 load_and_split_data 的逐用户过滤"""
+        data = self.data
+        user_sessions = data[data['user'] == user]['session'].unique()
+        np.random.shuffle(user_sessions)
+        split_idx = int(len(user_sessions) * 0.8)
+        user_data = data[data['user'] == user].copy()
+        other_users_data = data[data['user'] != user].copy()
+        train_data = user_data[user_data['session'].isin(user_sessions[:split_idx])]
+        val_data = user_data[user_data['session'].isin(user_sessions[split_idx:])]
+        train_data = pd.concat([train_data, other_users_data.sample(n=len(train_data), random_state=42)])
+        val_data = pd.concat([val_data, other_users_data.sample(n=len(val_data), random_state=42)])
+        feature_cols = [col for col in train_data.columns if col not in ['user', 'session']]
+        return train_data[feature_cols], val_data[feature_cols]
+
+    def test_split_matches_legacy_per_user_filtering(self):
+        splits = self.classification.split_user_data(self.data)
+        # 与旧实现一样跳过只有一个会话的用户
+        self.assertEqual(set(splits), {10, 20, 30})
+
+        for user, split in splits.items():
+            legacy_train, legacy_val = self._legacy_split(user)
+            X_train, X_val = split['X_train'], split['X_val']
+            y_train, y_val = split['y_train'].to_numpy(), split['y_val'].to_numpy()
+            self.assertEqual(list(X_train.columns), list(legacy_train.columns))
+            self.assertEqual(len(X_train) + len(X_val), len(legacy_train) + len(legacy_val))
+            self.assertEqual((len(y_train), len(y_val)), (len(X_train), len(X_val)))
+
+            # 正样本覆盖该用户全部行，训练/验证会话互不重叠，且与负样本各占一半
+            positives = np.concatenate([X_train['a'][y_train == 1], X_val['a'][y_val == 1]])
+            np.testing.assert_array_equal(positives, user)
+            self.assertEqual(len(positives), int((self.data['user'] == user).sum()))
+            self.assertEqual(int(y_train.sum()) * 2, len(y_train))
+            self.assertEqual(int(y_val.sum()) * 2, len(y_val))
+            train_sessions = set(X_train['b'][y_train == 1])
+            val_sessions = set(X_val['b'][y_val == 1])
+            self.assertTrue(train_sessions and val_sessions)
+            self.assertFalse(train_sessions & val_sessions)
+
+            # 负样本全部来自其他用户
+            negatives = np.concatenate([X_train['a'][y_train == 0], X_val['a'][y_val == 0]])
+            self.assertFalse(np.any(negatives == user))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import sys
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+
+
+class TestInMemoryTraining(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        # 训练线程数读自 system.max_workers
+        def _fake_load_config(self):
+            type(self)._config = {'system': {'max_workers': 2}}
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        import src.classification as classification
+        self.classification = classification
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+
+    def test_sanitize_array_matches_dataframe_cleanup(self):
+        X = np.array([[1.0, np.nan], [np.inf, -5e7], [-np.inf, 3.0]] * 5000)
+        cleaned = self.classification.sanitize_array(X, block_rows=7)
+
+        expected = np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0).clip(-1e6, 1e6)
+        self.assertEqual(cleaned.dtype, np.float32)
+        self.assertTrue(cleaned.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(cleaned, expected.astype(np.float32))
+
+    def test_sanitize_array_uses_per_column_bounds_from_training(self):
+        c = self.classification
+        rng = np.random.default_rng(0)
+        train = rng.normal(size=(1000, 3)) * [1.0, 10.0, 100.0]
+        bounds = c.compute_clip_bounds(train, quantile=0.01)
+        np.testing.assert_allclose(bounds['upper'], np.quantile(train, 0.99, axis=0))
+
+        X = np.array([[np.nan, 1e9, -1e9], [0.5, np.inf, 1.0]])
+        cleaned, stats = c.sanitize_array(X, lower=bounds['lower'], upper=bounds['upper'], report=True)
+        expected = np.clip(np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0), bounds['lower'], bounds['upper'])
+        np.testing.assert_allclose(cleaned, expected.astype(np.float32))
+        self.assertEqual(stats['nonfinite'].tolist(), [1, 1, 0])
+        self.assertEqual(stats['clipped'].tolist(), [0, 1, 1])
+
+    def test_clip_bounds_ignore_non_finite_values(self):
+        c = self.classification
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(500, 3))
+        dirty = X.copy()
+        dirty[::7, 0] = np.nan
+        dirty[::11, 1] = np.inf
+        dirty[:, 2] = -np.inf
+
+        bounds = c.compute_clip_bounds(dirty, quantile=0.01)
+        finite = X[np.arange(500) % 7 != 0, 0]
+        self.assertAlmostEqual(bounds['lower'][0], np.quantile(finite, 0.01))
+        self.assertAlmostEqual(bounds['upper'][1], np.quantile(X[np.arange(500) % 11 != 0, 1], 0.99))
+        # 没有有限值的列边界为0
+        self.assertEqual((bounds['lower'][2], bounds['upper'][2]), (0.0, 0.0))
+        self.assertEqual(c.compute_clip_bounds(dirty, quantile=0)['upper'][0], finite.max())
+
+    def test_train_model_arrays_drops_duplicates_and_keeps_names(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, 3))
+        y = (X[:, 0] > 0).astype(int)
+        X = np.vstack([X, X[:10]])
+        y = np.concatenate([y, y[:10]])
+
+        model, X_clean, y_clean = self.classification.train_model_arrays(
+            X, y, ['a', 'b', 'c'], n_estimators=5
+        )
+        self.assertIsNotNone(model)
+        self.assertEqual(len(X_clean), 200)
+        self.assertEqual(len(y_clean), 200)
+        self.assertEqual(list(model.get_booster().feature_names), ['a', 'b', 'c'])
+        # 未指定 n_jobs 时使用训练线程预算
+        self.assertEqual(model.get_params()['n_jobs'], self.classification.training_thread_limit())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import json
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+
+class TestCompiledEnsemble(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(500, 6)).astype(np.float32)
+        self.y = (self.X[:, 0] + self.X[:, 1] * self.X[:, 2] > 0).astype(int)
+        self.X_test = rng.normal(size=(300, 6)).astype(np.float32)
+        self.X_test[rng.random(self.X_test.shape) < 0.1] = np.nan
+        self.X_test[:, 3] = 0
+
+    def test_matches_predict_proba(self):
+        import xgboost as xgb
+        from src.core.model_trainer.compiled_ensemble import CompiledEnsemble
+
+        models = [
+            xgb.XGBClassifier(n_estimators=30, max_depth=4),
+            # 训练数据中0表示缺失、叶子更深的 lossguide 树
+            xgb.XGBClassifier(n_estimators=20, max_depth=0, max_leaves=32, grow_policy='lossguide', missing=0),
+            xgb.XGBClassifier(n_estimators=100, max_depth=2, learning_rate=0.5, early_stopping_rounds=3),
+        ]
+        for model in models:
+            fit_kwargs = {}
+            if model.early_stopping_rounds:
+                fit_kwargs = {'eval_set': [(self.X[:100], self.y[:100])], 'verbose': False}
+            model.fit(self.X, self.y, **fit_kwargs)
+
+            compiled = CompiledEnsemble.from_bytes(CompiledEnsemble.from_model(model).to_bytes())
+            np.testing.assert_allclose(compiled.predict_proba(self.X_test), model.predict_proba(self.X_test),
+                                       atol=1e-6)
+            np.testing.assert_array_equal(compiled.predict(self.X_test), model.predict(self.X_test))
+
+    def test_unsupported_objective_is_rejected(self):
+        import xgboost as xgb
+        from src.core.model_trainer.compiled_ensemble import CompiledEnsemble
+
+        model = xgb.XGBClassifier(n_estimators=5, objective='multi:softprob')
+        model.fit(self.X, self.X[:, 0].argsort().argsort() % 3)
+        with self.assertRaises(ValueError):
+            CompiledEnsemble.from_model(model)
+
+    def test_monitoring_process_scores_without_xgboost(self):
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+
+        model = xgb.XGBClassifier(n_estimators=20, max_depth=3)
+        model.fit(self.X, self.y)
+        project_root = Path(__file__).resolve().parents[1]
+        with tempfile.TemporaryDirectory() as tmp:
+            ModelArtifact.write(artifact_path(tmp, 'alice'), model, [f'f{i}' for i in range(6)])
+            np.save(Path(tmp) / 'X.npy', self.X_test)
+            # 新进程中导入预测器并经模型缓存的编译树集成评分，全程不应加载 xgboost/sklearn
+            script = textwrap.dedent(f'''
+                import json, sys
+                sys.path.insert(0, {str(project_root)!r})
+                import numpy as np
+                import src.core.predictor.simple_predictor
+                from src.core.predictor.model_cache import ModelCache
+                from src.core.model_trainer.sanitize import sanitize_array
+                entry = ModelCache({tmp!r}).get('alice')
+                X = np.load({str(Path(tmp) / 'X.npy')!r})
+                proba = entry.compiled.predict_proba(X)
+                print(json.dumps({{
+                    'loaded': [name for name in ('xgboost', 'sklearn', 'src.classification', 'src.predict')
+                               if name in sys.modules],
+                    'proba': proba[:, 1].tolist(),
+                }}))
+            ''')
+            result = subprocess.run([sys.executable, '-c', script], cwd=str(project_root),
+                                    capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        output = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertEqual(output['loaded'], [])
+        np.testing.assert_allclose(output['proba'], model.predict_proba(self.X_test)[:, 1], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import sys
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+
+class TestFeatureSketch(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / 'mouse_data.db'
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'paths': {},
+                'model_training': {'feature_sketch': {'relative_accuracy': 0.01}},
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        from src.core.model_trainer import feature_sketch
+        self.fs = feature_sketch
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def test_quantiles_within_relative_accuracy_and_merge_is_order_free(self):
+        values = np.concatenate([self.rng.lognormal(size=20000), -self.rng.exponential(size=5000), np.zeros(100)])
+        whole = self.fs.QuantileSketch(0.01)
+        whole.add(values)
+        parts = [self.fs.QuantileSketch(0.01) for _ in range(4)]
+        for part, chunk in zip(parts, np.array_split(self.rng.permutation(values), 4)):
+            part.add(chunk)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(self.fs.QuantileSketch.from_dict(json.loads(json.dumps(part.to_dict()))))
+
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+        for q in (0.001, 0.1, 0.5, 0.9, 0.999):
+            exact = np.quantile(values, q, method='lower')
+            self.assertLessEqual(abs(whole.quantile(q) - exact), 0.0101 * abs(exact) + 1e-12)
+
+    def test_store_maintained_on_write_gives_clip_bounds(self):
+        store = self.fs.FeatureSketchStore(self.db_path)
+        frames = {}
+        for user, scale in (('alice', 1.0), ('bob', 10.0)):
+            frames[user] = pd.DataFrame({'a': self.rng.normal(size=500) * scale, 'b': self.rng.uniform(size=500)})
+            rows = [(i, user, json.dumps(vector)) for i, vector in enumerate(frames[user].to_dict('records'))]
+            store.add_samples(rows[:200])
+            store.add_samples(rows[200:])
+
+        bounds = store.clip_bounds(['a', 'b'], quantile=0.01)
+        everything = pd.concat(frames.values())
+        for i, col in enumerate(['a', 'b']):
+            exact = np.quantile(everything[col], [0.01, 0.99], method='lower')
+            np.testing.assert_allclose([bounds['lower'][i], bounds['upper'][i]], exact, rtol=0.0101)
+
+        self.assertIsNone(store.clip_bounds(['a', 'missing']))
+        store.remove_sources(['bob'])
+        self.assertEqual(store.merged(['a'])['a'].count, 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
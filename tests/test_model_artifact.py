@@ -0,0 +1,83 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+
+class TestModelArtifact(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        import xgboost as xgb
+        from sklearn.preprocessing import StandardScaler
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmpdir.name) / 'user_alice_model.ubm'
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(200, 3))
+        y = (self.X[:, 0] > 0).astype(int)
+        self.scaler = StandardScaler().fit(self.X)
+        self.model = xgb.XGBClassifier(n_estimators=10, max_depth=3, missing=0, random_state=42)
+        self.model.fit(self.scaler.transform(self.X), y)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_round_trip_is_lazy_and_matches_predictions(self):
+        from src.core.model_trainer.model_artifact import ModelArtifact
+        ModelArtifact.write(self.path, self.model, ['a', 'b', 'c'], scaler=self.scaler, threshold=0.7)
+
+        artifact = ModelArtifact.open(self.path)
+        self.assertEqual(artifact['feature_names'], ['a', 'b', 'c'])
+        self.assertEqual(artifact.threshold, 0.7)
+        self.assertEqual(artifact.header['booster_format'], 'ubj')
+        self.assertIsNone(artifact._model)
+
+        X_scaled = artifact['scaler'].transform(self.X)
+        np.testing.assert_allclose(X_scaled, self.scaler.transform(self.X))
+        np.testing.assert_allclose(
+            artifact['model'].predict_proba(X_scaled), self.model.predict_proba(X_scaled), rtol=1e-6
+        )
+        self.assertEqual(artifact.model.get_params()['max_depth'], 3)
+
+    def test_json_fallback_without_ubj_support(self):
+        import xgboost as xgb
+        from unittest.mock import patch
+        from src.core.model_trainer.model_artifact import ModelArtifact
+
+        # xgboost<1.6 的 save_raw 不接受 raw_format：以JSON保存原生模型并记录格式，不导出编译段
+        with patch.object(xgb.Booster, 'save_raw', side_effect=TypeError("unexpected keyword argument 'raw_format'")):
+            ModelArtifact.write(self.path, self.model, ['a', 'b', 'c'], scaler=self.scaler)
+
+        artifact = ModelArtifact.open(self.path)
+        self.assertEqual(artifact.header['booster_format'], 'json')
+        self.assertIsNone(artifact.compiled)
+        X_scaled = self.scaler.transform(self.X)
+        np.testing.assert_allclose(
+            artifact.model.predict_proba(X_scaled), self.model.predict_proba(X_scaled), rtol=1e-6
+        )
+
+    def test_corruption_is_detected(self):
+        from src.core.model_trainer.model_artifact import ModelArtifact
+        ModelArtifact.write(self.path, self.model, ['a', 'b', 'c'])
+        original = self.path.read_bytes()
+        artifact = ModelArtifact.open(self.path)
+        booster_end = artifact.booster_offset + artifact.header['booster_size']
+
+        # 原生模型段与末尾的编译段分别由各自的SHA-256保护
+        for offset in (booster_end - 10, len(original) - 10):
+            data = bytearray(original)
+            data[offset] ^= 0xFF
+            self.path.write_bytes(bytes(data))
+            artifact = ModelArtifact.open(self.path)
+            with self.assertRaises(ValueError):
+                artifact.model if offset < booster_end else artifact.compiled
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.models_dir = Path(self.tmpdir.name)
+
+        def _fake_load_config(self):
+            type(self)._config = {'paths': {}}
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        from src.core.predictor.model_cache import ModelCache
+        self.cache = ModelCache(self.models_dir)
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _write_model(self, n_estimators):
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+        X = self.rng.normal(size=(200, 3))
+        model = xgb.XGBClassifier(n_estimators=n_estimators, max_depth=2)
+        model.fit(X, (X[:, 0] > 0).astype(int))
+        path = artifact_path(self.models_dir, 'alice')
+        ModelArtifact.write(path, model, ['a', 'b', 'timestamp', 'c'], threshold=0.4,
+                            clip_bounds={'lower': [-1, -2, -3], 'upper': [1, 2, 3]})
+        return path
+
+    def test_reload_only_when_model_content_changes(self):
+        self.assertIsNone(self.cache.get('alice'))
+        path = self._write_model(5)
+        entry = self.cache.get('alice')
+        self.assertEqual(entry.feature_cols, ['a', 'b', 'c'])
+        self.assertEqual(entry.threshold, 0.4)
+        np.testing.assert_array_equal(entry.clip_upper, [1, 2, 3])
+        self.assertIs(self.cache.get('alice'), entry)
+        # 有编译树集成时 XGBoost 模型延迟到首次访问才解码
+        from src.core.model_trainer.model_artifact import ModelArtifact
+        self.assertIsNotNone(entry.compiled)
+        self.assertIsInstance(entry._model, ModelArtifact)
+        X = self.rng.normal(size=(4, 3)).astype(np.float32)
+        np.testing.assert_allclose(entry.compiled.predict_proba(X), entry.model.predict_proba(X), atol=1e-6)
+
+        # 只改变修改时间、内容不变：沿用已加载的模型
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertIs(self.cache.get('alice').model, entry.model)
+        self.assertEqual(self.cache.reloads, 0)
+
+        # 新模型原子替换后重新加载
+        self._write_model(7)
+        reloaded = self.cache.get('alice')
+        self.assertIsNot(reloaded, entry)
+        self.assertEqual(reloaded.model.get_booster().num_boosted_rounds(), 7)
+        self.assertEqual(self.cache.get_stats(), {'models': 1, 'hits': 2, 'misses': 1, 'reloads': 1})
+
+        os.remove(path)
+        self.assertIsNone(self.cache.get('alice'))
+
+
+if __name__ == '__main__':
+    unittest.main()
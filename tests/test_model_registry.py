@@ -0,0 +1,114 @@
+import os
+import pickle
+import sys
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.models_dir = Path(self.tmpdir.name) / 'models'
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'paths': {},
+                'prediction': {'model_registry': {'max_models': 2, 'preload_recent': 2}},
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, 2))
+        self.model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        self.model.fit(X, (X[:, 0] > 0).astype(int))
+        for user in ('alice', 'bob', 'carol'):
+            ModelArtifact.write(artifact_path(self.models_dir, user), self.model, ['f0', 'f1'], threshold=0.5)
+        # 旧版三文件 pickle 模型
+        for suffix, obj in (('model', self.model), ('scaler', None), ('features', ['f0', 'f1'])):
+            with open(self.models_dir / f'user_dave_{suffix}.pkl', 'wb') as f:
+                pickle.dump(obj, f)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def test_lazy_lru_loading_with_metrics(self):
+        from src.core.predictor.model_registry import ModelRegistry
+
+        registry = ModelRegistry(self.models_dir)
+        # 列出用户不加载模型
+        self.assertEqual(list(registry), ['user_alice', 'user_bob', 'user_carol', 'user_dave'])
+        self.assertIn('alice', registry)
+        self.assertNotIn('eve', registry)
+        self.assertEqual(registry.get_stats()['models'], 0)
+
+        self.assertEqual(list(registry['alice']['feature_names']), ['f0', 'f1'])
+        self.assertIs(registry.get('user_alice'), registry.get('alice'))
+        self.assertEqual(registry['dave']['feature_names'], ['f0', 'f1'])
+        self.assertIsNone(registry.get('eve'))
+
+        # 容量为 2：加载 bob 时淘汰最久未使用的 alice
+        registry.get('bob')
+        self.assertEqual(list(registry._entries), ['user_dave', 'user_bob'])
+        stats = registry.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 3, 1))
+
+        # 模型文件变化时重新加载
+        path = self.models_dir / 'user_bob_model.ubm'
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns + 10 ** 9))
+        registry.get('bob')
+        self.assertEqual(registry.get_stats()['reloads'], 1)
+
+        # 内存上限：只容纳一个模型
+        small = ModelRegistry(self.models_dir, max_memory_bytes=path.stat().st_size)
+        small.get('alice')
+        small.get('bob')
+        self.assertEqual(list(small._entries), ['user_bob'])
+
+    def test_preload_recent_users(self):
+        from src.core.database.schema_migrations import ensure_schema
+        from src.core.predictor.model_registry import ModelRegistry
+
+        db_path = Path(self.tmpdir.name) / 'mouse_data.db'
+        ensure_schema(db_path)
+        now = time.time()
+        conn = sqlite3.connect(str(db_path))
+        conn.executemany(
+            'INSERT INTO prediction_watermarks (user_id, last_feature_id, last_timestamp, updated_at) VALUES (?, 0, 0, ?)',
+            [('alice', now - 60), ('bob', now - 10), ('carol', now - 3 * 86400), ('eve', now)]
+        )
+        conn.commit()
+        conn.close()
+
+        registry = ModelRegistry(self.models_dir)
+        # eve 没有模型，carol 超出最近活跃时间范围；最近活跃的 bob 位于LRU最新端
+        self.assertEqual(registry.preload_recent(db_path, limit=3), 2)
+        self.assertEqual(list(registry._entries), ['user_alice', 'user_bob'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+
+class TestNegativeSamplePool(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / 'mouse_data.db'
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'paths': {},
+                'model_training': {
+                    'negative_pool': {'per_user_size': 5, 'max_size': 8, 'random_state': 0}
+                },
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        # 单例可能已被其它测试初始化，强制按本测试配置重新加载
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        from src.core.model_trainer.negative_sample_pool import NegativeSamplePool
+        self.pool = NegativeSamplePool(self.db_path)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _rows(self, user_id, n, start_id=0):
+        return [(start_id + i, user_id, json.dumps({'user': user_id.strip(), 'f': i})) for i in range(n)]
+
+    def test_reservoir_caps_each_source_user(self):
+        self.pool.add_samples(self._rows('alice', 50))
+        self.pool.add_samples(self._rows(' bob ', 3, start_id=100))
+
+        conn = sqlite3.connect(str(self.db_path))
+        counts = dict(conn.execute(
+            'SELECT source_user_id, COUNT(*) FROM negative_pool GROUP BY source_user_id'
+        ).fetchall())
+        seen = dict(conn.execute('SELECT source_user_id, seen_count FROM negative_pool_stats').fetchall())
+        conn.close()
+
+        self.assertEqual(counts, {'alice': 5, 'bob': 3})
+        self.assertEqual(seen, {'alice': 50, 'bob': 3})
+        self.assertGreater(self.pool.get_version(), 0)
+
+    def test_load_excludes_user_and_respects_cap(self):
+        for user in ('u1', 'u2', 'u3'):
+            self.pool.add_samples(self._rows(user, 10))
+
+        df = self.pool.load_negative_samples('u1 ', limit=None)
+        # max_size=8，两个来源用户各取 ceil(8/2)=4 个槽位
+        self.assertEqual(len(df), 8)
+
+        users = {json.loads(v)['user'] for v in df['feature_vector']}
+        self.assertEqual(users, {'u2', 'u3'})
+
+    def _assert_uniform_reads(self, read):
+        import random
+        self.pool.per_user_size = 20
+
+        # 每轮重建一个 100 个窗口的蓄水池并读取 2 条：均匀样本取到最早 2 个窗口的期望为 2 * 2/100，
+        # 若按槽位号读取，槽位 0、1 以 20/100 的概率仍保留最早的窗口，期望为 2 * 20/100
+        early, picked = 0, []
+        for trial in range(200):
+            self.pool.remove_sources(['%'])
+            self.pool._rng = random.Random(trial)
+            self.pool.add_samples(self._rows('u2', 100))
+            windows = read()
+            self.assertEqual(len(windows), 2)
+            early += sum(f < 2 for f in windows)
+            picked.extend(windows)
+
+        self.assertLess(early, 30)
+        # 读取覆盖整个数据流：前后两半的窗口各约占一半
+        late = sum(f >= 50 for f in picked)
+        self.assertGreater(late, 0.4 * len(picked))
+        self.assertLess(late, 0.6 * len(picked))
+
+    def test_load_is_uniform_across_the_stream(self):
+        def read():
+            df = self.pool.load_negative_samples('u1', limit=2)
+            return [json.loads(v)['f'] for v in df['feature_vector']]
+        self._assert_uniform_reads(read)
+
+    def test_matrix_cache_is_uniform_across_the_stream(self):
+        from src.core.model_trainer.negative_matrix_cache import NegativeMatrixCache
+        cache = NegativeMatrixCache(self.pool, cache_dir=Path(self.tmpdir.name) / 'cache')
+
+        def read():
+            return cache.get_negative_samples('u1', limit=2)['f'].astype(int).tolist()
+        self._assert_uniform_reads(read)
+
+    def test_remove_sources_bumps_version(self):
+        self.pool.add_samples(self._rows('training_user_1', 4))
+        version = self.pool.get_version()
+        removed = self.pool.remove_sources(['training_user%'])
+        self.assertEqual(removed, 4)
+        self.assertGreater(self.pool.get_version(), version)
+        self.assertTrue(self.pool.is_empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class TestBatchPrediction(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        try:
+            import src.predict as predict
+        except ImportError as e:
+            self.skipTest(f"predict模块依赖不可用: {e}")
+        self.predict = predict
+
+        import xgboost as xgb
+        from sklearn.preprocessing import StandardScaler
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(300, 3))
+        y = (X[:, 0] + X[:, 1] > 0).astype(int)
+        scaler = StandardScaler().fit(X)
+        model = xgb.XGBClassifier(n_estimators=10, max_depth=3, random_state=42)
+        model.fit(scaler.transform(X), y)
+        self.model_info = {'alice': {'model': model, 'scaler': scaler, 'feature_names': ['a', 'b', 'c']}}
+
+        # 列顺序与训练不同、含多余列、缺失列（c）与缺失值
+        self.features = pd.DataFrame({
+            'b': rng.normal(size=25),
+            'extra': rng.normal(size=25),
+            'a': rng.normal(size=25),
+        })
+        self.features.loc[::4, 'a'] = np.nan
+
+    def test_batch_matches_row_by_row_predict_anomaly(self):
+        batch = self.predict.predict_anomaly_batch('alice', self.features, self.model_info)
+        self.assertIsNotNone(batch)
+        self.assertEqual(len(batch['anomaly_score']), len(self.features))
+
+        for i in range(len(self.features)):
+            single = self.predict.predict_anomaly('alice', self.features.iloc[[i]], self.model_info)
+            self.assertEqual(batch['prediction'][i], single['prediction'])
+            self.assertAlmostEqual(float(batch['anomaly_score'][i]), float(single['anomaly_score']), places=6)
+
+        self.assertIsNone(self.predict.predict_anomaly_batch('bob', self.features, self.model_info))
+
+    def test_batch_and_rows_clip_to_stored_bounds(self):
+        # 训练时保存的逐列边界：b 列的越界值应与边界值得到相同的分数
+        self.model_info['alice']['clip_bounds'] = {'lower': [-1.0, -1.0, -1.0], 'upper': [1.0, 1.0, 1.0]}
+        features = self.features.copy()
+        features.loc[::3, 'b'] = 50.0
+        features.loc[1::3, 'b'] = -np.inf
+        clipped = features.copy()
+        clipped['b'] = clipped['b'].replace(-np.inf, 0).clip(-1, 1)
+        clipped['a'] = clipped['a'].fillna(0).clip(-1, 1)
+
+        batch = self.predict.predict_anomaly_batch('alice', features, self.model_info)
+        expected = self.predict.predict_anomaly_batch('alice', clipped, self.model_info)
+        np.testing.assert_allclose(batch['anomaly_score'], expected['anomaly_score'], atol=1e-6)
+
+        for i in range(len(features)):
+            single = self.predict.predict_anomaly('alice', features.iloc[[i]], self.model_info)
+            self.assertEqual(batch['prediction'][i], single['prediction'])
+            self.assertAlmostEqual(float(batch['anomaly_score'][i]), float(single['anomaly_score']), places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import pandas as pd
+
+
+class TestAdaptivePredictionScheduler(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmpdir.name) / 'data'
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'paths': {},
+                'prediction': {'interval': 4,
+                               'scheduler': {'min_interval': 1, 'max_interval': 16, 'backoff_factor': 2,
+                                             'tighten_anomaly_score': 0.8, 'activity_window': 60}},
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_paths_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.get_paths',
+            return_value={'models': str(Path(self.tmpdir.name) / 'models'), 'data': str(self.data_dir)}
+        )
+        self.cfg_load_patch.start()
+        self.cfg_paths_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_paths_patch.stop()
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def test_backoff_tighten_and_activity(self):
+        from src.core.predictor.prediction_scheduler import AdaptivePredictionScheduler
+
+        scheduler = AdaptivePredictionScheduler()
+        # 基准间隔取自 prediction.interval
+        self.assertEqual(scheduler.interval, 4)
+
+        # 空闲时指数退避到上限
+        self.assertEqual([scheduler.record_cycle(0) for _ in range(4)], [8, 16, 16, 16])
+
+        # 用户恢复活动：回到基准间隔并唤醒
+        scheduler.notify_activity({'event_type': 'move', 'x': 10, 'y': 20})
+        self.assertEqual(scheduler.interval, 4)
+        self.assertEqual(scheduler.wait(), 'activity')
+
+        # 异常分数升高时收紧到最小间隔，之后逐步放宽到基准间隔
+        self.assertEqual(scheduler.record_cycle(3, max_anomaly_score=0.9), 1)
+        self.assertEqual([scheduler.record_cycle(2, max_anomaly_score=0.1) for _ in range(3)], [2, 4, 4])
+
+    def test_stationary_polling_moves_do_not_block_backoff(self):
+        from src.core.predictor.prediction_scheduler import AdaptivePredictionScheduler
+
+        scheduler = AdaptivePredictionScheduler()
+        scheduler.notify_activity({'event_type': 'move', 'x': 10, 'y': 20})
+        scheduler.last_activity = time.time() - 120
+
+        # 采集器轮询发出的同一位置 move 事件不算活动，间隔照常退避
+        for _ in range(5):
+            scheduler.notify_activity({'event_type': 'move', 'x': 10, 'y': 20})
+        self.assertFalse(scheduler.is_active())
+        self.assertEqual([scheduler.record_cycle(0) for _ in range(3)], [8, 16, 16])
+
+        # 位置变化或点击才恢复活跃
+        scheduler.notify_activity({'event_type': 'move', 'x': 11, 'y': 20})
+        self.assertTrue(scheduler.is_active())
+        self.assertEqual(scheduler.interval, 4)
+        scheduler.last_activity = None
+        scheduler.notify_activity({'event_type': 'click', 'x': 11, 'y': 20})
+        self.assertTrue(scheduler.is_active())
+
+    def test_saved_windows_wake_waiting_loop(self):
+        from src.core.feature_engineer.simple_feature_processor import SimpleFeatureProcessor
+        from src.core.predictor.prediction_scheduler import AdaptivePredictionScheduler
+
+        scheduler = AdaptivePredictionScheduler(base_interval=16)
+        processor = SimpleFeatureProcessor()
+        processor.add_window_listener(scheduler.notify_windows)
+
+        result = {}
+        def wait():
+            start = time.time()
+            result['reason'] = scheduler.wait()
+            result['elapsed'] = time.time() - start
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.1)
+        self.assertTrue(processor.save_features_to_db(pd.DataFrame({'velocity_mean': [1.0, 2.0]}), 'alice', 's1'))
+        waiter.join(timeout=5)
+
+        self.assertEqual(result['reason'], 'window')
+        self.assertLess(result['elapsed'], 5)
+        self.assertEqual(scheduler.get_stats()['wakeups']['window'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import sys
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmpdir.name) / 'mouse_data.db'
+
+        def _fake_load_config(self):
+            type(self)._config = {'paths': {}}
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+
+        import src.core.database.schema_migrations as sm
+        self.sm = sm
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _index_names(self):
+        conn = sqlite3.connect(str(self.db_path))
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        conn.close()
+        return names
+
+    def test_upgrade_legacy_database(self):
+        # 旧版采集器创建的库：无版本号、无复合索引、用户ID带空白
+        conn = sqlite3.connect(str(self.db_path))
+        conn.execute('''
+            CREATE TABLE features (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                timestamp REAL NOT NULL,
+                feature_vector TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('CREATE INDEX idx_features_user ON features(user_id)')
+        conn.execute("INSERT INTO features (user_id, session_id, timestamp, feature_vector) VALUES (' alice ', 's', 1.0, '{}')")
+        conn.commit()
+        conn.close()
+
+        migrator = self.sm.SchemaMigrator(self.db_path)
+        self.assertEqual(migrator.migrate(), self.sm.SCHEMA_VERSION)
+        # 再次执行为空操作
+        self.assertEqual(migrator.migrate(), self.sm.SCHEMA_VERSION)
+        self.assertEqual(migrator.get_version(), self.sm.SCHEMA_VERSION)
+
+        indexes = self._index_names()
+        self.assertIn('idx_features_user_timestamp', indexes)
+        self.assertIn('idx_predictions_user_timestamp', indexes)
+        self.assertNotIn('idx_features_user', indexes)
+
+        conn = sqlite3.connect(str(self.db_path))
+        user_ids = [r[0] for r in conn.execute('SELECT user_id FROM features')]
+        conn.close()
+        self.assertEqual(user_ids, ['alice'])
+
+    def test_hot_queries_use_indexes(self):
+        migrator = self.sm.SchemaMigrator(self.db_path)
+        migrator.migrate()
+        for name, (ok, detail) in migrator.check_query_plans().items():
+            self.assertTrue(ok, f"{name}: {detail}")
+
+    def test_expected_index_is_matched_exactly(self):
+        migrator = self.sm.SchemaMigrator(self.db_path)
+        migrator.migrate()
+        # 已被迁移删除的 idx_features_user 不能靠前缀命中 idx_features_user_timestamp
+        hot_queries = {
+            'features_by_user': (self.sm.HOT_QUERIES['features_by_user'][0], ('user',), 'idx_features_user'),
+        }
+        with patch.object(self.sm, 'HOT_QUERIES', hot_queries):
+            ok, detail = migrator.check_query_plans()['features_by_user']
+        self.assertFalse(ok, detail)
+        self.assertIn('idx_features_user_timestamp', detail)
+
+    def test_user_id_normalized_on_write(self):
+        self.sm.ensure_schema(self.db_path)
+        data_dir = Path(self.tmpdir.name)
+        with patch('src.utils.config.config_loader.ConfigLoader.get_paths',
+                   return_value={'models': str(data_dir / 'models'), 'data': str(data_dir),
+                                 'database': str(self.db_path)}):
+            import pandas as pd
+            from src.core.feature_engineer.simple_feature_processor import SimpleFeatureProcessor
+            from src.core.predictor.simple_predictor import SimplePredictor
+
+            processor = SimpleFeatureProcessor()
+            self.assertTrue(processor.save_features_to_db(pd.DataFrame({'velocity_mean': [1.0, 2.0]}), ' alice ', 's1'))
+            predictor = SimplePredictor()
+            predictor.save_predictions_to_db(' alice\t', [{
+                'timestamp': 1.0, 'prediction': 1, 'anomaly_score': 0.1, 'is_normal': True, 'probability': 0.9,
+            }])
+
+        # 查询直接比较 user_id，无需 TRIM()
+        conn = sqlite3.connect(str(self.db_path))
+        features = conn.execute('SELECT COUNT(*) FROM features WHERE user_id = ?', ('alice',)).fetchone()[0]
+        predictions = conn.execute('SELECT COUNT(*) FROM predictions WHERE user_id = ?', ('alice',)).fetchone()[0]
+        pool = conn.execute('SELECT DISTINCT source_user_id FROM negative_pool').fetchall()
+        conn.close()
+        self.assertEqual(features, 2)
+        self.assertEqual(predictions, 1)
+        self.assertEqual(pool, [('alice',)])
+
+    def test_suspend_and_restore_indexes(self):
+        self.sm.ensure_schema(self.db_path)
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+        before = self._index_names()
+        saved = self.sm.suspend_indexes(cursor, 'features')
+        self.assertFalse(any(name.startswith('idx_features') for name in self._index_names()))
+        self.sm.restore_indexes(cursor, saved)
+        self.sm.restore_indexes(cursor, saved)
+        conn.commit()
+        conn.close()
+        self.assertEqual(self._index_names(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
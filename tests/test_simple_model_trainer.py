@@ -0,0 +1,358 @@
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+
+
+class TrainerTestBase(unittest.TestCase):
+    """三个用户各120个特征窗口的训练器夹具；子类通过 model_training_config 调整训练配置"""
+
+    def model_training_config(self):
+        return {
+            'retrain_threshold': 0.6,
+            'incremental': {'max_extra_rounds': 5, 'min_new_samples': 5, 'drift_threshold': 3.0},
+        }
+
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmpdir.name) / 'data'
+        self.models_dir = Path(self.tmpdir.name) / 'models'
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.data_dir / 'mouse_data.db'
+
+        model_training = self.model_training_config()
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'paths': {},
+                'model_training': model_training,
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_paths_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.get_paths',
+            return_value={
+                'models': str(self.models_dir),
+                'data': str(self.data_dir),
+                'logs': str(Path(self.tmpdir.name) / 'logs'),
+                'database': str(self.db_path),
+            }
+        )
+        self.cfg_load_patch.start()
+        self.cfg_paths_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
+        self.trainer = SimpleModelTrainer()
+        self.rng = np.random.default_rng(0)
+        for user, offset in (('alice', 0.0), ('bob', 2.0), ('carol', -2.0)):
+            self._insert(user, 120, offset, start_ts=1000.0)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_paths_patch.stop()
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _insert(self, user, n, offset, start_ts):
+        rows = []
+        for i in range(n):
+            vector = {f'f{j}': float(v) for j, v in enumerate(self.rng.normal(offset, 1.0, size=4))}
+            rows.append((user, 's1', start_ts + i, json.dumps(vector)))
+        conn = sqlite3.connect(str(self.db_path))
+        cursor = conn.cursor()
+        cursor.executemany(
+            'INSERT INTO features (user_id, session_id, timestamp, feature_vector) VALUES (?, ?, ?, ?)', rows
+        )
+        self.trainer.negative_pool.add_samples(
+            [(None, user, vector) for user, _, _, vector in rows], conn=conn
+        )
+        conn.commit()
+        conn.close()
+
+    def _feature_info(self):
+        with open(self.models_dir / 'user_alice_features.json') as f:
+            return json.load(f)
+
+
+class TestIncrementalTraining(TrainerTestBase):
+    def test_incremental_update_appends_rounds_and_moves_watermark(self):
+        self.assertTrue(self.trainer.train_user_model('alice'))
+        info = self._feature_info()
+        self.assertEqual(info['update_type'], 'full')
+        self.assertEqual(info['watermark'], 1119.0)
+
+        self._insert('alice', 20, 0.0, start_ts=5000.0)
+        self.assertTrue(self.trainer.train_user_model('alice'))
+        updated = self._feature_info()
+        self.assertEqual(updated['update_type'], 'incremental')
+        self.assertEqual(updated['n_rounds'], info['n_rounds'] + 5)
+        self.assertEqual(updated['watermark'], 5019.0)
+        # 训练时的逐列裁剪边界写入制品头部，增量更新沿用同一边界
+        self.assertEqual(len(info['clip_bounds']['lower']), 4)
+        self.assertEqual(updated['clip_bounds'], info['clip_bounds'])
+        self.assertEqual(self.trainer.get_clip_bounds('alice'), info['clip_bounds'])
+
+    def test_too_few_new_windows_falls_back_to_full_retrain(self):
+        self.assertTrue(self.trainer.train_user_model('alice'))
+        info = self._feature_info()
+        self._insert('alice', 2, 0.0, start_ts=5000.0)
+        self.assertTrue(self.trainer.train_user_model('alice'))
+        retrained = self._feature_info()
+        # 新窗口不足以增量更新时仍然重新训练，而不是保留旧模型报告成功
+        self.assertEqual(retrained['update_type'], 'full')
+        self.assertEqual(retrained['watermark'], 5001.0)
+        self.assertNotEqual(retrained['trained_at'], info['trained_at'])
+
+    def test_drift_falls_back_to_full_retrain(self):
+        self.assertTrue(self.trainer.train_user_model('alice'))
+        self._insert('alice', 20, 25.0, start_ts=5000.0)
+        self.assertTrue(self.trainer.train_user_model('alice'))
+        self.assertEqual(self._feature_info()['update_type'], 'full')
+
+
+class TestNegativeMatrixCache(TrainerTestBase):
+    def test_negative_cache_shared_across_users_and_versions(self):
+        cache = self.trainer.negative_cache
+        negatives = cache.get_negative_samples('alice')
+        self.assertEqual(len(negatives), 240)
+        matrix, version = cache.matrix, cache.version
+
+        self.assertEqual(len(cache.get_negative_samples('bob')), 240)
+        self.assertIs(cache.matrix, matrix)
+        cols = ['f0', 'f1', 'f2', 'f3']
+        bounds = self.trainer.feature_sketches.clip_bounds(cols, self.trainer.clip_quantile)
+        ref = cache.get_reference(cols, bounds)
+        self.assertIsNotNone(ref)
+        self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        self.assertTrue(self.trainer.train_user_model('bob', incremental=False))
+        self.assertIs(cache.get_reference(cols, bounds), ref)
+
+        # 负样本池变化后版本递增，缓存重新加载并清理旧文件
+        self._insert('dave', 10, 1.0, start_ts=1000.0)
+        self.assertEqual(len(cache.get_negative_samples('alice')), 250)
+        self.assertGreater(cache.version, version)
+        cache_files = list((self.models_dir / 'cache').glob('negative_pool_v*.npz'))
+        self.assertEqual([p.name for p in cache_files], [f'negative_pool_v{cache.version}.npz'])
+
+    def test_reference_is_binned_on_training_clip_bounds(self):
+        cache = self.trainer.negative_cache
+        cache.refresh()
+        cols = ['f0', 'f1', 'f2', 'f3']
+        bounds = {'lower': [-0.5] * 4, 'upper': [0.5] * 4}
+
+        # 分箱参考与训练矩阵同样按逐列边界清洗，切分点不落在边界之外
+        ref = cache.get_reference(cols, bounds)
+        indptr, cuts = ref.get_quantile_cut()
+        for j in range(len(cols)):
+            # 首尾两个切分点是 xgboost 的哨兵值，只检查中间的切分点
+            feature_cuts = cuts[indptr[j] + 1:indptr[j + 1] - 1]
+            self.assertGreater(len(feature_cuts), 1)
+            self.assertLessEqual(float(np.max(feature_cuts)), 0.5)
+            self.assertGreaterEqual(float(np.min(feature_cuts)), -0.5)
+
+        # 边界是缓存键的一部分：边界变化时重建，相同边界复用
+        self.assertIsNot(cache.get_reference(cols, {'lower': [-1.0] * 4, 'upper': [1.0] * 4}), ref)
+        ref = cache.get_reference(cols, bounds)
+        self.assertIs(cache.get_reference(cols, dict(bounds)), ref)
+
+    def test_falls_back_without_quantile_dmatrix(self):
+        from src import classification
+        from src.core.model_trainer import negative_matrix_cache
+        cache = self.trainer.negative_cache
+        cache.refresh()
+        ref = cache.get_reference(['f0', 'f1', 'f2', 'f3'])
+
+        # xgboost<1.7 没有 QuantileDMatrix：不构建分箱参考，已有参考也被忽略，按常规方式训练
+        with patch.object(negative_matrix_cache, 'QUANTILE_DMATRIX_AVAILABLE', False), \
+                patch.object(classification, 'QUANTILE_DMATRIX_AVAILABLE', False), \
+                patch.object(classification.xgb, 'QuantileDMatrix', side_effect=AssertionError) as quantile:
+            cache._reference = None
+            self.assertIsNone(cache.get_reference(['f0', 'f1', 'f2', 'f3']))
+            X = np.vstack([cache.matrix[:50], cache.matrix[-50:] + 5.0])
+            y = np.repeat([0, 1], 50)
+            model, _, _ = classification.train_model_arrays(
+                X, y, ['f0', 'f1', 'f2', 'f3'], ref=ref, n_estimators=5
+            )
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+            quantile.assert_not_called()
+        self.assertIsNotNone(model)
+        self.assertGreater(float(np.mean(model.predict(X) == y)), 0.9)
+        self.assertEqual(self._feature_info()['update_type'], 'full')
+
+
+class TestExternalMemoryTraining(TrainerTestBase):
+    def model_training_config(self):
+        config = super().model_training_config()
+        config['external_memory'] = {'enabled': True, 'batch_rows': 50, 'validation_fraction': 0.2}
+        # 负样本池容量远小于features表：外存训练不受其限制
+        config['negative_pool'] = {'per_user_size': 20, 'max_size': 40}
+        return config
+
+    def test_external_memory_training_streams_batches(self):
+        from src.utils.config.config_loader import ConfigLoader
+        self.assertTrue(self.trainer.external_memory_enabled)
+        with patch.object(ConfigLoader, 'get_model_config',
+                          return_value={'params': {'n_estimators': 7, 'max_depth': 3}}):
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        info = self._feature_info()
+        # features表共360行（alice 120 + 其他用户240），id % 5 == 0 的72行留作验证流
+        self.assertEqual(info['training_samples'], 288)
+        self.assertEqual(info['metrics']['evaluation_samples'], 72)
+        self.assertEqual(info['feature_cols'], ['f0', 'f1', 'f2', 'f3'])
+        self.assertGreater(info['accuracy'], 0.8)
+        # 使用 model.params 与分位数草图的裁剪边界
+        self.assertEqual(info['n_rounds'], 7)
+        model, _, _ = self.trainer.load_user_model('alice')
+        self.assertEqual(model.get_params()['max_depth'], 3)
+        self.assertEqual(len(info['clip_bounds']['lower']), 4)
+        self.assertEqual(self.trainer.get_clip_bounds('alice'), info['clip_bounds'])
+        self.assertEqual(list((self.models_dir / 'cache').glob('extmem_*')), [])
+
+    def test_external_memory_without_extmem_quantile_dmatrix(self):
+        import xgboost as xgb
+        # xgboost<3.0 没有 ExtMemQuantileDMatrix：回退到基于迭代器的外存 DMatrix
+        with patch.object(xgb, 'ExtMemQuantileDMatrix', create=True) as extmem:
+            del xgb.ExtMemQuantileDMatrix
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        extmem.assert_not_called()
+        self.assertEqual(self._feature_info()['training_samples'], 288)
+
+
+class TestFeatureSelection(TrainerTestBase):
+    def test_feature_ranking_cached_per_pool_version(self):
+        from src.core.model_trainer import feature_selector as fs
+        columns = ['f0', 'f1', 'f2', 'f3']
+        with patch.object(fs, 'mutual_info_ranking', wraps=fs.mutual_info_ranking) as mi:
+            selector = self.trainer.feature_selector
+            self.assertEqual(selector.select(columns), columns)
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+            # 新实例从磁盘读取同一版本的排名
+            fs.FeatureSelector(self.trainer.negative_cache, self.models_dir / 'cache').select(columns)
+            self.assertEqual(mi.call_count, 1)
+
+            self._insert('dave', 10, 1.0, start_ts=1000.0)
+            selector.select(columns)
+            self.assertEqual(mi.call_count, 2)
+
+        # 方差不高于阈值的列被剔除，顺序保持不变
+        variances = dict(zip(selector.ranking['columns'], selector.ranking['variance']))
+        lowest = min(variances, key=variances.get)
+        selector.variance_threshold = variances[lowest]
+        self.assertEqual(selector.select(columns), [col for col in columns if col != lowest])
+
+
+class TestHardNegativeMining(TrainerTestBase):
+    def test_hard_negative_mining_respects_budget(self):
+        miner = self.trainer.hard_negative_miner
+        miner.enabled, miner.budget = True, 200
+        X, y, feature_cols, weights = self.trainer.prepare_training_data('alice', return_weights=True)
+        self.assertEqual(len(X), 200)
+        self.assertEqual(int(y.sum()), 100)
+        self.assertEqual(len(weights), 200)
+        # 难样本权重为1，随机余量按其代表的负样本数加权，负样本平均权重为1
+        self.assertAlmostEqual(weights[y == 0].mean(), 1.0)
+        self.assertGreater(weights[y == 0].max(), weights[y == 0].min())
+        self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+
+    def test_weights_follow_deduplication_into_cross_validation(self):
+        import pandas as pd
+        miner = self.trainer.hard_negative_miner
+        miner.enabled, miner.budget = True, 200
+        X, y, feature_cols, weights = self.trainer.prepare_training_data('alice', return_weights=True)
+        # 末尾追加10行重复样本：去重后权重须与保留的行对齐后传给交叉验证
+        X_dup = pd.concat([X, X.iloc[:10]], ignore_index=True)
+        y_dup = np.concatenate([y, y[:10]])
+        w_dup = np.concatenate([weights, np.full(10, 99.0)])
+        with patch.object(self.trainer, 'prepare_training_data', return_value=(X_dup, y_dup, feature_cols, w_dup)), \
+                patch.object(self.trainer, '_cross_validate', wraps=self.trainer._cross_validate) as cv:
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        X_cv, y_cv, weight_cv, _ = cv.call_args.args
+        self.assertEqual(len(y_cv), 200)
+        np.testing.assert_allclose(weight_cv, weights)
+
+
+class TestHyperparameterSearch(TrainerTestBase):
+    def test_hyperparameter_search_result_stored_and_reused(self):
+        search = self.trainer.hyperparameter_search
+        search.enabled, search.n_candidates, search.min_rounds, search.max_rounds = True, 4, 5, 20
+        self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        stored = self._feature_info()['hyperparameters']
+        self.assertIn(stored['params']['max_depth'], [2, 3, 4, 6])
+        self.assertEqual(stored['rungs'], 2)
+
+        artifact_params = self.trainer.load_user_model('alice')[0].get_params()
+        self.assertEqual(artifact_params['n_estimators'], stored['params']['n_estimators'])
+
+        with patch.object(search, 'search') as mocked_search:
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+            mocked_search.assert_not_called()
+        self.assertEqual(self._feature_info()['hyperparameters'], stored)
+
+
+class TestSinglePassSanitization(TrainerTestBase):
+    def test_full_training_sanitizes_matrix_once(self):
+        from src import classification
+        from src.core.model_trainer import simple_model_trainer as smt
+        self.trainer.cv_enabled = False
+        with patch.object(classification, 'sanitize_array', wraps=classification.sanitize_array) as inner, \
+                patch.object(smt, 'sanitize_array', wraps=smt.sanitize_array) as outer:
+            self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        # 只在 train_model_arrays 中按逐列边界清洗一次
+        outer.assert_not_called()
+        self.assertEqual(inner.call_count, 1)
+        self.assertIsNotNone(inner.call_args.kwargs['lower'])
+
+    def test_prediction_clips_to_stored_bounds_like_simple_predictor(self):
+        import pandas as pd
+        from src.core.model_trainer import simple_model_trainer as smt
+        from src.core.predictor.simple_predictor import SimplePredictor
+
+        self.trainer.cv_enabled = False
+        self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        bounds = self.trainer.get_clip_bounds('alice')
+
+        # 越界、无穷与缺失值：与 SimplePredictor 一样按训练时的逐列边界清洗后评分
+        features = pd.DataFrame(self.rng.normal(size=(30, 4)) * 5, columns=['f0', 'f1', 'f2', 'f3'])
+        features.iloc[::4, 0] = 1e6
+        features.iloc[1::4, 1] = -np.inf
+        features.iloc[2::4, 2] = np.nan
+        with patch.object(smt, 'sanitize_array', wraps=smt.sanitize_array) as sanitize:
+            results = self.trainer.predict_user_behavior('alice', features)
+        self.assertEqual(sanitize.call_args.kwargs['lower'], bounds['lower'])
+
+        expected = SimplePredictor().predict_with_trained_model(features, 'alice')
+        np.testing.assert_allclose([r['anomaly_score'] for r in results],
+                                   [r['anomaly_score'] for r in expected], atol=1e-6)
+
+
+class TestCrossValidationMetrics(TrainerTestBase):
+    def test_metrics_come_from_cross_validation(self):
+        self.assertTrue(self.trainer.train_user_model('alice', incremental=False))
+        metrics = self._feature_info()['metrics']
+        cv = metrics['cross_validation']
+        self.assertEqual(cv['n_splits'], 3)
+        self.assertEqual(len(cv['fold_auc']), 3)
+        self.assertEqual(cv['rows'], 360)
+        # 折外AUC与各折AUC基于同一批预测，不会是训练集上的完美分数
+        self.assertLess(metrics['auc'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
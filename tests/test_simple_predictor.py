@@ -0,0 +1,122 @@
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+
+
+class TestScoringWatermark(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmpdir.name) / 'data'
+        self.models_dir = Path(self.tmpdir.name) / 'models'
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.data_dir / 'mouse_data.db'
+
+        def _fake_load_config(self):
+            type(self)._config = {'paths': {}, 'prediction': {'batch_size': 20, 'anomaly_threshold': 0.5}}
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_paths_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.get_paths',
+            return_value={'models': str(self.models_dir), 'data': str(self.data_dir)}
+        )
+        self.cfg_load_patch.start()
+        self.cfg_paths_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+        self.rng = np.random.default_rng(0)
+        X = self.rng.normal(size=(200, 3))
+        model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        model.fit(X, (X[:, 0] > 0).astype(int))
+        ModelArtifact.write(artifact_path(self.models_dir, 'alice'), model, ['f0', 'f1', 'f2'], threshold=0.5)
+
+        from src.core.predictor.simple_predictor import SimplePredictor
+        self.predictor = SimplePredictor()
+        self.next_ts = 1000.0
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_paths_patch.stop()
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _insert(self, n):
+        rows = []
+        for _ in range(n):
+            vector = {f'f{j}': float(v) for j, v in enumerate(self.rng.normal(size=3))}
+            rows.append(('alice', 's1', self.next_ts, json.dumps(vector)))
+            self.next_ts += 1
+        conn = sqlite3.connect(str(self.db_path))
+        conn.executemany(
+            'INSERT INTO features (user_id, session_id, timestamp, feature_vector) VALUES (?, ?, ?, ?)', rows
+        )
+        conn.commit()
+        conn.close()
+
+    def _prediction_count(self):
+        conn = sqlite3.connect(str(self.db_path))
+        count = conn.execute("SELECT COUNT(*) FROM predictions WHERE user_id = 'alice'").fetchone()[0]
+        conn.close()
+        return count
+
+    def test_each_window_scored_once_across_restarts(self):
+        self._insert(30)
+        # 首次只评分最近一批
+        self.assertEqual(len(self.predictor.predict_user_behavior('alice')), 20)
+        self.assertEqual(self.predictor.get_scoring_watermark('alice'), (30, 1029.0))
+        self.assertEqual(self.predictor.predict_user_behavior('alice'), [])
+
+        self._insert(5)
+        results = self.predictor.predict_user_behavior('alice')
+        self.assertEqual([r['timestamp'] for r in results], [1030.0, 1031.0, 1032.0, 1033.0, 1034.0])
+
+        # 重启后从持久化的水位线继续
+        from src.core.predictor.simple_predictor import SimplePredictor
+        self.assertEqual(SimplePredictor().predict_user_behavior('alice'), [])
+        self.assertEqual(self._prediction_count(), 25)
+
+    def test_configured_threshold_overrides_artifact_threshold(self):
+        import pandas as pd
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+
+        # 训练时写入 0.99 的阈值，配置为 0.5：以配置为准
+        X = self.rng.normal(size=(200, 3))
+        model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        model.fit(X, (X[:, 0] > 0).astype(int))
+        ModelArtifact.write(artifact_path(self.models_dir, 'bob'), model, ['f0', 'f1', 'f2'], threshold=0.99)
+        features = pd.DataFrame(self.rng.normal(size=(40, 3)), columns=['f0', 'f1', 'f2'])
+
+        entry = self.predictor.model_cache.get('bob')
+        self.assertEqual(self.predictor.resolve_threshold(entry), 0.5)
+        results = self.predictor.predict_with_trained_model(features, 'bob')
+        self.assertEqual([r['is_normal'] for r in results], [r['anomaly_score'] <= 0.5 for r in results])
+        self.assertIn(False, [r['is_normal'] for r in results])
+
+        # 配置未给出阈值时回退到模型制品中的阈值
+        self.predictor.configured_threshold = None
+        self.assertEqual(self.predictor.resolve_threshold(entry), 0.99)
+        results = self.predictor.predict_with_trained_model(features, 'bob')
+        self.assertTrue(all(r['is_normal'] for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import sys
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+
+class TestStreamingPipeline(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmpdir.name) / 'data'
+        self.models_dir = Path(self.tmpdir.name) / 'models'
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.data_dir / 'mouse_data.db'
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'paths': {},
+                'prediction': {'window_size': 20, 'anomaly_threshold': 0.5,
+                               'streaming': {'persist_interval': 0.05}},
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_paths_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.get_paths',
+            return_value={'models': str(self.models_dir), 'data': str(self.data_dir)}
+        )
+        self.cfg_load_patch.start()
+        self.cfg_paths_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_paths_patch.stop()
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _events(self, n):
+        events = []
+        for i in range(n):
+            event_type, button = self.rng.choice([('move', None), ('move', None), ('Pressed', 'Left'),
+                                                  ('released', 'Left'), ('scroll', 'Scroll')])
+            x = int(self.rng.integers(0, 1920)) if i % 37 else 70000
+            events.append({'user_id': 'alice', 'session_id': 's1', 'timestamp': 1000 + i * 0.1,
+                           'x': x, 'y': int(self.rng.integers(0, 1080)),
+                           'event_type': event_type, 'button': button, 'wheel_delta': 0})
+        return events
+
+    def test_incremental_windows_match_batch_processing(self):
+        from src.core.feature_engineer.simple_feature_processor import (
+            SimpleFeatureProcessor, extract_event_features
+        )
+        from src.core.feature_engineer.incremental_featurizer import IncrementalFeaturizer
+
+        events = self._events(330)
+        featurizer = IncrementalFeaturizer(feature_config={})
+        streamed = pd.concat([f for f in map(featurizer.add_event, events) if f is not None], ignore_index=True)
+
+        raw = pd.DataFrame([(e['timestamp'], e['x'], e['y'], e['button'], e['event_type'], e['event_type'])
+                            for e in events], columns=['client timestamp', 'x', 'y', 'button', 'state', 'event_type'])
+        processor = SimpleFeatureProcessor()
+        batch = processor._aggregate_features_by_window(extract_event_features(raw, {}))
+
+        # 330 个事件去掉 9 个异常坐标后为 16 个完整窗口
+        self.assertEqual(len(streamed), 16)
+        self.assertEqual(sorted(streamed.columns), sorted(batch.columns))
+        np.testing.assert_allclose(streamed[batch.columns].to_numpy(dtype=float), batch.to_numpy(dtype=float),
+                                   rtol=1e-9, equal_nan=True)
+
+    def test_windows_scored_in_memory_and_persisted_asynchronously(self):
+        import xgboost as xgb
+        from src.core.model_trainer.model_artifact import ModelArtifact, artifact_path
+        from src.core.predictor.streaming_pipeline import StreamingDetectionPipeline
+
+        X = self.rng.normal(size=(200, 2))
+        model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        model.fit(X, (X[:, 0] > 0).astype(int))
+        ModelArtifact.write(artifact_path(self.models_dir, 'alice'), model,
+                            ['velocity_mean', 'angle_mean'], threshold=0.5)
+
+        received = []
+        pipeline = StreamingDetectionPipeline(callback=lambda user_id, results: received.append((user_id, results)))
+        self.assertTrue(pipeline.start())
+        for event in self._events(130):
+            self.assertTrue(pipeline.submit(event))
+        deadline = time.time() + 30
+        while len(received) < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        pipeline.stop()
+
+        self.assertEqual([user_id for user_id, _ in received], ['alice'] * 6)
+        self.assertEqual(pipeline.get_stats()['windows'], 6)
+
+        conn = sqlite3.connect(str(self.db_path))
+        try:
+            counts = [conn.execute(f"SELECT COUNT(*) FROM {table} WHERE user_id = 'alice'").fetchone()[0]
+                      for table in ('features', 'predictions')]
+        finally:
+            conn.close()
+        self.assertEqual(counts, [6, 6])
+        # 水位线随预测一起推进：轮询预测不会重复评分流式窗口
+        self.assertTrue(pipeline.predictor.load_new_features('alice').empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
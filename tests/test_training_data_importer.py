@@ -0,0 +1,135 @@
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+
+class TestTrainingDataImporterBulk(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.data_dir = Path(self.tmpdir.name) / 'data'
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+        def _fake_load_config(self):
+            type(self)._config = {'paths': {}, 'system': {}}
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_paths_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.get_paths',
+            return_value={
+                'models': str(Path(self.tmpdir.name) / 'models'),
+                'data': str(self.data_dir),
+                'logs': str(Path(self.tmpdir.name) / 'logs'),
+                'database': str(self.data_dir / 'mouse_data.db'),
+            }
+        )
+        self.cfg_load_patch.start()
+        self.cfg_paths_patch.start()
+
+        # 构造一个小型聚合数据集：非连续行索引、整数特征列、缺失值与需要17位有效数字的浮点值
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'user': np.repeat([1, 2, 3], 20),
+            'session': np.arange(60),
+            'velocity_mean': rng.normal(size=60),
+            'velocity_std': rng.random(60),
+            'click_count': rng.integers(0, 10, size=60),
+        }, index=np.arange(100, 220, 2))
+        self.df.loc[self.df.index[::7], 'velocity_std'] = np.nan
+        self.df.loc[self.df.index[1], 'velocity_mean'] = 0.1 + 0.2
+        self.pickle_path = self.data_dir / 'agg.pickle'
+        self.df.to_pickle(self.pickle_path)
+
+        import src.core.model_trainer.training_data_importer as tdi
+        self.tdi_mod = tdi
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader._config = None
+        self.cfg_paths_patch.stop()
+        self.cfg_load_patch.stop()
+        self.tmpdir.cleanup()
+
+    def _fetch_rows(self):
+        conn = sqlite3.connect(str(self.data_dir / 'mouse_data.db'))
+        rows = conn.execute(
+            'SELECT user_id, session_id, timestamp, feature_vector FROM features ORDER BY id'
+        ).fetchall()
+        indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+        conn.close()
+        return rows, indexes
+
+    def _import(self, method, pickle_path, **kwargs):
+        importer = self.tdi_mod.TrainingDataImporter()
+        importer.cleanup_imported_data()
+        # 固定导入开始时间，两条路径的时间戳可直接比较
+        with patch.object(self.tdi_mod.time, 'time', return_value=1000.0):
+            self.assertTrue(getattr(importer, method)(pickle_path, 'training_user', **kwargs))
+        return self._fetch_rows()
+
+    def test_bulk_import_matches_row_import(self):
+        expected, _ = self._import('import_training_data_to_db', self.pickle_path)
+        rows, indexes = self._import('bulk_import_training_data_to_db', self.pickle_path, chunk_size=16)
+
+        self.assertEqual(len(expected), len(self.df))
+        self.assertEqual(rows, expected)
+        self.assertIn('idx_features_user_session', indexes)
+        self.assertIn('idx_features_timestamp', indexes)
+
+        # 逐行导入的取值规则：按整表公共类型取行，时间戳为开始时间加行索引标签，缺失值写为 NaN
+        user_id, session_id, timestamp, vector = rows[0]
+        self.assertEqual((user_id, session_id, timestamp), ('training_user_1.0', '0.0', 1100.0))
+        self.assertTrue(np.isnan(json.loads(vector)['velocity_std']))
+        self.assertEqual(json.loads(rows[1][3])['velocity_mean'], 0.1 + 0.2)
+
+    def test_row_import_updates_negative_pool_per_batch(self):
+        importer = self.tdi_mod.TrainingDataImporter()
+        calls = []
+        original = importer.negative_pool.add_samples
+
+        def record(rows, conn=None):
+            rows = list(rows)
+            calls.append(rows)
+            return original(rows, conn=conn)
+
+        with patch.object(importer.negative_pool, 'add_samples', side_effect=record):
+            self.assertTrue(importer.import_training_data_to_db(self.pickle_path, 'training_user'))
+
+        # 不足1000行：整个导入只在最终提交前写一次负样本池
+        self.assertEqual(len(calls), 1)
+        conn = sqlite3.connect(str(self.data_dir / 'mouse_data.db'))
+        imported = conn.execute('SELECT id, user_id, feature_vector FROM features ORDER BY id').fetchall()
+        pooled = conn.execute('SELECT COUNT(*) FROM negative_pool').fetchone()[0]
+        conn.close()
+        self.assertEqual(calls[0], imported)
+        self.assertGreater(pooled, 0)
+
+    def test_bulk_import_matches_row_import_with_object_columns(self):
+        # 含字符串列时整表为 object 类型，整数与浮点特征保留各自类型
+        df = self.df.assign(user=self.df['user'].map(lambda u: f' u{u} '))
+        df.to_pickle(self.pickle_path)
+        expected, _ = self._import('import_training_data_to_db', self.pickle_path)
+        rows, _ = self._import('bulk_import_training_data_to_db', self.pickle_path, chunk_size=16)
+
+        self.assertEqual(rows, expected)
+        self.assertEqual(rows[0][0], 'training_user_ u1')
+        self.assertEqual(json.loads(rows[0][3])['click_count'], int(self.df['click_count'].iloc[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
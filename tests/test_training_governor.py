@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import unittest
+from pathlib import Path
+
+from unittest.mock import patch
+
+
+def _report_limits_child(limits, result_queue):
+    """子进程：回报实际生效的线程数与优先级"""
+    from src.core.model_trainer.training_governor import _apply_child_limits
+    _apply_child_limits(limits)
+    result_queue.put({'threads': os.environ.get('OMP_NUM_THREADS'), 'nice': os.nice(0)})
+
+
+def _inherited_env_child(limits, result_queue):
+    """子进程：不调用 _apply_child_limits，回报从父进程继承的线程数"""
+    result_queue.put(os.environ.get('OMP_NUM_THREADS'))
+
+
+def _busy_child(limits, result_queue):
+    """子进程：运行约1.5秒（若被暂停则相应延长墙钟时间）"""
+    deadline = time.process_time() + 1.5
+    while time.process_time() < deadline:
+        pass
+    result_queue.put(True)
+
+
+def _cross_validate_child(limits, result_queue):
+    """子进程：在守护子进程中运行交叉验证，按两个线程预算请求多进程并行"""
+    import numpy as np
+    from src import classification
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = (X[:, 0] > 0).astype(int)
+    with patch.object(classification, 'training_thread_limit', return_value=2):
+        _, oof_proba, summary = classification.cross_validate_arrays(
+            X, y, n_splits=3, n_workers=2, min_parallel_cells=0, n_estimators=10
+        )
+    result_queue.put({'n_workers': summary['n_workers'], 'n_jobs': summary['n_jobs'],
+                      'rows': len(oof_proba), 'auc_mean': summary['auc_mean']})
+
+
+class TestTrainingGovernor(unittest.TestCase):
+    def setUp(self):
+        # 确保项目根目录在 sys.path
+        project_root = Path(__file__).resolve().parents[1]
+        if str(project_root) not in sys.path:
+            sys.path.insert(0, str(project_root))
+
+        def _fake_load_config(self):
+            type(self)._config = {
+                'system': {
+                    'max_workers': 2,
+                    'memory_limit': '1GB',
+                    'training_governor': {'nice': 5, 'check_interval': 0.1, 'max_pause': 1.0, 'min_run': 5},
+                },
+            }
+
+        self.cfg_load_patch = patch(
+            'src.utils.config.config_loader.ConfigLoader.load_config',
+            new=_fake_load_config
+        )
+        self.cfg_load_patch.start()
+        from src.utils.config.config_loader import ConfigLoader
+        ConfigLoader().load_config()
+
+        from src.core.model_trainer.training_governor import TrainingGovernor
+        self.governor = TrainingGovernor()
+
+    def tearDown(self):
+        from src.utils.config.config_loader import ConfigLoader
+        self.cfg_load_patch.stop()
+        ConfigLoader._config = None
+
+    def test_child_runs_with_capped_threads_and_lower_priority(self):
+        self.assertEqual(self.governor.memory_limit, 1024 ** 3)
+        self.assertLessEqual(self.governor.threads, 2)
+
+        result = self.governor.run(_report_limits_child)
+        self.assertEqual(result['threads'], str(self.governor.threads))
+        if not sys.platform.startswith('win'):
+            self.assertGreaterEqual(result['nice'], os.nice(0) + 5)
+
+    def test_thread_limits_inherited_from_parent_environment(self):
+        parent_value = os.environ.get('OMP_NUM_THREADS')
+        # 子进程启动时（导入任何模块之前）即已生效，父进程环境在启动后恢复
+        self.assertEqual(self.governor.run(_inherited_env_child), str(self.governor.threads))
+        self.assertEqual(os.environ.get('OMP_NUM_THREADS'), parent_value)
+
+    def test_cross_validation_runs_inside_daemonic_child(self):
+        # 守护子进程不能创建进程池：各折改为在子进程内逐折训练，而不是失败后回退到训练集评估
+        result = self.governor.run(_cross_validate_child)
+        self.assertIsNotNone(result)
+        self.assertEqual((result['n_workers'], result['n_jobs'], result['rows']), (1, 2, 300))
+        self.assertGreater(result['auc_mean'], 0.8)
+
+    def test_pressure_pauses_child_until_max_pause(self):
+        self.governor.add_probe('预测延迟', lambda: 5.0, 2.0)
+
+        start = time.time()
+        self.assertTrue(self.governor.run(_busy_child))
+        # 首次检查即被暂停，max_pause 后强制恢复并至少运行 min_run 秒
+        self.assertGreaterEqual(time.time() - start, 1.0 + 1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
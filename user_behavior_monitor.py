@@ -39,6 +39,7 @@ import os
 import time
 import signal
 import threading
+import multiprocessing
 import psutil
 from pathlib import Path
 import traceback
@@ -105,6 +106,8 @@ from src.core.data_collector.windows_mouse_collector import WindowsMouseCollecto
 from src.core.data_collector.linux_mouse_collector import LinuxMouseCollector
 from src.core.feature_engineer.simple_feature_processor import SimpleFeatureProcessor
 from src.core.model_trainer.simple_model_trainer import SimpleModelTrainer
+from src.core.model_trainer.training_governor import TrainingGovernor
+from src.core.model_trainer.background_trainer import BackgroundTrainer
 from src.core.predictor.simple_predictor import SimplePredictor
 from src.core.alert.alert_service import AlertService
 
@@ -204,6 +207,11 @@ class WindowsBehaviorMonitor:
             self.logger.debug("初始化预测模块...")
             self.predictor = SimplePredictor()
             
+            # 训练资源调度：训练在低优先级子进程中进行，实时任务受压时暂停
+            self.training_governor = TrainingGovernor()
+            self.training_governor.watch_predictor(self.predictor)
+            self.background_trainer = BackgroundTrainer(self.training_governor)
+            
             # 告警模块
             self.logger.debug("初始化告警模块...")
             self.alert_service = AlertService()
@@ -472,7 +480,10 @@ class WindowsBehaviorMonitor:
         try:
             self.logger.info("开始自动模型训练...")
             
-            success = self.model_trainer.train_user_model(self.current_user_id)
+            # 训练在后台子进程中进行，工作流线程仅等待结果，热键与采集不受影响
+            self.training_governor.watch_collector(self.data_collector)
+            job = self.background_trainer.submit(self.current_user_id)
+            success = self.background_trainer.wait(job)
             
             return success
             
@@ -548,6 +559,9 @@ class WindowsBehaviorMonitor:
                 self.predictor.stop_continuous_prediction()
                 self.is_predicting = False
             
+            # 取消进行中的训练，旧工作流随之结束
+            self.background_trainer.cancel_all()
+            
             # 创建新的用户ID
             new_user_id = f"{self.user_manager.current_username}_retrain_{int(time.time())}"
             self.current_user_id = new_user_id
@@ -749,6 +763,9 @@ class WindowsBehaviorMonitor:
                 self.predictor.stop_continuous_prediction()
                 self.is_predicting = False
             
+            if hasattr(self, 'background_trainer'):
+                self.background_trainer.stop()
+            
             # 停止用户管理
             if hasattr(self, 'user_manager'):
                 self.user_manager.stop_keyboard_listener()
@@ -928,5 +945,6 @@ def main():
         print("系统已退出")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后训练子进程（spawn）需要
     exit_code = main()
     sys.exit(exit_code) 
\ No newline at end of file